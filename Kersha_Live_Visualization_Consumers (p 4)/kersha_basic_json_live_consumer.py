@@ -1,41 +1,49 @@
-import sys
-import pathlib
-
-# Dynamically add the project root to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))  # Ensure project root is in Python path
-
-print(f"DEBUG: Added {PROJECT_ROOT} to sys.path")  # Debugging line
-
-# Now import utils
-from utils.utils_logger import logger
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_producer import load_environment
+from utils.utils_profiling import run_profiled
+from utils.utils_metrics import stage, start_metrics_server
+from utils.utils_plotting import get_pyplot
+from utils.utils_transport import create_transport
 
 import json
 import os
-import time
-import matplotlib.pyplot as plt
 from collections import defaultdict
 
 
-# Set up paths
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-DATA_FOLDER = PROJECT_ROOT.joinpath("data")
-DATA_FILE = DATA_FOLDER.joinpath("buzz.json")  # Ensure correct file
+def get_topic() -> str:
+    """Fetch the topic from environment or use default."""
+    return os.getenv("BASIC_BUZZ_TOPIC", "basic_buzz")
 
-logger.info(f"Project root: {PROJECT_ROOT}")
-logger.info(f"Data folder: {DATA_FOLDER}")
-logger.info(f"Data file: {DATA_FILE}")
+def get_consumer_group_id() -> str:
+    """Fetch the consumer group id from environment or use default."""
+    return os.getenv("BASIC_BUZZ_CONSUMER_GROUP_ID", "basic_buzz_group")
 
 # Data structure for tracking message counts
 author_counts = defaultdict(int)
 
-# Set up Matplotlib for real-time visualization
-fig, ax = plt.subplots()
-plt.ion()  # Enable interactive mode
+# Pipeline stages (see utils_metrics); polling a record includes decoding it
+POLL_STAGE = stage("poll")
+AGGREGATE_STAGE = stage("aggregate")
+RENDER_STAGE = stage("render")
+
+# Matplotlib is loaded by init_chart(), and not at all when HEADLESS is set
+plt = None
+fig, ax = None, None
+
+def init_chart() -> None:
+    """Set up Matplotlib for real-time visualization, unless running headless."""
+    global plt, fig, ax
+    plt = get_pyplot()
+    if plt is None:
+        logger.info("Headless mode: live chart disabled.")
+        return
+    fig, ax = plt.subplots()
+    plt.ion()  # Enable interactive mode
 
 def update_chart():
     """Update the live chart with the latest author message counts."""
+    if ax is None:
+        return
     ax.clear()
     authors = list(author_counts.keys())
     counts = list(author_counts.values())
@@ -50,64 +58,52 @@ def update_chart():
     plt.draw()
     plt.pause(0.01)  # ✅ Ensures real-time updates
 
-def process_message(message: str) -> None:
+def process_message(message_dict: dict) -> None:
     """Process an incoming JSON message and update visualization."""
-    try:
-        message_dict = json.loads(message)
-
-        if isinstance(message_dict, dict) and "author" in message_dict:
-            author = message_dict["author"]
+    if isinstance(message_dict, dict) and "author" in message_dict:
+        author = message_dict["author"]
+        with AGGREGATE_STAGE.time():
             author_counts[author] += 1
-            logger.info(f"New message from {author}: {message_dict['message']}")
+        log_sampled("INFO", "New message from {}: {}", author, message_dict["message"])
+        with RENDER_STAGE.time():
             update_chart()
-        else:
-            logger.error(f"Invalid message format: {message_dict}")
-
-    except json.JSONDecodeError:
-        logger.error(f"Failed to decode JSON message: {message}")
+    else:
+        logger.error(f"Invalid message format: {message_dict}")
 
 def main() -> None:
     """Main consumer function that reads and visualizes messages in real-time."""
+    load_environment()
+    configure_logging()
     logger.info("START consumer.")
+    start_metrics_server()
+    # File segments under data/transport/ unless TRANSPORT is set
+    transport = create_transport(default="file")
+    topic = get_topic()
+    logger.info(f"Topic: {topic}")
 
-    if not DATA_FILE.exists():
-        logger.error(f"Data file {DATA_FILE} does not exist. Exiting.")
-        sys.exit(1)
-
+    consumer = None
     try:
-        # Read existing messages
-        with open(DATA_FILE, "r") as file:
-            try:
-                messages = json.load(file)  # ✅ Load JSON list at start
-                for msg in messages:
-                    process_message(json.dumps(msg))  # Convert back to string
-            except json.JSONDecodeError:
-                logger.error("Failed to load JSON from file. Check formatting.")
-
-        # Open file in read mode and watch for new lines
-        with open(DATA_FILE, "r") as file:
-            file.seek(0, os.SEEK_END)  # Move cursor to end for new messages
-            print("Consumer is ready and waiting for new JSON messages...")
-
-            while True:
-                line = file.readline()
-                if line.strip():
-                    process_message(line)
-                else:
-                    logger.debug("No new messages. Waiting...")
-                    time.sleep(0.5)
+        # Reads the topic from the start, then keeps following it
+        consumer = transport.consumer(topic, get_consumer_group_id(), value_deserializer=json.loads)
+        init_chart()
+        logger.info("Consumer is ready and waiting for new JSON messages...")
+        for record in POLL_STAGE.wrap(consumer):
+            process_message(record.value)
 
     except KeyboardInterrupt:
         logger.info("Consumer interrupted by user.")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
-        plt.ioff()
-        plt.show()
+        if consumer is not None:
+            consumer.close()
+        if plt is not None:
+            plt.ioff()
+            plt.show()
         logger.info("Consumer closed.")
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main)
 
 
 
@@ -5,61 +5,33 @@ Consume JSON messages from a Kafka topic and visualize temperature readings in r
 
 Example Kafka message format:
 {"timestamp": "2025-01-11T18:15:00Z", "temperature": 225.0}
+
+Messages may also use the 13-byte binary format from utils_codec
+(SMOKER_WIRE_FORMAT=binary on the producer).
 """
 
 #####################################
 # Import Modules
 #####################################
 
-import sys
-import pathlib
-
-# Add project root directory to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))
-
-# Add utils directory explicitly
-UTILS_PATH = str(PROJECT_ROOT.joinpath("utils"))
-if UTILS_PATH not in sys.path:
-    sys.path.append(UTILS_PATH)
-
-print(f"DEBUG: Added {PROJECT_ROOT} and {UTILS_PATH} to sys.path")  # Debugging line
-
-# Now import utils
-from utils.utils_logger import logger
-from utils.utils_consumer import create_kafka_consumer
-
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_producer import load_environment
+from utils.utils_profiling import run_profiled
+from utils.utils_transport import create_transport
+from utils.utils_plotting import get_pyplot
+from utils.utils_codec import decode_smoker_payload, decode_smoker_records
+from utils.utils_metrics import stage, start_metrics_server
+from utils.utils_tracing import TraceMonitor
 
 import os
-import matplotlib
-
-# Set DISPLAY environment variable for GUI in WSL
-os.environ["DISPLAY"] = "192.168.80.1:0"  
-
-# Use TkAgg for Matplotlib GUI rendering
-matplotlib.use("TkAgg")
-
-import matplotlib.pyplot as plt
 import json
+import time
 from collections import deque
-from dotenv import load_dotenv
-from utils.utils_consumer import create_kafka_consumer
-
-
-# Dynamically add the project root to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))
-
-print(f"DEBUG: Added {PROJECT_ROOT} to sys.path")  # Debugging line
 
 #####################################
-# Load Environment Variables
+# Getter Functions for .env Variables
 #####################################
 
-load_dotenv()
-
 def get_kafka_topic():
     """Fetch Kafka topic from environment or use default."""
     topic = os.getenv("SMOKER_TOPIC", "smoker_csv")
@@ -78,34 +50,62 @@ def get_rolling_window_size():
     logger.info(f"Rolling window size: {window_size}")
     return window_size
 
+# Records per poll; binary readings in one poll are decoded together
+POLL_TIMEOUT_MS = 1000
+POLL_MAX_RECORDS = 500
+
+# Pipeline stages (see utils_metrics)
+POLL_STAGE = stage("poll")
+DECODE_STAGE = stage("decode")
+AGGREGATE_STAGE = stage("aggregate")
+RENDER_STAGE = stage("render")
+
 #####################################
 # Set up Data Structures
 #####################################
 
-timestamps = deque(maxlen=get_rolling_window_size())  # Store recent timestamps
-temperatures = deque(maxlen=get_rolling_window_size())  # Store recent temperatures
+# Sized by SMOKER_ROLLING_WINDOW_SIZE once main() has loaded the environment
+timestamps = deque(maxlen=10)  # Store recent timestamps
+temperatures = deque(maxlen=10)  # Store recent temperatures
 
 #####################################
 # Set up Live Visualization
 #####################################
 
-plt.ion()  # Enable interactive mode
-fig, ax = plt.subplots()
+# Matplotlib is loaded by init_chart(), and not at all when HEADLESS is set
+plt = None
+fig, ax = None, None
 
-import matplotlib.pyplot as plt
+def init_chart() -> None:
+    """Open the live chart window, unless running headless."""
+    global plt, fig, ax
+    if plt is not None:
+        return
 
-plt.ion()  # Enable interactive mode
-fig, ax = plt.subplots()
+    # The X display comes from the environment (set DISPLAY in .env for WSL)
+    if not os.getenv("DISPLAY"):
+        logger.warning("DISPLAY is not set; the chart window may not open.")
 
-# Force the plot to open
-plt.show(block=False)  
+    # Use TkAgg for Matplotlib GUI rendering
+    plt = get_pyplot(backend="TkAgg")
+    if plt is None:
+        logger.info("Headless mode: live chart disabled.")
+        return
+
+    plt.ion()  # Enable interactive mode
+    fig, ax = plt.subplots()
+
+    # Force the plot to open
+    plt.show(block=False)
 
 def update_chart():
     """Update the live chart with temperature readings."""
-    print(f"DEBUG: Updating chart with {len(timestamps)} data points")  # Debugging line
+    if ax is None:
+        return
 
+    logger.debug("Updating chart with {} data points", len(timestamps))
     if len(timestamps) == 0 or len(temperatures) == 0:
-        print("DEBUG: No data received yet.")
+        logger.debug("No data received yet.")
         return  # Prevent errors if no data is available
 
     ax.clear()
@@ -119,7 +119,6 @@ def update_chart():
     plt.tight_layout()
     plt.draw()
     plt.pause(0.1)  # Allow time for the chart to update
-    print("DEBUG: Chart updated!")  # Debugging output
 
 
 
@@ -127,44 +126,100 @@ def update_chart():
 # Function to Process Messages
 #####################################
 
-def process_message(message: str):
-    """Process a JSON-transferred Kafka message."""
-    try:
-        data = json.loads(message)
+def process_readings(readings: list) -> None:
+    """Store decoded {timestamp, temperature} readings and redraw the chart once."""
+    start = time.perf_counter()
+    added = 0
+    for data in readings:
         temperature = data.get("temperature")
         timestamp = data.get("timestamp")
 
         if temperature is None or timestamp is None:
-            logger.error(f"Invalid message format: {message}")
-            return
+            logger.error(f"Invalid message format: {data}")
+            continue
 
         timestamps.append(timestamp)
         temperatures.append(temperature)
-        logger.info(f"Processed message: {data}")
-        update_chart()
+        log_sampled("INFO", "Processed message: {}", data)
+        added += 1
+
+    AGGREGATE_STAGE.observe(time.perf_counter() - start, added)
+    if added:
+        with RENDER_STAGE.time(added):
+            update_chart()
 
+def process_message(message: bytes, headers=None):
+    """Process one Kafka message in either the JSON or binary wire format."""
+    try:
+        with DECODE_STAGE.time():
+            readings = decode_smoker_payload(message, headers)
+        process_readings(readings)
     except json.JSONDecodeError as e:
         logger.error(f"JSON decoding error: {e}")
     except Exception as e:
         logger.error(f"Error processing message: {e}")
 
+def process_records(records: list):
+    """
+    Decode a polled batch of Kafka records together and process them in order.
+
+    Decoding is all or nothing, and nothing is stored until it succeeds,
+    so only a failed decode falls back to one record at a time. A failure
+    while storing readings is logged like process_message does, and the
+    batch is not processed again.
+    """
+    try:
+        with DECODE_STAGE.time(len(records)):
+            readings = decode_smoker_records(records)
+    except Exception as e:
+        # Fall back to one at a time so one bad record does not drop the batch
+        logger.warning(f"Batch decode failed ({e}). Decoding records one by one.")
+        for record in records:
+            process_message(record.value, record.headers)
+        return
+    try:
+        process_readings(readings)
+    except Exception as e:
+        logger.error(f"Error processing messages: {e}")
+
 #####################################
 # Define Main Consumer Function
 #####################################
 
 def main():
     """Main entry point for the Kafka consumer."""
+    global timestamps, temperatures
+
+    load_environment()
+    configure_logging()
     logger.info("START consumer.")
+    window_size = get_rolling_window_size()
+    timestamps = deque(maxlen=window_size)
+    temperatures = deque(maxlen=window_size)
+    start_metrics_server()
+    transport = create_transport()
     topic = get_kafka_topic()
     group_id = get_kafka_consumer_group_id()
 
     logger.info(f"Consumer subscribing to topic '{topic}' with group '{group_id}'...")
-    consumer = create_kafka_consumer(topic, group_id)
+    # Keep raw bytes; the codec decodes JSON and binary payloads
+    consumer = transport.consumer(topic, group_id, value_deserializer=lambda value: value)
+    init_chart()
+
+    # Latency and lost/duplicate records per producer, from the trace header
+    monitor = TraceMonitor(topic)
 
     try:
-        for message in consumer:
-            print(f"DEBUG: Received {message.value}")  # Ensure messages are coming in
-            process_message(message.value)
+        while True:
+            start = time.perf_counter()
+            batches = consumer.poll(timeout_ms=POLL_TIMEOUT_MS, max_records=POLL_MAX_RECORDS)
+            POLL_STAGE.observe(time.perf_counter() - start, sum(len(records) for records in batches.values()))
+            for records in batches.values():
+                logger.debug("Received {} records", len(records))
+                process_records(records)
+                handled_us = time.time_ns() // 1000
+                for record in records:
+                    monitor.observe(record.headers, handled_us, partition=record.partition)
     except KeyboardInterrupt:
         logger.warning("Consumer interrupted by user.")
     except Exception as e:
@@ -172,16 +227,18 @@ def main():
     finally:
         consumer.close()
         logger.info(f"Kafka consumer for topic '{topic}' closed.")
+        monitor.log_summary()
+
+    if plt is not None:
+        plt.ioff()  # Disable interactive mode when consuming ends
+        plt.show()  # Ensure the chart opens and stays open
 
 #####################################
 # Run Consumer if Executed as Script
 #####################################
 
 if __name__ == "__main__":
-    main()
-    plt.ioff()  # Disable interactive mode when script ends
-    print("DEBUG: Calling plt.show() to display the chart.")  # Debugging output
-    plt.show()  # Ensure the chart opens and stays open
+    run_profiled(main)
 
 
 
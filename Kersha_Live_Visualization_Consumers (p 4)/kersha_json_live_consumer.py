@@ -5,6 +5,9 @@ Consume JSON messages from a Kafka topic and visualize author counts in real-tim
 
 Example Kafka message format:
 {"message": "I love Python!", "author": "Eve"}
+
+Producers may also send columnar envelopes of many messages
+(BUZZ_ENVELOPE_MAX_MESSAGES); those are counted without per-message dicts.
 """
 
 #####################################
@@ -14,24 +17,18 @@ Example Kafka message format:
 # Import packages from Python Standard Library
 import os
 import json  # Handle JSON parsing
+import time
 from collections import defaultdict  # Data structure for counting author occurrences
 
-# Import external packages
-from dotenv import load_dotenv
-
-# IMPORTANT
-# Import Matplotlib.pyplot for live plotting
-import matplotlib.pyplot as plt
-
 # Import functions from local modules
-from utils.utils_consumer import create_kafka_consumer
-from utils.utils_logger import logger
-
-#####################################
-# Load Environment Variables
-#####################################
-
-load_dotenv()
+from utils.utils_transport import create_transport
+from utils.utils_producer import load_environment
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_profiling import run_profiled
+from utils.utils_plotting import get_pyplot
+from utils.utils_envelope import decode_envelope, is_envelope
+from utils.utils_metrics import stage, start_metrics_server
+from utils.utils_tracing import TraceMonitor
 
 #####################################
 # Getter Functions for .env Variables
@@ -63,8 +60,20 @@ author_counts = defaultdict(int)
 # Set up Live Visuals
 #####################################
 
-fig, ax = plt.subplots()
-plt.ion()  # Turn on interactive mode for live updates
+# Matplotlib is loaded by init_chart(), and not at all when HEADLESS is set
+plt = None
+fig, ax = None, None
+
+
+def init_chart() -> None:
+    """Create the live chart, unless running headless."""
+    global plt, fig, ax
+    plt = get_pyplot()
+    if plt is None:
+        logger.info("Headless mode: live chart disabled.")
+        return
+    fig, ax = plt.subplots()
+    plt.ion()  # Turn on interactive mode for live updates
 
 #####################################
 # Define an Update Chart Function for Live Plotting
@@ -73,6 +82,9 @@ plt.ion()  # Turn on interactive mode for live updates
 
 def update_chart():
     """Update the live chart with the latest author counts."""
+    if ax is None:
+        return
+
     # Clear the previous chart
     ax.clear()
 
@@ -105,41 +117,77 @@ def update_chart():
 # Function to Process a Single Message
 #####################################
 
+# Pipeline stages (see utils_metrics)
+POLL_STAGE = stage("poll")
+DECODE_STAGE = stage("decode")
+AGGREGATE_STAGE = stage("aggregate")
+RENDER_STAGE = stage("render")
+
 
-def process_message(message: str) -> None:
+def process_envelope(payload: bytes) -> None:
     """
-    Process a single JSON message from Kafka and update the chart.
+    Count every message in a columnar envelope and update the chart once.
+
+    Author counts come straight from the dictionary codes with one
+    bincount; no per-message dicts are built.
+
+    Args:
+        payload (bytes): The encoded envelope.
+    """
+    start = time.perf_counter()
+    envelope = decode_envelope(payload)
+    DECODE_STAGE.observe(time.perf_counter() - start, envelope.count)
+    with AGGREGATE_STAGE.time(envelope.count):
+        for author, count in envelope.value_counts("author").items():
+            author_counts[author] += count
+    logger.info("Processed envelope of {} messages.", envelope.count)
+    log_sampled("INFO", "Updated author counts: {}", dict(author_counts))
+    with RENDER_STAGE.time(envelope.count):
+        update_chart()
+
+
+def process_message(message, headers=None) -> None:
+    """
+    Process a single message from Kafka and update the chart.
 
     Args:
-        message (str): The JSON message as a string.
+        message (str or bytes): A JSON message, or a columnar envelope.
+        headers (list, optional): Kafka record headers.
     """
     try:
+        if is_envelope(message, headers):
+            process_envelope(message)
+            return
+
         # Log the raw message for debugging
-        logger.debug(f"Raw message: {message}")
+        logger.debug("Raw message: {}", message)
 
         # Parse the JSON string into a Python dictionary
-        message_dict: dict = json.loads(message)
+        with DECODE_STAGE.time():
+            message_dict: dict = json.loads(message)
 
         # Ensure the processed JSON is logged for debugging
-        logger.info(f"Processed JSON message: {message_dict}")
+        log_sampled("INFO", "Processed JSON message: {}", message_dict)
 
         # Ensure it's a dictionary before accessing fields
         if isinstance(message_dict, dict):
             # Extract the 'author' field from the Python dictionary
             author = message_dict.get("author", "unknown")
-            logger.info(f"Message received from author: {author}")
+            log_sampled("INFO", "Message received from author: {}", author)
 
             # Increment the count for the author
-            author_counts[author] += 1
+            with AGGREGATE_STAGE.time():
+                author_counts[author] += 1
 
             # Log the updated counts
-            logger.info(f"Updated author counts: {dict(author_counts)}")
+            log_sampled("INFO", "Updated author counts: {}", dict(author_counts))
 
             # Update the chart
-            update_chart()
+            with RENDER_STAGE.time():
+                update_chart()
 
             # Log the updated chart
-            logger.info(f"Chart updated successfully for message: {message}")
+            log_sampled("INFO", "Chart updated successfully for message: {}", message)
         else:
             logger.error(f"Expected a dictionary but got: {type(message_dict)}")
 
@@ -159,10 +207,14 @@ def main() -> None:
     Main entry point for the consumer.
 
     - Reads the Kafka topic name and consumer group ID from environment variables.
-    - Creates a Kafka consumer using the `create_kafka_consumer` utility.
+    - Creates a consumer on the configured transport (see utils_transport).
     - Polls messages and updates a live chart.
     """
+    load_environment()
+    configure_logging()
     logger.info("START consumer.")
+    start_metrics_server()
+    transport = create_transport()
 
     # Fetch .env content
     topic = get_kafka_topic()
@@ -170,17 +222,23 @@ def main() -> None:
     logger.info(f"Consumer: Topic '{topic}' and group '{group_id}'...")
 
     # Create the Kafka consumer using the utility function.
-    consumer = create_kafka_consumer(topic, group_id)
+    # Keep raw bytes: records may be JSON or columnar envelopes.
+    consumer = transport.consumer(topic, group_id, value_deserializer=lambda value: value)
+    init_chart()
+
+    # Latency and lost/duplicate records per producer, from the trace header
+    monitor = TraceMonitor(topic)
 
     # Poll and process messages
     logger.info(f"Polling messages from topic '{topic}'...")
     try:
-        for message in consumer:
+        for message in POLL_STAGE.wrap(consumer):
             # Message is a complex object with metadata and value
-            # Use the value attribute to extract the message as a string
-            message_str = message.value
-            logger.debug(f"Received message at offset {message.offset}: {message_str}")
-            process_message(message_str)
+            # Use the value attribute to extract the message bytes
+            message_bytes = message.value
+            logger.debug("Received message at offset {}: {} bytes", message.offset, len(message_bytes))
+            process_message(message_bytes, message.headers)
+            monitor.observe(message.headers, partition=message.partition)
     except KeyboardInterrupt:
         logger.warning("Consumer interrupted by user.")
     except Exception as e:
@@ -188,9 +246,17 @@ def main() -> None:
     finally:
         consumer.close()
         logger.info(f"Kafka consumer for topic '{topic}' closed.")
+        monitor.log_summary()
 
     logger.info(f"END consumer for topic '{topic}' and group '{group_id}'.")
 
+    if plt is not None:
+        # Turn off interactive mode after completion
+        plt.ioff()
+
+        # Display the final chart
+        plt.show()
+
 
 #####################################
 # Conditional Execution
@@ -199,10 +265,4 @@ def main() -> None:
 if __name__ == "__main__":
 
     # Call the main function to start the consumer
-    main()
-
-    # Turn off interactive mode after completion
-    plt.ioff()
-
-    # Display the final chart
-    plt.show()
+    run_profiled(main)
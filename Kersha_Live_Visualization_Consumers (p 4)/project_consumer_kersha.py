@@ -1,74 +1,80 @@
 """
 project_consumer_kersha.py
-Reads sentiment trends from a JSON file and visualizes them in real-time.
+Reads sentiment trends from the project topic and visualizes them in real-time.
 
-🔹 No Kafka required! Reads from `project_live.json` instead.
+🔹 No Kafka required! Reads file segments under `data/transport/` unless TRANSPORT is set.
 🔹 Real-time sentiment trends based on messages received.
 """
 
-import sys
-import pathlib
+from utils.utils_logger import logger, configure_logging
+from utils.utils_producer import load_environment
+from utils.utils_profiling import run_profiled
+from utils.utils_plotting import get_pyplot
+from utils.utils_envelope import decode_envelope, is_envelope
+from utils.utils_transport import create_transport
 
-# Dynamically add the project root to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))  # Ensure project root is in Python path
-
-print(f"DEBUG: Added {PROJECT_ROOT} to sys.path")  # Debugging line
-
-# Now import utils
-from utils.utils_logger import logger
-
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import json
+import os
 import time
 from collections import deque
 
-# Define file path for sentiment storage
-PROJECT_ROOT = pathlib.Path(__file__).parent.parent
-DATA_FILE = PROJECT_ROOT.joinpath("data", "project_live.json")
+def get_topic() -> str:
+    """Fetch the project topic from environment or use default."""
+    return os.getenv("PROJECT_TOPIC", "buzzline-topic")
+
+def get_consumer_group_id() -> str:
+    """Fetch the consumer group id from environment or use default."""
+    return os.getenv("PROJECT_CONSUMER_GROUP_ID", "project_group")
+
+# Seconds between chart refreshes
+REFRESH_INTERVAL_SECS = 2
 
 # Store recent sentiment values
 sentiment_values = deque(maxlen=50)  # Keep last 50 messages for trends
 timestamps = deque(maxlen=50)
 
-import os
-from dotenv import load_dotenv
-from utils.utils_consumer import create_kafka_consumer
-
-# Initialize Matplotlib figure
-fig, ax = plt.subplots()
-ax.axhline(0, color="gray", linestyle="dashed", linewidth=1)  # Neutral sentiment reference line
-ax.set_title("Kersha's Real-Time Sentiment Trend")
-ax.set_xlabel("Time")
-ax.set_ylabel("Sentiment Score")
-plt.xticks(rotation=45)
-
-def read_sentiment_data():
-    """Read the latest sentiment value from `project_live.json`."""
-    try:
-        with open(DATA_FILE, "r") as file:
-            lines = file.readlines()
-            if lines:
-                latest_entry = json.loads(lines[-1])  # Get the last message
-                return latest_entry
-    except (json.JSONDecodeError, FileNotFoundError):
+# Matplotlib is loaded in main(), and not at all when HEADLESS is set
+plt = None
+fig, ax = None, None
+
+def decode_latest(record):
+    """Return the newest message in a record: a JSON message or a columnar envelope."""
+    if is_envelope(record.value, record.headers):
+        return decode_envelope(record.value).messages()[-1]
+    return json.loads(record.value)
+
+def read_sentiment_data(consumer):
+    """Read every message that arrived since the last call and return the newest, or None."""
+    latest = None
+    while True:
+        batches = consumer.poll(timeout_ms=0)
+        if not batches:
+            return latest
+        for records in batches.values():
+            try:
+                latest = decode_latest(records[-1])
+            except (ValueError, KeyError) as e:
+                logger.error(f"Invalid message: {e}")
+
+def record_latest_sentiment(consumer):
+    """Read the latest sentiment value and store it. Returns the sentiment or None."""
+    new_data = read_sentiment_data(consumer)
+    if not new_data:
         return None
-    return None
 
-def update_chart(frame):
-    """Fetch new sentiment value from file and update the chart."""
-    new_data = read_sentiment_data()
+    timestamp = new_data.get("timestamp", time.strftime("%H:%M:%S"))  # Default to current time
+    sentiment = new_data.get("sentiment", 0)  # Default to neutral
 
-    if new_data:
-        timestamp = new_data.get("timestamp", time.strftime("%H:%M:%S"))  # Default to current time
-        sentiment = new_data.get("sentiment", 0)  # Default to neutral
+    # Store data
+    timestamps.append(timestamp)
+    sentiment_values.append(sentiment)
+    return sentiment
 
-        # Store data
-        timestamps.append(timestamp)
-        sentiment_values.append(sentiment)
+def update_chart(frame, consumer):
+    """Fetch the newest sentiment value and update the chart."""
+    sentiment = record_latest_sentiment(consumer)
 
+    if sentiment is not None:
         # Determine line color based on sentiment
         color = "green" if sentiment > 0.1 else "red" if sentiment < -0.1 else "yellow"
 
@@ -84,8 +90,57 @@ def update_chart(frame):
         plt.xticks(rotation=45)
         plt.tight_layout()
 
-# Animation loop
-ani = animation.FuncAnimation(fig, update_chart, interval=2000, cache_frame_data=False)
+def show_sentiment(consumer):
+    """Chart the sentiment from consumer until the window closes, or log it when headless."""
+    global plt, fig, ax
+    plt = get_pyplot()
+    if plt is None:
+        logger.info("Headless mode: logging sentiment instead of charting.")
+        try:
+            while True:
+                sentiment = record_latest_sentiment(consumer)
+                if sentiment is not None:
+                    logger.info(f"Latest sentiment: {sentiment}")
+                time.sleep(REFRESH_INTERVAL_SECS)
+        except KeyboardInterrupt:
+            logger.info("Consumer interrupted by user.")
+        return
+
+    import matplotlib.animation as animation
+
+    # Initialize Matplotlib figure
+    fig, ax = plt.subplots()
+    ax.axhline(0, color="gray", linestyle="dashed", linewidth=1)  # Neutral sentiment reference line
+    ax.set_title("Kersha's Real-Time Sentiment Trend")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Sentiment Score")
+    plt.xticks(rotation=45)
+
+    # Animation loop (keep a reference so it is not garbage collected)
+    ani = animation.FuncAnimation(
+        fig, update_chart, fargs=(consumer,), interval=REFRESH_INTERVAL_SECS * 1000, cache_frame_data=False
+    )
+
+    # Run visualization
+    plt.show()
+    del ani
+
+def main():
+    """Show the live sentiment chart, or log sentiment values when headless."""
+    load_environment()
+    configure_logging()
+    logger.info("START consumer.")
+    # File segments under data/transport/ unless TRANSPORT is set
+    transport = create_transport(default="file")
+    topic = get_topic()
+    logger.info(f"Reading sentiment from topic '{topic}'")
+    # Keep raw bytes: records may be JSON or columnar envelopes
+    consumer = transport.consumer(topic, get_consumer_group_id(), value_deserializer=lambda value: value)
+
+    try:
+        show_sentiment(consumer)
+    finally:
+        consumer.close()
 
-# Run visualization
-plt.show()
+if __name__ == "__main__":
+    run_profiled(main)
@@ -1,29 +1,20 @@
-import sys
-import pathlib
-
-# Dynamically add the project root to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))  # Ensure project root is in Python path
-
-print(f"DEBUG: Added {PROJECT_ROOT} to sys.path")  # Debugging line
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_profiling import run_profiled
+from utils.utils_producer import load_environment, serialize_json
+from utils.utils_rate import create_rate_scheduler
+from utils.utils_transport import create_transport
 
-# Now import utils
-from utils.utils_logger import logger
-
-import json
-import time
+import os
 import random
+import sys
 
 
-# Set up paths
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-DATA_FOLDER = PROJECT_ROOT.joinpath("data")
-DATA_FILE = DATA_FOLDER.joinpath("buzz.json")  # Ensure correct file
+def get_topic() -> str:
+    """Fetch the topic from environment or use default."""
+    return os.getenv("BASIC_BUZZ_TOPIC", "basic_buzz")
 
-logger.info(f"Project root: {PROJECT_ROOT}")
-logger.info(f"Data folder: {DATA_FOLDER}")
-logger.info(f"Data file: {DATA_FILE}")
+# Default pace: one message every 2 seconds (override with BASIC_BUZZ_MESSAGES_PER_SECOND)
+MESSAGE_INTERVAL_SECS = 2
 
 # List of sample messages & authors
 MESSAGES = [
@@ -47,47 +38,43 @@ def generate_message():
     }
     return message_data
 
-def write_message_to_file(message_data):
-    """Append a new message to the buzz.json file."""
+def send_message(producer, topic: str, message_data):
+    """Send a new message, keyed by author."""
     try:
-        # Read existing JSON content
-        if DATA_FILE.exists():
-            with open(DATA_FILE, "r") as file:
-                try:
-                    messages = json.load(file)  # Load existing list
-                except json.JSONDecodeError:
-                    logger.warning("Invalid JSON detected. Overwriting file.")
-                    messages = []
-        else:
-            messages = []
-
-        # Append new message
-        messages.append(message_data)
-
-        # Write updated list back to file
-        with open(DATA_FILE, "w") as file:
-            json.dump(messages, file, indent=4)
-
-        logger.info(f"New message written: {message_data}")
-
+        producer.send(topic, value=message_data)
+        log_sampled("INFO", "New message sent: {}", message_data)
     except Exception as e:
-        logger.error(f"Error writing message to file: {e}")
+        logger.error(f"Error sending message: {e}")
 
 def main():
-    """Continuously generate and write messages to buzz.json."""
+    """Continuously generate and send messages."""
+    load_environment()
+    configure_logging()
     logger.info("START producer.")
+    # File segments under data/transport/ unless TRANSPORT is set
+    transport = create_transport(default="file")
+    topic = get_topic()
+    logger.info(f"Topic: {topic}")
+    transport.create_topic(topic)
+    producer = transport.producer(value_serializer=serialize_json, key_field="author", file_prefix="BASIC_BUZZ")
+    if producer is None:
+        logger.error("Failed to create producer. Exiting...")
+        sys.exit(3)
+    scheduler = create_rate_scheduler("BASIC_BUZZ", MESSAGE_INTERVAL_SECS)
     try:
         while True:
+            scheduler.acquire()
             new_message = generate_message()
-            write_message_to_file(new_message)
-            time.sleep(2)  # Generate a new message every 2 seconds
+            send_message(producer, topic, new_message)
     except KeyboardInterrupt:
         logger.info("Producer interrupted by user.")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
+    finally:
+        producer.close()
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main)
 
 
 
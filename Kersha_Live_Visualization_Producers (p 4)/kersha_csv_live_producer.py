@@ -9,36 +9,22 @@ Stream numeric temperature data to a Kafka topic.
 #####################################
 import sys
 import pathlib
-
-# Dynamically add the project root to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))  # Ensure project root is in Python path
-
-print(f"DEBUG: Added {PROJECT_ROOT} to sys.path")  # Debugging line
-
-# Now import utils
-from utils.utils_logger import logger
-
 import os
-import time
-import csv
-import json
-from datetime import datetime
-from dotenv import load_dotenv
-from utils.utils_producer import (
-    verify_services,
-    create_kafka_producer,
-    create_kafka_topic,
-)
-from utils.utils_logger import logger
+from datetime import datetime, timezone
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_producer import load_environment
+from utils.utils_profiling import run_profiled
+from utils.utils_metrics import stage, start_metrics_server
+from utils.utils_rate import create_rate_scheduler
+from utils.utils_codec import get_smoker_serializer, get_smoker_wire_format
+from utils.utils_csv_ingest import read_temperature_batches
+from utils.utils_smoker_fleet import get_fleet_sensors, create_smoker_fleet
+from utils.utils_transport import create_transport
 
 #####################################
-# Load Environment Variables
+# Getter Functions for .env Variables
 #####################################
 
-load_dotenv()
-
 def get_kafka_topic() -> str:
     """Fetch Kafka topic from environment or use default."""
     topic = os.getenv("SMOKER_TOPIC", "smoker_csv")  # Default topic
@@ -58,30 +44,31 @@ def get_message_interval() -> int:
 PROJECT_ROOT = pathlib.Path(__file__).parent.parent
 DATA_FOLDER = PROJECT_ROOT.joinpath("data")
 DATA_FILE = DATA_FOLDER.joinpath("smoker_temps.csv")
-logger.info(f"Data file: {DATA_FILE}")
 
 #####################################
 # Message Generator
 #####################################
 
 def generate_messages(file_path: pathlib.Path):
-    """Read from a CSV file and yield records one by one."""
+    """
+    Read temperatures from a CSV file and yield records one by one.
+
+    The file is parsed in fixed-size chunks into NumPy arrays (see
+    utils_csv_ingest), so memory stays flat however large the file is.
+    """
     try:
-        with open(file_path, "r") as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            for row in csv_reader:
-                if "temperature" not in row:
-                    logger.error(f"Missing 'temperature' column in row: {row}")
-                    continue
-                current_timestamp = datetime.utcnow().isoformat()
-                message = {
-                    "timestamp": current_timestamp,
-                    "temperature": float(row["temperature"]),
+        for temperatures in read_temperature_batches(file_path):
+            for temperature in temperatures.tolist():
+                yield {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "temperature": temperature,
                 }
-                yield message
     except FileNotFoundError:
         logger.error(f"File not found: {file_path}. Exiting.")
         sys.exit(1)
+    except KeyError as e:
+        logger.error(f"Missing temperature column in {file_path}: {e}")
+        sys.exit(1)
 
 #####################################
 # Define main function
@@ -89,29 +76,53 @@ def generate_messages(file_path: pathlib.Path):
 
 def main():
     """Main function to send messages to Kafka."""
+    load_environment()
+    configure_logging()
     logger.info("START producer.")
-    verify_services()
+    logger.info(f"Data file: {DATA_FILE}")
+    start_metrics_server()
+    transport = create_transport()
+    transport.verify()
     topic = get_kafka_topic()
-    interval_secs = get_message_interval()
     
-    if not DATA_FILE.exists():
+    # SMOKER_WIRE_FORMAT picks JSON or the compact binary codec; the
+    # content-type header tells consumers which one each message uses
+    wire_format = get_smoker_wire_format()
+    
+    # SMOKER_FLEET_SENSORS > 0 simulates that many smokers in real time
+    # instead of replaying the data file; each reading is keyed by sensor.
+    # Pacing stays outside the "generate" stage so its timing excludes sleeps.
+    fleet_sensors = get_fleet_sensors()
+    if fleet_sensors > 0:
+        if wire_format == "binary":
+            # Binary records have no sensor_id field (see utils_codec)
+            logger.error("SMOKER_WIRE_FORMAT=binary cannot carry sensor_id. Use json with SMOKER_FLEET_SENSORS.")
+            sys.exit(1)
+        fleet = create_smoker_fleet(fleet_sensors)
+        # Without SMOKER_MESSAGES_PER_SECOND, readings are released in real time
+        scheduler = create_rate_scheduler("SMOKER", 1.0 / fleet.readings_per_sec)
+        messages = scheduler.paced(stage("generate").wrap(fleet.messages()))
+    elif not DATA_FILE.exists():
         logger.error(f"Data file not found: {DATA_FILE}. Exiting.")
         sys.exit(1)
+    else:
+        scheduler = create_rate_scheduler("SMOKER", get_message_interval())
+        messages = scheduler.paced(stage("generate").wrap(generate_messages(DATA_FILE)))
     
-    producer = create_kafka_producer(
-        value_serializer=lambda x: json.dumps(x).encode("utf-8")
-    )
+    serializer, headers = get_smoker_serializer(wire_format)
+    logger.info(f"Smoker wire format: {wire_format}")
+    producer = transport.producer(value_serializer=serializer, file_prefix="SMOKER")
     if not producer:
         logger.error("Failed to create Kafka producer. Exiting...")
         sys.exit(3)
     
-    create_kafka_topic(topic)  # Ensures topic is created before sending messages
+    transport.create_topic(topic, fresh=True)  # Ensures a clean topic before sending messages
     
     try:
-        for csv_message in generate_messages(DATA_FILE):
-            producer.send(topic, value=csv_message)
-            logger.info(f"Sent message to topic '{topic}': {csv_message}")
-            time.sleep(interval_secs)  # Wait before sending next message
+        for csv_message in messages:
+            producer.send(topic, value=csv_message, key=csv_message.get("sensor_id"), headers=headers)
+            if not fleet_sensors:
+                log_sampled("INFO", "Sent message to topic '{}': {}", topic, csv_message)
     except KeyboardInterrupt:
         logger.warning("Producer interrupted by user.")
     finally:
@@ -119,5 +130,5 @@ def main():
         logger.info("Kafka producer closed.")
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main)
 
@@ -1,7 +1,8 @@
 """
 kersha_json_live_producer.py
 
-Stream JSON data to a file and a Kafka topic.
+Stream JSON data to a Kafka topic, or to another transport with TRANSPORT
+(see utils_transport).
 
 Example JSON message:
 {
@@ -20,59 +21,51 @@ Example JSON message:
 #####################################
 
 import sys
-import pathlib
-import json
 import os
-import random
 import time
 from datetime import datetime
-from dotenv import load_dotenv
 
-# Dynamically add project root to sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.append(str(PROJECT_ROOT))
-
-print(f"DEBUG: Added {PROJECT_ROOT} to sys.path")  # Debugging line
+import numpy as np
 
 # Import utils
-from utils.utils_logger import logger
-
-# Import Kafka only if available
-try:
-    from kafka import KafkaProducer
-    KAFKA_AVAILABLE = True
-except ImportError:
-    KAFKA_AVAILABLE = False
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_profiling import run_profiled
+from utils.utils_rate import create_rate_scheduler
+from utils.utils_metrics import stage, start_metrics_server
+from utils.utils_keywords import create_keyword_matcher
+from utils.utils_sentiment import create_sentiment_scorer
+from utils.utils_producer import get_num_partitions, load_environment, partitioner_for_topic, serialize_json
+from utils.utils_envelope import create_envelope_batcher, envelope_flusher, send_envelopes, serialize_envelope
+from utils.utils_fanout import get_producer_workers, key_slice, run_workers
+from utils.utils_transport import create_transport
 
 #####################################
-# Load Environment Variables
+# Keyword Matcher and Sentiment Scorer
 #####################################
 
-load_dotenv()
+# Built on first use, after main() has loaded the environment.
+# Set KEYWORD_TAXONOMY_FILE to load a larger taxonomy, and SENTIMENT_ENGINE
+# to choose a registered scorer.
+_models = {"keywords": None, "sentiment": None, "templates": None}
 
-#####################################
-# Define Constants and Keyword Categories
-#####################################
 
-KEYWORD_CATEGORIES = {
-    "meme": "humor",
-    "Python": "tech",
-    "JavaScript": "tech",
-    "recipe": "food",
-    "travel": "travel",
-    "movie": "entertainment",
-    "game": "gaming",
-}
+def get_keyword_matcher():
+    """Return the keyword matcher, compiling it once."""
+    if _models["keywords"] is None:
+        _models["keywords"] = create_keyword_matcher()
+    return _models["keywords"]
 
-#####################################
-# Stub Sentiment Analysis Function
-#####################################
+
+def get_sentiment_scorer():
+    """Return the sentiment scorer, creating it once."""
+    if _models["sentiment"] is None:
+        _models["sentiment"] = create_sentiment_scorer()
+    return _models["sentiment"]
 
 
 def assess_sentiment(text: str) -> float:
-    """Stub for sentiment analysis - returns a random value."""
-    return round(random.uniform(0, 1), 2)
+    """Score message sentiment from -1.0 (negative) to 1.0 (positive)."""
+    return get_sentiment_scorer().score(text)
 
 
 #####################################
@@ -90,71 +83,135 @@ def get_kafka_topic() -> str:
     return os.getenv("BUZZ_TOPIC", "buzz_json")
 
 
-def get_kafka_server() -> str:
-    """Fetch Kafka server from .env or use default."""
-    return os.getenv("KAFKA_SERVER", "localhost:9092")
+def get_random_seed():
+    """Fetch random seed from .env, or None for a different stream each run."""
+    seed = os.getenv("BUZZ_RANDOM_SEED")
+    return int(seed) if seed else None
+
+
+#####################################
+# Define Message Vocabulary
+#####################################
+
+ADJECTIVES = ["amazing", "funny", "boring", "exciting", "weird"]
+ACTIONS = ["found", "saw", "tried", "shared", "loved"]
+TOPICS = [
+    "a movie",
+    "a meme",
+    "an app",
+    "a trick",
+    "a story",
+    "Python",
+    "JavaScript",
+    "recipe",
+    "travel",
+    "game",
+]
+AUTHORS = ["Alice", "Bob", "Charlie", "Eve", "Kersha"]  # Different authors
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+#####################################
+# Precompute Message Templates
+#####################################
+
+
+def build_message_templates() -> list:
+    """
+    Build every possible message text once, with its keyword, category, length and sentiment.
+
+    Templates are ordered so that index = (action * len(TOPICS) + topic) * len(ADJECTIVES) + adjective.
 
+    Returns:
+        list: Tuples of (message_text, keyword_mentioned, category, message_length, sentiment).
+    """
+    keyword_matcher = get_keyword_matcher()
+    templates = []
+    for action in ACTIONS:
+        for topic in TOPICS:
+            for adjective in ADJECTIVES:
+                message_text = f"I just {action} {topic}! It was {adjective}."
+                keyword_mentioned, category = keyword_matcher.categorize(message_text)
+                templates.append(
+                    (message_text, keyword_mentioned, category, len(message_text))
+                )
+    sentiments = get_sentiment_scorer().score_many([template[0] for template in templates])
+    return [template + (sentiment,) for template, sentiment in zip(templates, sentiments)]
+
+
+def get_message_templates() -> list:
+    """Return the message templates, building them once (see build_message_templates)."""
+    if _models["templates"] is None:
+        _models["templates"] = build_message_templates()
+    return _models["templates"]
 
 #####################################
-# Set up Paths
+# Timestamp Cache
 #####################################
 
-DATA_FILE = pathlib.Path(__file__).parent.joinpath("buzz.json")
+_timestamp_cache = {"second": None, "text": ""}
+
+
+def current_timestamp() -> str:
+    """Return the current time as text, formatting it at most once per second."""
+    second = int(time.time())
+    if second != _timestamp_cache["second"]:
+        _timestamp_cache["second"] = second
+        _timestamp_cache["text"] = datetime.fromtimestamp(second).strftime(TIMESTAMP_FORMAT)
+    return _timestamp_cache["text"]
+
 
 #####################################
 # Define Message Generator
 #####################################
 
 
-def generate_messages():
+def create_rng(seed: int = None) -> np.random.Generator:
+    """Create the random generator for messages. A fixed seed makes runs repeatable."""
+    return np.random.default_rng(seed)
+
+
+def draw_message_indices(rng: np.random.Generator, batch_size: int, num_authors: int):
     """
-    Generate a stream of JSON messages with different authors.
+    Draw template indices and author indices for a batch.
+
+    Returns:
+        tuple: Two Python lists of length batch_size.
     """
-    ADJECTIVES = ["amazing", "funny", "boring", "exciting", "weird"]
-    ACTIONS = ["found", "saw", "tried", "shared", "loved"]
-    TOPICS = [
-        "a movie",
-        "a meme",
-        "an app",
-        "a trick",
-        "a story",
-        "Python",
-        "JavaScript",
-        "recipe",
-        "travel",
-        "game",
-    ]
-    AUTHORS = ["Alice", "Bob", "Charlie", "Eve", "Kersha"]  # Different authors
+    template_idx = rng.integers(0, len(get_message_templates()), size=batch_size)
+    author_idx = rng.integers(0, num_authors, size=batch_size)
+    return template_idx.tolist(), author_idx.tolist()
 
-    while True:
-        adjective = random.choice(ADJECTIVES)
-        action = random.choice(ACTIONS)
-        topic = random.choice(TOPICS)
-        author = random.choice(AUTHORS)
-        message_text = f"I just {action} {topic}! It was {adjective}."
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # Find category based on keywords
-        keyword_mentioned = next(
-            (word for word in KEYWORD_CATEGORIES if word in topic), "other"
-        )
-        category = KEYWORD_CATEGORIES.get(keyword_mentioned, "other")
+def generate_messages(batch_size: int = 256, seed: int = None, authors: list = AUTHORS):
+    """
+    Generate a stream of JSON messages with different authors.
 
-        # Assess sentiment
-        sentiment = assess_sentiment(message_text)
+    Random draws are made in batches of batch_size, but each message is
+    built and timestamped when it is yielded, so slow (paced) streams
+    still carry the current time.
 
-        # Create JSON message
-        json_message = {
-            "message": message_text,
-            "author": author,
-            "timestamp": timestamp,
-            "category": category,
-            "sentiment": sentiment,
-            "keyword_mentioned": keyword_mentioned,
-            "message_length": len(message_text),
-        }
+    Args:
+        batch_size (int): Number of random draws made at once.
+        seed (int, optional): Seed for repeatable output.
+        authors (list): Authors to draw from. Defaults to AUTHORS.
+    """
+    rng = create_rng(seed)
+    templates = get_message_templates()
 
-        yield json_message
+    while True:
+        template_idx, author_idx = draw_message_indices(rng, batch_size, len(authors))
+        for t, a in zip(template_idx, author_idx):
+            message_text, keyword_mentioned, category, message_length, sentiment = templates[t]
+            yield {
+                "message": message_text,
+                "author": authors[a],
+                "timestamp": current_timestamp(),
+                "category": category,
+                "sentiment": sentiment,
+                "keyword_mentioned": keyword_mentioned,
+                "message_length": message_length,
+            }
 
 
 #####################################
@@ -162,55 +219,98 @@ def generate_messages():
 #####################################
 
 
-def main():
-    """Start the producer and send messages to Kafka and a file."""
-    logger.info("START producer...")
-    interval_secs = get_message_interval()
-    topic = get_kafka_topic()
-    kafka_server = get_kafka_server()
-
-    # Attempt to create Kafka producer
-    producer = None
-    if KAFKA_AVAILABLE:
-        try:
-            producer = KafkaProducer(
-                bootstrap_servers=kafka_server,
-                value_serializer=lambda x: json.dumps(x).encode("utf-8"),
-            )
-            logger.info(f"Kafka producer connected to {kafka_server}")
-        except Exception as e:
-            logger.error(f"Kafka connection failed: {e}")
-            producer = None
+def run_worker(worker_index: int = 0, num_workers: int = 1):
+    """
+    Run one producer loop over this worker's slice of the authors.
 
-    try:
-        for message in generate_messages():
-            logger.info(f"Generated message: {message}")
+    Messages are keyed by author, so each author's messages land on one
+    partition in order. Each worker sends its share of the BUZZ rate.
 
-            # Write to local JSON file
-            with open(DATA_FILE, "a") as f:
-                f.write(json.dumps(message) + "\n")
+    Args:
+        worker_index (int): This worker's index, from 0 to num_workers - 1.
+        num_workers (int): Total number of worker processes.
+    """
+    load_environment()
+    configure_logging()
+    authors = AUTHORS if num_workers == 1 else key_slice(AUTHORS, worker_index, num_workers)
+    if not authors:
+        logger.warning(f"Worker {worker_index} owns no authors. Exiting.")
+        return
+    logger.info(f"START producer worker {worker_index}/{num_workers} for authors {authors}...")
+    start_metrics_server()
+    scheduler = create_rate_scheduler("BUZZ", get_message_interval(), num_workers)
+    topic = get_kafka_topic()
+    seed = get_random_seed()
+    if seed is not None:
+        seed += worker_index
+
+    # Batched producer with delivery tracking. With BUZZ_ENVELOPE_MAX_MESSAGES > 1,
+    # messages bound for the same partition are packed into columnar envelopes
+    # keyed by their first author
+    transport = create_transport()
+    batcher = create_envelope_batcher("BUZZ", key_field="author")
+    if batcher:
+        batcher.group_by = partitioner_for_topic(topic, "author")
+    producer = transport.producer(
+        value_serializer=serialize_envelope if batcher else serialize_json,
+        key_field=None if batcher else "author",
+        file_prefix="BUZZ",
+    )
+    if producer is None:
+        logger.error("Failed to create producer. Exiting...")
+        sys.exit(3)
+
+    # Send envelopes that come due while waiting for the next message
+    on_wait = envelope_flusher(batcher, producer, topic) if batcher else None
 
-            # Send to Kafka if available
-            if producer:
+    try:
+        messages = stage("generate").wrap(generate_messages(seed=seed, authors=authors))
+        for message in scheduler.paced(messages, on_wait=on_wait):
+            if batcher:
+                send_envelopes(producer, topic, batcher.add(message))
+            else:
                 producer.send(topic, value=message)
-                logger.info(f"Sent message to Kafka topic '{topic}': {message}")
-
-            time.sleep(interval_secs)
+            log_sampled("INFO", "Sent message to topic '{}': {}", topic, message)
     except KeyboardInterrupt:
         logger.warning("Producer interrupted by user.")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
-        if producer:
-            producer.close()
-            logger.info("Kafka producer closed.")
+        if batcher:
+            send_envelopes(producer, topic, batcher.flush())
+        producer.close()
         logger.info("Producer shutting down.")
 
 
+def main():
+    """
+    Start the producer and send messages to the topic.
+
+    With PRODUCER_WORKERS > 1, one process is started per worker and each
+    owns a slice of the authors, up to one worker per author. The topic
+    is given at least as many partitions as there are workers. Workers
+    need Kafka: the file and memory transports take one writer process.
+    """
+    load_environment()
+    transport = create_transport()
+    num_workers = get_producer_workers()
+    if num_workers > 1 and not transport.supports_worker_processes:
+        logger.warning(f"The {transport.name} transport takes one producer process. Using 1 worker.")
+        num_workers = 1
+    if num_workers > len(AUTHORS):
+        logger.warning(f"{num_workers} workers requested for {len(AUTHORS)} authors. Using {len(AUTHORS)}.")
+        num_workers = len(AUTHORS)
+    transport.create_topic(get_kafka_topic(), num_partitions=max(num_workers, get_num_partitions()))
+    if num_workers == 1:
+        run_worker()
+        return
+    sys.exit(run_workers(run_worker, num_workers))
+
+
 #####################################
 # Conditional Execution
 #####################################
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main)
 
@@ -1,6 +1,7 @@
 """
 project_producer_case.py
-Stream JSON data to a file and - if available - a Kafka topic.
+Stream JSON data to a topic: file segments under data/transport/ by
+default, or Kafka / the memory broker with TRANSPORT (see utils_transport).
 
 Example JSON message
 {
@@ -18,54 +19,49 @@ Example JSON message
 # Import Modules
 #####################################
 
-import json
 import os
 import random
-import time
-import pathlib
+import sys
 from datetime import datetime
-from dotenv import load_dotenv
-
-# Import Kafka only if available
-try:
-    from kafka import KafkaProducer
-    KAFKA_AVAILABLE = True
-except ImportError:
-    KAFKA_AVAILABLE = False
 
 # Import logging utility
-from utils.utils_logger import logger
+from utils.utils_logger import logger, configure_logging, log_sampled
+from utils.utils_profiling import run_profiled
+from utils.utils_rate import create_rate_scheduler
+from utils.utils_metrics import stage, start_metrics_server
+from utils.utils_producer import load_environment, serialize_json
+from utils.utils_envelope import create_envelope_batcher, envelope_flusher, send_envelopes, serialize_envelope
+from utils.utils_transport import create_transport
+from utils.utils_keywords import create_keyword_matcher
+from utils.utils_sentiment import create_sentiment_scorer
 
 #####################################
-# Load Environment Variables
+# Keyword Matcher and Sentiment Scorer
 #####################################
 
-load_dotenv()
+# Built on first use, after main() has loaded the environment.
+# Set KEYWORD_TAXONOMY_FILE to load a larger taxonomy, and SENTIMENT_ENGINE
+# to choose a registered scorer.
+_models = {"keywords": None, "sentiment": None}
 
-#####################################
-# Define Constants and Keyword Categories
-#####################################
+def get_keyword_matcher():
+    """Return the keyword matcher, compiling it once."""
+    if _models["keywords"] is None:
+        _models["keywords"] = create_keyword_matcher()
+    return _models["keywords"]
 
-KEYWORD_CATEGORIES = {
-    "meme": "humor",
-    "Python": "tech",
-    "JavaScript": "tech",
-    "recipe": "food",
-    "travel": "travel",
-    "movie": "entertainment",
-    "game": "gaming",
-}
-
-#####################################
-# Stub Sentiment Analysis Function
-#####################################
+def get_sentiment_scorer():
+    """Return the sentiment scorer, creating it once."""
+    if _models["sentiment"] is None:
+        _models["sentiment"] = create_sentiment_scorer()
+    return _models["sentiment"]
 
 def assess_sentiment(text: str) -> float:
     """
-    Stub for sentiment analysis.
-    Returns a random float between 0 and 1 for now.
+    Score message sentiment.
+    Returns a float from -1.0 (negative) to 1.0 (positive), cached per text.
     """
-    return round(random.uniform(0, 1), 2)
+    return get_sentiment_scorer().score(text)
 
 #####################################
 # Getter Functions for Environment Variables
@@ -77,17 +73,6 @@ def get_message_interval() -> int:
 def get_kafka_topic() -> str:
     return os.getenv("PROJECT_TOPIC", "buzzline-topic")
 
-def get_kafka_server() -> str:
-    return os.getenv("KAFKA_SERVER", "localhost:9092")
-
-#####################################
-# Set up Paths
-#####################################
-
-PROJECT_ROOT = pathlib.Path(__file__).parent.parent
-DATA_FOLDER = PROJECT_ROOT.joinpath("data")
-DATA_FILE = DATA_FOLDER.joinpath("project_live.json")
-
 #####################################
 # Define Message Generator
 #####################################
@@ -100,6 +85,7 @@ def generate_messages():
     ACTIONS = ["found", "saw", "tried", "shared", "loved"]
     TOPICS = ["a movie", "a meme", "an app", "a trick", "a story", "Python", "JavaScript", "recipe", "travel", "game"]
     AUTHORS = ["Alice", "Bob", "Charlie", "Eve"]
+    keyword_matcher = get_keyword_matcher()
     
     while True:
         adjective = random.choice(ADJECTIVES)
@@ -109,9 +95,8 @@ def generate_messages():
         message_text = f"I just {action} {topic}! It was {adjective}."
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Find category based on keywords
-        keyword_mentioned = next((word for word in KEYWORD_CATEGORIES if word in topic), "other")
-        category = KEYWORD_CATEGORIES.get(keyword_mentioned, "other")
+        # Find category based on keywords anywhere in the message
+        keyword_mentioned, category = keyword_matcher.categorize(message_text)
         
         # Assess sentiment
         sentiment = assess_sentiment(message_text)
@@ -134,46 +119,44 @@ def generate_messages():
 #####################################
 
 def main():
+    load_environment()
+    configure_logging()
     logger.info("START producer...")
-    interval_secs = get_message_interval()
+    start_metrics_server()
+    scheduler = create_rate_scheduler("PROJECT", get_message_interval())
+    # File segments under data/transport/ unless TRANSPORT is set
+    transport = create_transport(default="file")
     topic = get_kafka_topic()
-    kafka_server = get_kafka_server()
-    
-    # Attempt to create Kafka producer
-    producer = None
-    if KAFKA_AVAILABLE:
-        try:
-            producer = KafkaProducer(
-                bootstrap_servers=kafka_server,
-                value_serializer=lambda x: json.dumps(x).encode("utf-8")
-            )
-            logger.info(f"Kafka producer connected to {kafka_server}")
-        except Exception as e:
-            logger.error(f"Kafka connection failed: {e}")
-            producer = None
-    
+    transport.create_topic(topic)
+
+    # Batched producer with delivery tracking. With PROJECT_ENVELOPE_MAX_MESSAGES > 1,
+    # messages are packed into columnar envelopes
+    batcher = create_envelope_batcher("PROJECT")
+    producer = transport.producer(
+        value_serializer=serialize_envelope if batcher else serialize_json, file_prefix="PROJECT"
+    )
+    if producer is None:
+        logger.error("Failed to create producer. Exiting...")
+        sys.exit(3)
+
+    # Send envelopes that come due while waiting for the next message
+    on_wait = envelope_flusher(batcher, producer, topic) if batcher else None
+
     try:
-        for message in generate_messages():
-            logger.info(message)
-            
-            # Write to file
-            with DATA_FILE.open("a") as f:
-                f.write(json.dumps(message) + "\n")
-            
-            # Send to Kafka if available
-            if producer:
+        for message in scheduler.paced(stage("generate").wrap(generate_messages()), on_wait=on_wait):
+            if batcher:
+                send_envelopes(producer, topic, batcher.add(message))
+            else:
                 producer.send(topic, value=message)
-                logger.info(f"Sent message to Kafka topic '{topic}': {message}")
-            
-            time.sleep(interval_secs)
+            log_sampled("INFO", "Sent message to topic '{}': {}", topic, message)
     except KeyboardInterrupt:
         logger.warning("Producer interrupted by user.")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
-        if producer:
-            producer.close()
-            logger.info("Kafka producer closed.")
+        if batcher:
+            send_envelopes(producer, topic, batcher.flush())
+        producer.close()
         logger.info("Producer shutting down.")
 
 #####################################
@@ -181,4 +164,4 @@ def main():
 #####################################
 
 if __name__ == "__main__":
-    main()
+    run_profiled(main)
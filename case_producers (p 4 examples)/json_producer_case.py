@@ -84,39 +84,46 @@ def generate_messages(file_path: pathlib.Path):
     """
     Read from a JSON file and yield them one by one, continuously.
 
+    The file is read once; later passes repeat the loaded entries.
+    To replay a file once with its recorded timing, use utils.utils_replay.
+
     Args:
         file_path (pathlib.Path): Path to the JSON file.
 
     Yields:
         dict: A dictionary containing the JSON data.
     """
+    try:
+        logger.info(f"Opening data file in read mode: {file_path}")
+        with open(file_path, "r") as json_file:
+            logger.info(f"Reading data from file: {file_path}")
+
+            # Load the JSON file as a list of dictionaries
+            json_data: list = json.load(json_file)
+
+        if not isinstance(json_data, list):
+            raise ValueError(
+                f"Expected a list of JSON objects, got {type(json_data)}."
+            )
+    except FileNotFoundError:
+        logger.error(f"File not found: {file_path}. Exiting.")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON format in file: {file_path}. Error: {e}")
+        sys.exit(2)
+    except Exception as e:
+        logger.error(f"Unexpected error in message generation: {e}")
+        sys.exit(3)
+
+    if not json_data:
+        logger.error(f"No entries in data file: {file_path}. Exiting.")
+        sys.exit(2)
+
+    # Iterate over the entries, starting again at the end
     while True:
-        try:
-            logger.info(f"Opening data file in read mode: {DATA_FILE}")
-            with open(DATA_FILE, "r") as json_file:
-                logger.info(f"Reading data from file: {DATA_FILE}")
-
-                # Load the JSON file as a list of dictionaries
-                json_data: list = json.load(json_file)
-
-                if not isinstance(json_data, list):
-                    raise ValueError(
-                        f"Expected a list of JSON objects, got {type(json_data)}."
-                    )
-
-                # Iterate over the entries in the JSON file
-                for buzz_entry in json_data:
-                    logger.debug(f"Generated JSON: {buzz_entry}")
-                    yield buzz_entry
-        except FileNotFoundError:
-            logger.error(f"File not found: {file_path}. Exiting.")
-            sys.exit(1)
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON format in file: {file_path}. Error: {e}")
-            sys.exit(2)
-        except Exception as e:
-            logger.error(f"Unexpected error in message generation: {e}")
-            sys.exit(3)
+        for buzz_entry in json_data:
+            logger.debug(f"Generated JSON: {buzz_entry}")
+            yield buzz_entry
 
 
 #####################################
@@ -34,7 +34,8 @@ except ImportError:
     KAFKA_AVAILABLE = False
 
 # Import logging utility
-from utils.utils_logger import logger
+from utils.utils_logger import logger, log_sampled
+from utils.utils_file_sink import create_file_sink
 
 #####################################
 # Load Environment Variables
@@ -152,18 +153,20 @@ def main():
             logger.error(f"Kafka connection failed: {e}")
             producer = None
     
+    # Lines are appended by a background writer (group commit, see utils_file_sink)
+    sink = create_file_sink(DATA_FILE, "PROJECT")
+
     try:
         for message in generate_messages():
-            logger.info(message)
+            log_sampled("INFO", "{}", message)
             
             # Write to file
-            with DATA_FILE.open("a") as f:
-                f.write(json.dumps(message) + "\n")
+            sink.write_record(message)
             
             # Send to Kafka if available
             if producer:
                 producer.send(topic, value=message)
-                logger.info(f"Sent message to Kafka topic '{topic}': {message}")
+                log_sampled("INFO", "Sent message to Kafka topic '{}': {}", topic, message)
             
             time.sleep(interval_secs)
     except KeyboardInterrupt:
@@ -174,6 +177,7 @@ def main():
         if producer:
             producer.close()
             logger.info("Kafka producer closed.")
+        sink.close()
         logger.info("Producer shutting down.")
 
 #####################################
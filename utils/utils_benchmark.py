@@ -0,0 +1,531 @@
+"""
+utils_benchmark.py - end-to-end throughput and latency of each producer/consumer pair.
+
+Each scenario runs one Kersha producer and its consumer together in one
+process, using their own code: the producer's message generator and
+send path, and the consumer's read loop and process_message. Every pair
+goes through a local transport (see utils_transport) instead of a broker
+on localhost:9092: the in-process memory broker by default, or file
+segments in a temporary folder with --transport file. Charts are off
+(HEADLESS), and console logging is limited to warnings.
+
+Scenarios, one per producer/consumer pair:
+    basic_json  basic JSON producer -> BufferedProducer -> transport -> basic JSON consumer
+    json        JSON producer -> BufferedProducer -> transport -> JSON consumer
+    csv         CSV producer -> BufferedProducer -> transport -> CSV consumer (poll batches)
+    project     project producer -> BufferedProducer -> transport -> project consumer
+
+Each scenario runs in a fresh child process, once per rate: a fixed
+msgs/s (paced by utils_rate) or "max". For each run it reports:
+    msgs_per_sec           messages handled by the consumer per second, first send to last handled
+    producer_msgs_per_sec  messages sent per second
+    latency_p50_ms, latency_p99_ms, latency_max_ms
+                           send() to the end of the consumer's processing, per message
+    cpu_secs, cpu_pct      process CPU time (user + system) and its share of wall time
+    peak_rss_mb            peak resident memory of the child process (Unix only)
+
+The project consumer only keeps the newest message on each refresh, so
+its latency is how long a message waits until a refresh reads it or a
+newer one (BENCHMARK_REFRESH_SECS, default 0.1, instead of
+the consumer's 2 second chart refresh).
+
+Results are written as JSON with the git commit, so runs can be
+compared across commits:
+
+    python -m utils.utils_benchmark
+    python -m utils.utils_benchmark --scenarios json,csv --rates 500,5000,max --messages 50000
+    python -m utils.utils_benchmark --scenarios json,csv --transport file
+    python -m utils.utils_benchmark --compare benchmarks/20250301-101500-1a2b3c4.json
+
+Environment variables (defaults for the command line options):
+    BENCHMARK_MESSAGES      Messages per run (default 20000).
+    BENCHMARK_RATES         Comma-separated rates, msgs/s or max (default 1000,max).
+    BENCHMARK_DIR           Folder for result files (default benchmarks).
+    BENCHMARK_REFRESH_SECS  Project consumer refresh interval (default 0.1).
+    BENCHMARK_TRANSPORT     Transport for every pair, memory or file (default memory).
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import argparse
+import importlib.util
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_logger import logger, configure_logging
+
+#####################################
+# Default Configurations
+#####################################
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+PRODUCERS = PROJECT_ROOT.joinpath("Kersha_Live_Visualization_Producers (p 4)")
+CONSUMERS = PROJECT_ROOT.joinpath("Kersha_Live_Visualization_Consumers (p 4)")
+
+SCENARIOS = ("basic_json", "json", "csv", "project")
+# Earlier scenario names, so --compare still matches older reports
+RENAMED_SCENARIOS = {
+    "basic_json_file": "basic_json",
+    "json_kafka": "json",
+    "csv_kafka": "csv",
+    "project_file": "project",
+}
+DEFAULT_MESSAGES = 20_000
+DEFAULT_RATES = "1000,max"
+DEFAULT_BENCHMARK_DIR = pathlib.Path("benchmarks")
+DEFAULT_REFRESH_SECS = 0.1
+BENCHMARK_TRANSPORTS = ("memory", "file")
+DEFAULT_BENCHMARK_TRANSPORT = "memory"
+
+# Consumers give up after this long without a new message
+DRAIN_TIMEOUT_SECS = 30
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+# Settings for every child process
+CHILD_ENVIRONMENT = {
+    "HEADLESS": "true",
+    "LOG_CONSOLE_LEVEL": "WARNING",
+    "METRICS_PORT": "0",
+    "PROFILE": "",
+}
+
+
+def get_benchmark_messages() -> int:
+    """Fetch messages per run from environment or use default."""
+    return int(os.getenv("BENCHMARK_MESSAGES", DEFAULT_MESSAGES))
+
+
+def get_benchmark_rates() -> str:
+    """Fetch the comma-separated rates from environment or use default."""
+    return os.getenv("BENCHMARK_RATES", DEFAULT_RATES)
+
+
+def get_benchmark_dir() -> pathlib.Path:
+    """Fetch the result folder from environment or use default."""
+    return pathlib.Path(os.getenv("BENCHMARK_DIR", DEFAULT_BENCHMARK_DIR))
+
+
+def get_refresh_secs() -> float:
+    """Fetch the project consumer refresh interval from environment or use default."""
+    return float(os.getenv("BENCHMARK_REFRESH_SECS", DEFAULT_REFRESH_SECS))
+
+
+def get_benchmark_transport() -> str:
+    """Fetch the transport for the benchmark pairs from environment or use default."""
+    return os.getenv("BENCHMARK_TRANSPORT", DEFAULT_BENCHMARK_TRANSPORT)
+
+
+def load_script(path: pathlib.Path):
+    """Import a producer or consumer script by path (the folders are not packages)."""
+    spec = importlib.util.spec_from_file_location(f"benchmark_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+#####################################
+# Scenarios
+#####################################
+#
+# Each scenario returns (messages, send, consume, close):
+#   messages      iterator of producer messages
+#   send(i, m)    send message number i the producer's way
+#   consume(handled, stop)
+#                 consumer loop; sets handled[i] = time.perf_counter() once
+#                 message i is processed, and returns when all are or stop is set
+#   close()       producer-side shutdown (flush and close)
+
+
+def _transport_pair(topic: str, value_serializer, key_field: str = None):
+    """A BufferedProducer and a raw-bytes consumer on the TRANSPORT set for this run."""
+    from utils.utils_producer import create_buffered_producer, create_kafka_topic
+    from utils.utils_transport import create_consumer_client, get_transport
+
+    create_kafka_topic(topic)
+    producer = create_buffered_producer(value_serializer=value_serializer, key_field=key_field)
+    consumer = create_consumer_client(
+        get_transport(), topic, "benchmark", lambda value: value, consumer_timeout_ms=DRAIN_TIMEOUT_SECS * 1000
+    )
+    return producer, consumer
+
+
+def _basic_json(num_messages: int, tmp: pathlib.Path):
+    from utils.utils_producer import serialize_json
+
+    producer_script = load_script(PRODUCERS / "kersha_basic_json_live_producer.py")
+    consumer_script = load_script(CONSUMERS / "kersha_basic_json_live_consumer.py")
+    topic = "benchmark_basic"
+    producer, consumer = _transport_pair(topic, serialize_json, key_field="author")
+    consumer_script.init_chart()
+
+    def send(i, message):
+        producer_script.send_message(producer, topic, message)
+
+    def consume(handled, stop):
+        try:
+            for i, record in zip(range(num_messages), consumer):
+                consumer_script.process_message(json.loads(record.value))
+                handled[i] = time.perf_counter()
+        finally:
+            consumer.close()
+
+    return iter(producer_script.generate_message, None), send, consume, producer.close
+
+
+def _json(num_messages: int, tmp: pathlib.Path):
+    from utils.utils_producer import serialize_json
+
+    producer_script = load_script(PRODUCERS / "kersha_json_live_producer.py")
+    consumer_script = load_script(CONSUMERS / "kersha_json_live_consumer.py")
+    topic = "benchmark_json"
+    producer, consumer = _transport_pair(topic, serialize_json, key_field="author")
+    consumer_script.init_chart()
+
+    def send(i, message):
+        producer.send(topic, value=message)
+
+    def consume(handled, stop):
+        i = 0
+        try:
+            for record in consumer:
+                consumer_script.process_message(record.value, record.headers)
+                handled[i] = time.perf_counter()
+                i += 1
+                if i == num_messages:
+                    return
+        finally:
+            consumer.close()
+
+    return producer_script.generate_messages(seed=0), send, consume, producer.close
+
+
+def _csv(num_messages: int, tmp: pathlib.Path):
+    from utils.utils_codec import get_smoker_serializer
+
+    producer_script = load_script(PRODUCERS / "kersha_csv_live_producer.py")
+    consumer_script = load_script(CONSUMERS / "kersha_csv_live_consumer.py")
+    topic = "benchmark_smoker"
+    serializer, headers = get_smoker_serializer()
+    producer, consumer = _transport_pair(topic, serializer)
+    consumer_script.init_chart()
+
+    def messages():
+        # The CSV file is short; replay it as often as needed
+        while True:
+            yield from producer_script.generate_messages(producer_script.DATA_FILE)
+
+    def send(i, message):
+        producer.send(topic, value=message, key=message.get("sensor_id"), headers=headers)
+
+    def consume(handled, stop):
+        i = 0
+        try:
+            while i < num_messages and not stop.is_set():
+                batches = consumer.poll(
+                    timeout_ms=consumer_script.POLL_TIMEOUT_MS, max_records=consumer_script.POLL_MAX_RECORDS
+                )
+                for records in batches.values():
+                    consumer_script.process_records(records)
+                    handled[i:i + len(records)] = time.perf_counter()
+                    i += len(records)
+        finally:
+            consumer.close()
+
+    return messages(), send, consume, producer.close
+
+
+def _project(num_messages: int, tmp: pathlib.Path):
+    from utils.utils_producer import serialize_json
+
+    producer_script = load_script(PRODUCERS / "project_producer_case.py")
+    consumer_script = load_script(CONSUMERS / "project_consumer_kersha.py")
+    topic = "benchmark_project"
+    producer, consumer = _transport_pair(topic, serialize_json)
+    refresh_secs = get_refresh_secs()
+
+    # Keep the newest message the consumer read, to see which one it is
+    read_sentiment_data = consumer_script.read_sentiment_data
+    latest = {}
+
+    def read_and_keep(consumer):
+        entry = read_sentiment_data(consumer)
+        if entry:
+            latest["entry"] = entry
+        return entry
+
+    consumer_script.read_sentiment_data = read_and_keep
+
+    def send(i, message):
+        message["benchmark_seq"] = i
+        producer.send(topic, value=message)
+
+    def consume(handled, stop):
+        seen = 0
+        try:
+            while seen < num_messages and not stop.wait(refresh_secs):
+                consumer_script.record_latest_sentiment(consumer)
+                entry = latest.get("entry")
+                if entry:
+                    newest = entry["benchmark_seq"] + 1
+                    handled[seen:newest] = time.perf_counter()
+                    seen = max(seen, newest)
+        finally:
+            consumer.close()
+
+    return producer_script.generate_messages(), send, consume, producer.close
+
+
+SCENARIO_BUILDERS = {
+    "basic_json": _basic_json,
+    "json": _json,
+    "csv": _csv,
+    "project": _project,
+}
+
+
+#####################################
+# Run One Scenario (Child Process)
+#####################################
+
+
+def _peak_rss_mb():
+    """Return this process's peak resident memory in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_scenario(scenario: str, rate: str, num_messages: int) -> dict:
+    """
+    Run one producer/consumer pair in this process and measure it.
+
+    Args:
+        scenario (str): Name in SCENARIOS.
+        rate (str): Messages per second, or "max".
+        num_messages (int): Messages to send.
+
+    Returns:
+        dict: Throughput, latency, CPU and memory figures.
+    """
+    from utils.utils_rate import MAX_SPEED, RateScheduler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TRANSPORT_DIR"] = str(pathlib.Path(tmp, "transport"))
+        messages, send, consume, close = SCENARIO_BUILDERS[scenario](num_messages, pathlib.Path(tmp))
+        scheduler = RateScheduler(None if rate == MAX_SPEED else float(rate))
+        rss_before_mb = _peak_rss_mb()
+
+        sent = np.zeros(num_messages)
+        handled = np.full(num_messages, np.nan)
+        stop = threading.Event()
+        consumer = threading.Thread(target=consume, args=(handled, stop), name="benchmark-consumer", daemon=True)
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        consumer.start()
+        perf_counter = time.perf_counter
+        acquire = scheduler.acquire
+        for i, message in zip(range(num_messages), messages):
+            acquire()
+            sent[i] = perf_counter()
+            send(i, message)
+        produced_at = perf_counter()
+        close()
+
+        consumer.join(DRAIN_TIMEOUT_SECS)
+        stop.set()
+        consumer.join(1)
+        wall_secs = perf_counter() - wall_start
+        cpu_secs = time.process_time() - cpu_start
+
+    delivered = int(np.count_nonzero(~np.isnan(handled)))
+    latency_ms = (handled - sent)[~np.isnan(handled)] * 1000
+    last_handled = np.nanmax(handled) if delivered else produced_at
+    result = {
+        "scenario": scenario,
+        "transport": os.getenv("TRANSPORT"),
+        "rate": rate,
+        "messages": num_messages,
+        "delivered": delivered,
+        "msgs_per_sec": round(delivered / (last_handled - sent[0])) if delivered else 0,
+        "producer_msgs_per_sec": round(num_messages / (produced_at - sent[0])),
+        "latency_p50_ms": round(float(np.percentile(latency_ms, 50)), 3) if delivered else None,
+        "latency_p99_ms": round(float(np.percentile(latency_ms, 99)), 3) if delivered else None,
+        "latency_max_ms": round(float(latency_ms.max()), 3) if delivered else None,
+        "wall_secs": round(wall_secs, 3),
+        "cpu_secs": round(cpu_secs, 3),
+        "cpu_pct": round(cpu_secs / wall_secs * 100, 1),
+        "rss_before_mb": rss_before_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if delivered < num_messages:
+        logger.warning(f"{scenario} at {rate}: only {delivered} of {num_messages} messages were handled.")
+    return result
+
+
+#####################################
+# Run the Suite (Parent Process)
+#####################################
+
+
+def _git(*args):
+    """Return the output of a git command in the project, or None."""
+    try:
+        completed = subprocess.run(
+            ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=30, check=True
+        )
+        return completed.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_child(scenario: str, rate: str, num_messages: int, transport: str = DEFAULT_BENCHMARK_TRANSPORT) -> dict:
+    """Run one scenario in a fresh Python process and return its result."""
+    env = {**os.environ, **CHILD_ENVIRONMENT, "TRANSPORT": transport}
+    command = [
+        sys.executable, "-m", "utils.utils_benchmark",
+        "--child", scenario, "--rates", rate, "--messages", str(num_messages),
+    ]
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    logger.error(f"{scenario} at {rate} failed (exit code {completed.returncode}):\n{completed.stderr[-2000:]}")
+    return {"scenario": scenario, "rate": rate, "messages": num_messages, "error": completed.returncode}
+
+
+def run_suite(scenarios: list, rates: list, num_messages: int, transport: str = DEFAULT_BENCHMARK_TRANSPORT) -> dict:
+    """Run every scenario at every rate and return the results with run details."""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "messages": num_messages,
+        "transport": transport,
+        "results": [],
+    }
+    for scenario in scenarios:
+        for rate in rates:
+            logger.info(f"Running {scenario} at {rate} msgs/s with {num_messages} messages...")
+            result = run_child(scenario, rate, num_messages, transport)
+            logger.info(f"{scenario} at {rate}: {result}")
+            report["results"].append(result)
+    return report
+
+
+def write_report(report: dict, output: pathlib.Path = None) -> pathlib.Path:
+    """Write the report as JSON, by default to BENCHMARK_DIR/<time>-<commit>.json."""
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = get_benchmark_dir() / f"{stamp}-{(report['commit'] or 'nogit')[:7]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    logger.info(f"Benchmark results written to {output}")
+    return output
+
+
+def compare_reports(baseline: dict, report: dict) -> list:
+    """
+    Compare two reports run by run.
+
+    Returns:
+        list: One dict per scenario and rate found in both, with the
+              throughput ratio (new / old) and p99 latency of each.
+    """
+    def key_of(result):
+        scenario = RENAMED_SCENARIOS.get(result["scenario"], result["scenario"])
+        return scenario, result.get("transport"), result["rate"]
+
+    old = {key_of(r): r for r in baseline["results"] if "error" not in r}
+    rows = []
+    for new in report["results"]:
+        key = key_of(new)
+        if "error" in new or key not in old or not old[key]["msgs_per_sec"]:
+            continue
+        rows.append({
+            "scenario": new["scenario"],
+            "transport": new.get("transport"),
+            "rate": new["rate"],
+            "msgs_per_sec_ratio": round(new["msgs_per_sec"] / old[key]["msgs_per_sec"], 3),
+            "latency_p99_ms": (old[key]["latency_p99_ms"], new["latency_p99_ms"]),
+            "cpu_secs": (old[key]["cpu_secs"], new["cpu_secs"]),
+        })
+    return rows
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main(argv=None):
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark each producer/consumer pair end to end.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--rates", default=get_benchmark_rates(), help="Comma-separated msgs/s, or max")
+    parser.add_argument("--messages", type=int, default=get_benchmark_messages(), help="Messages per run")
+    parser.add_argument("--transport", default=get_benchmark_transport(), choices=BENCHMARK_TRANSPORTS,
+                        help="Transport for every pair")
+    parser.add_argument("--output", type=pathlib.Path, help="Result file (default BENCHMARK_DIR/<time>-<commit>.json)")
+    parser.add_argument("--compare", type=pathlib.Path, help="Earlier result file to compare with")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    rates = [rate.strip() for rate in args.rates.split(",") if rate.strip()]
+    if args.child:
+        result = run_scenario(args.child, rates[0], args.messages)
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {unknown}; choose from {', '.join(SCENARIOS)}")
+
+    report = run_suite(scenarios, rates, args.messages, args.transport)
+    write_report(report, args.output)
+    for result in report["results"]:
+        if "error" in result:
+            continue
+        logger.info(
+            f"{result['scenario']:>16} {result['rate']:>6}: {result['msgs_per_sec']:>8} msgs/s, "
+            f"p50 {result['latency_p50_ms']} ms, p99 {result['latency_p99_ms']} ms, "
+            f"CPU {result['cpu_pct']}%, peak RSS {result['peak_rss_mb']} MB"
+        )
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        logger.info(f"Compared with {args.compare} (commit {baseline.get('commit')}):")
+        for row in compare_reports(baseline, report):
+            logger.info(f"  {row}")
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
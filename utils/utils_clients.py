@@ -0,0 +1,228 @@
+"""
+utils_clients.py - one set of Kafka clients per process.
+
+Readiness checks, topic creation and topic resets used to open and
+close their own KafkaAdminClient, so a producer start paid for several
+bootstrap and metadata round trips. The registry here keeps one admin
+client and one metadata consumer per broker address, reuses producers
+built with the same settings, and caches cluster and topic metadata for
+a short TTL. Everything it holds is closed once at interpreter exit.
+
+Shared clients get bounded request timeouts, so a dead broker makes a
+metadata call fail instead of hanging. A failed call drops the broker's
+cached metadata and is remembered (see failed_since), so cached answers
+such as "Kafka is ready" are not reused after the connection broke.
+
+kafka-python is imported when the first client is created.
+
+Environment variables:
+    KAFKA_METADATA_TTL_SECONDS  How long cached metadata stays valid (default 30).
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import atexit
+import os
+import threading
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_METADATA_TTL_SECS = 30.0
+# Same bound as a topic reset (utils_producer.reset_kafka_topic)
+DEFAULT_REQUEST_TIMEOUT_MS = 10_000
+
+
+def get_metadata_ttl() -> float:
+    """Fetch metadata cache TTL in seconds from environment or use default."""
+    return float(os.getenv("KAFKA_METADATA_TTL_SECONDS", DEFAULT_METADATA_TTL_SECS))
+
+
+#####################################
+# Client Registry
+#####################################
+
+
+class KafkaClientRegistry:
+    """
+    Process-wide cache of Kafka clients and metadata.
+
+    Clients are keyed by (kind, broker, ...). Metadata entries expire after
+    metadata_ttl_secs and can be dropped early with invalidate().
+    """
+
+    def __init__(self, metadata_ttl_secs: float = None):
+        self.metadata_ttl_secs = (
+            get_metadata_ttl() if metadata_ttl_secs is None else metadata_ttl_secs
+        )
+        self._clients = {}
+        self._tracked = []
+        self._metadata = {}
+        self._failures = {}  # broker -> time.monotonic() of the last failed call
+        self._lock = threading.RLock()
+
+    #####################################
+    # Clients
+    #####################################
+
+    def get_or_create(self, key: tuple, factory):
+        """
+        Return the client stored under key, creating it with factory() if needed.
+
+        Args:
+            key (tuple): Cache key, starting with the client kind and broker.
+            factory (callable): Builds the client on first use.
+        """
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+                logger.debug(f"Created shared Kafka client {key[:2]}.")
+            return client
+
+    def discard(self, key: tuple) -> None:
+        """Forget a shared client without closing it (its owner closed it)."""
+        with self._lock:
+            self._clients.pop(key, None)
+
+    def track(self, client) -> None:
+        """Close an unshared client (such as a group consumer) at exit."""
+        with self._lock:
+            self._tracked.append(client)
+
+    def admin(self, kafka_broker: str):
+        """Return the shared KafkaAdminClient for a broker."""
+        from kafka.admin import KafkaAdminClient
+
+        return self.get_or_create(
+            ("admin", kafka_broker),
+            lambda: KafkaAdminClient(
+                bootstrap_servers=kafka_broker,
+                request_timeout_ms=DEFAULT_REQUEST_TIMEOUT_MS,
+            ),
+        )
+
+    def metadata_consumer(self, kafka_broker: str):
+        """Return a shared group-less KafkaConsumer for offset and partition lookups."""
+        from kafka import KafkaConsumer
+
+        return self.get_or_create(
+            ("metadata_consumer", kafka_broker),
+            # Must be longer than the consumer's default session timeout (10 s)
+            lambda: KafkaConsumer(
+                bootstrap_servers=kafka_broker,
+                request_timeout_ms=DEFAULT_REQUEST_TIMEOUT_MS + 500,
+            ),
+        )
+
+    #####################################
+    # Metadata Cache
+    #####################################
+
+    def _cached(self, key: tuple, fetch, refresh: bool):
+        """Return a cached metadata value, fetching it if missing, stale or refresh is set."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._metadata.get(key)
+            if entry is not None and not refresh and now - entry[0] < self.metadata_ttl_secs:
+                return entry[1]
+        try:
+            value = fetch()
+        except Exception:
+            self.connection_failed(key[1])
+            raise
+        with self._lock:
+            self._metadata[key] = (time.monotonic(), value)
+        return value
+
+    def connection_failed(self, kafka_broker: str = None) -> None:
+        """
+        Record that a call to a broker failed and drop its cached metadata.
+
+        Args:
+            kafka_broker (str, optional): The broker, or None for all brokers.
+        """
+        with self._lock:
+            self._failures[kafka_broker] = time.monotonic()
+        self.invalidate(kafka_broker)
+
+    def failed_since(self, kafka_broker: str, since: float) -> bool:
+        """Return True if a call to kafka_broker failed after time.monotonic() value since."""
+        with self._lock:
+            last = max(self._failures.get(kafka_broker, -1.0), self._failures.get(None, -1.0))
+        return last >= since
+
+    def describe_cluster(self, kafka_broker: str, refresh: bool = False) -> dict:
+        """Return cluster metadata (brokers and controller)."""
+        return self._cached(
+            ("cluster", kafka_broker),
+            lambda: self.admin(kafka_broker).describe_cluster(),
+            refresh,
+        )
+
+    def list_topics(self, kafka_broker: str, refresh: bool = False) -> list:
+        """Return the names of all topics."""
+        return self._cached(
+            ("topics", kafka_broker),
+            lambda: self.admin(kafka_broker).list_topics(),
+            refresh,
+        )
+
+    def describe_topic(self, kafka_broker: str, topic_name: str, refresh: bool = False) -> dict:
+        """Return metadata for one topic, including its partitions."""
+        return self._cached(
+            ("topic", kafka_broker, topic_name),
+            lambda: self.admin(kafka_broker).describe_topics([topic_name])[0],
+            refresh,
+        )
+
+    def invalidate(self, kafka_broker: str = None, topic_name: str = None) -> None:
+        """
+        Drop cached metadata.
+
+        Args:
+            kafka_broker (str, optional): Only drop entries for this broker.
+            topic_name (str, optional): Only drop the topic list and this topic.
+        """
+        with self._lock:
+            for key in list(self._metadata):
+                if kafka_broker is not None and key[1] != kafka_broker:
+                    continue
+                if topic_name is not None and key[0] == "topic" and key[2] != topic_name:
+                    continue
+                if topic_name is not None and key[0] == "cluster":
+                    continue
+                del self._metadata[key]
+
+    #####################################
+    # Shutdown
+    #####################################
+
+    def close_all(self) -> None:
+        """Close every shared and tracked client."""
+        with self._lock:
+            clients = list(self._clients.values()) + self._tracked
+            self._clients.clear()
+            self._tracked.clear()
+            self._metadata.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.error(f"Error closing Kafka client: {e}")
+        if clients:
+            logger.info(f"Closed {len(clients)} Kafka client(s).")
+
+
+# One registry per process, closed at interpreter exit
+registry = KafkaClientRegistry()
+atexit.register(registry.close_all)
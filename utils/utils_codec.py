@@ -0,0 +1,353 @@
+"""
+utils_codec.py - compact binary wire format for smoker temperature readings.
+
+A JSON reading such as {"timestamp": "2025-01-11T18:15:00.123456",
+"temperature": 225.0} takes about 60 bytes and a json.loads() per
+message. The binary format packs each reading into 13 bytes:
+
+    offset  size  type     field
+    0       1     uint8    schema version (currently 1)
+    1       8     int64    timestamp, microseconds since the Unix epoch (UTC)
+    9       4     float32  temperature
+
+All fields are little-endian with no padding. One payload may hold
+several readings back to back; decode_smoker_batch() reads any number of
+them with a single numpy.frombuffer() call.
+
+Producers tag each message with a "content-type" Kafka header, so a
+consumer knows which codec to use. Messages without the header are
+sniffed: JSON starts with "{", binary starts with the schema version.
+
+Switch producers to binary with SMOKER_WIRE_FORMAT=binary only after
+every consumer of the topic uses decode_smoker_payload(); the default
+stays JSON so existing consumers keep working.
+
+Environment variables:
+    SMOKER_WIRE_FORMAT  json or binary (default json).
+
+Run this module directly to compare size and decode speed:
+
+    python -m utils.utils_codec
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import json
+import os
+import struct
+import time
+from datetime import datetime, timezone
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Wire Format Definitions
+#####################################
+
+SCHEMA_VERSION = 1
+
+CONTENT_TYPE_HEADER = "content-type"
+JSON_CONTENT_TYPE = "application/json"
+SMOKER_CONTENT_TYPE = f"application/x-smoker-reading.v{SCHEMA_VERSION}"
+
+WIRE_FORMATS = {
+    "json": JSON_CONTENT_TYPE,
+    "binary": SMOKER_CONTENT_TYPE,
+}
+DEFAULT_WIRE_FORMAT = "json"
+
+SMOKER_HEADERS = [(CONTENT_TYPE_HEADER, SMOKER_CONTENT_TYPE.encode("ascii"))]
+
+# One record: version byte, epoch microseconds, temperature
+SMOKER_STRUCT = struct.Struct("<Bqf")
+SMOKER_DTYPE = np.dtype(
+    [("version", "<u1"), ("timestamp_us", "<i8"), ("temperature", "<f4")]
+)
+assert SMOKER_DTYPE.itemsize == SMOKER_STRUCT.size
+
+# float32 keeps about 7 significant digits; readings carry far fewer
+TEMPERATURE_DECIMALS = 2
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def get_smoker_wire_format() -> str:
+    """Fetch the smoker wire format (json or binary) from environment or use default."""
+    wire_format = os.getenv("SMOKER_WIRE_FORMAT", DEFAULT_WIRE_FORMAT).strip().lower()
+    if wire_format not in WIRE_FORMATS:
+        logger.warning(f"Unknown SMOKER_WIRE_FORMAT '{wire_format}'. Using '{DEFAULT_WIRE_FORMAT}'.")
+        wire_format = DEFAULT_WIRE_FORMAT
+    return wire_format
+
+
+#####################################
+# Timestamp Conversion
+#####################################
+
+
+def to_epoch_micros(timestamp) -> int:
+    """
+    Convert a datetime or ISO 8601 string to integer microseconds since the epoch.
+
+    Naive datetimes and strings without an offset are taken as UTC.
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def micros_to_isoformat(timestamps_us: np.ndarray) -> list:
+    """
+    Convert an array of epoch microseconds to UTC ISO 8601 strings.
+
+    Each string ends in +00:00, like datetime.now(timezone.utc).isoformat()
+    on the JSON path, so one topic never mixes naive and aware timestamps.
+    """
+    strings = np.datetime_as_string(timestamps_us.astype("datetime64[us]"), unit="us")
+    return [text + "+00:00" for text in strings.tolist()]
+
+
+#####################################
+# Encoding
+#####################################
+
+
+def encode_smoker_reading(timestamp_us: int, temperature: float) -> bytes:
+    """Pack one reading into a 13-byte binary record."""
+    return SMOKER_STRUCT.pack(SCHEMA_VERSION, timestamp_us, temperature)
+
+
+def encode_smoker_batch(timestamps_us, temperatures) -> bytes:
+    """
+    Pack many readings into one payload of back-to-back records.
+
+    Args:
+        timestamps_us (array-like): Epoch microseconds per reading.
+        temperatures (array-like): Temperature per reading.
+
+    Returns:
+        bytes: len(temperatures) * 13 bytes.
+    """
+    records = np.empty(len(temperatures), dtype=SMOKER_DTYPE)
+    records["version"] = SCHEMA_VERSION
+    records["timestamp_us"] = timestamps_us
+    records["temperature"] = temperatures
+    return records.tobytes()
+
+
+def serialize_smoker_binary(message: dict) -> bytes:
+    """Kafka value serializer: {"timestamp", "temperature"} dict to a binary record."""
+    return encode_smoker_reading(to_epoch_micros(message["timestamp"]), message["temperature"])
+
+
+def serialize_smoker_json(message: dict) -> bytes:
+    """Kafka value serializer: {"timestamp", "temperature"} dict to UTF-8 JSON."""
+    return json.dumps(message).encode("utf-8")
+
+
+SERIALIZERS = {
+    "json": serialize_smoker_json,
+    "binary": serialize_smoker_binary,
+}
+
+
+def get_smoker_serializer(wire_format: str = None):
+    """
+    Return the value serializer and record headers for a wire format.
+
+    Args:
+        wire_format (str, optional): json or binary. Defaults to SMOKER_WIRE_FORMAT.
+
+    Returns:
+        tuple: (serializer, headers) to pass to the producer and each send().
+    """
+    wire_format = wire_format or get_smoker_wire_format()
+    headers = [(CONTENT_TYPE_HEADER, WIRE_FORMATS[wire_format].encode("ascii"))]
+    return SERIALIZERS[wire_format], headers
+
+
+#####################################
+# Decoding
+#####################################
+
+
+def decode_smoker_reading(payload: bytes) -> tuple:
+    """Unpack one binary record into (timestamp_us, temperature)."""
+    version, timestamp_us, temperature = SMOKER_STRUCT.unpack_from(payload)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported smoker schema version {version}")
+    return timestamp_us, temperature
+
+
+def decode_smoker_batch(payloads) -> tuple:
+    """
+    Decode any number of binary records at once.
+
+    Args:
+        payloads (bytes or list): One payload, or a list of payloads, each
+                                  holding one or more whole records.
+
+    Returns:
+        tuple: (timestamps_us int64 array, temperatures float32 array).
+    """
+    buffer = payloads if isinstance(payloads, (bytes, bytearray, memoryview)) else b"".join(payloads)
+    if len(buffer) % SMOKER_DTYPE.itemsize:
+        raise ValueError(
+            f"Binary smoker payload of {len(buffer)} bytes is not a whole number of "
+            f"{SMOKER_DTYPE.itemsize}-byte records"
+        )
+    records = np.frombuffer(buffer, dtype=SMOKER_DTYPE)
+    if records.size and (records["version"] != SCHEMA_VERSION).any():
+        bad = records["version"][records["version"] != SCHEMA_VERSION][0]
+        raise ValueError(f"Unsupported smoker schema version {bad}")
+    return records["timestamp_us"], records["temperature"]
+
+
+def content_type_of(payload: bytes, headers=None) -> str:
+    """
+    Work out the codec of a message from its content-type header, or by sniffing.
+
+    Args:
+        payload (bytes): Raw message value.
+        headers (list, optional): (str, bytes) Kafka record headers.
+
+    Returns:
+        str: JSON_CONTENT_TYPE or SMOKER_CONTENT_TYPE.
+    """
+    for name, value in headers or ():
+        if name.lower() == CONTENT_TYPE_HEADER:
+            return value.decode("ascii") if isinstance(value, bytes) else value
+    if payload[:1] == bytes([SCHEMA_VERSION]):
+        return SMOKER_CONTENT_TYPE
+    return JSON_CONTENT_TYPE
+
+
+def decode_smoker_payload(payload: bytes, headers=None) -> list:
+    """
+    Decode a smoker message in either wire format.
+
+    Args:
+        payload (bytes or str): Raw message value.
+        headers (list, optional): (str, bytes) Kafka record headers.
+
+    Returns:
+        list: {"timestamp": ISO string, "temperature": float} dicts. JSON
+              messages give one reading; binary messages may give several.
+    """
+    if isinstance(payload, str):
+        return [json.loads(payload)]
+    content_type = content_type_of(payload, headers)
+    if content_type == JSON_CONTENT_TYPE:
+        return [json.loads(payload)]
+    if content_type != SMOKER_CONTENT_TYPE:
+        raise ValueError(f"Unsupported content type '{content_type}'")
+    timestamps_us, temperatures = decode_smoker_batch(payload)
+    temperatures = np.round(temperatures.astype(np.float64), TEMPERATURE_DECIMALS).tolist()
+    return [
+        {"timestamp": timestamp, "temperature": temperature}
+        for timestamp, temperature in zip(micros_to_isoformat(timestamps_us), temperatures)
+    ]
+
+
+def decode_smoker_records(records) -> list:
+    """
+    Decode a batch of Kafka records, in order, in either wire format.
+
+    Consecutive binary records are decoded together with one
+    numpy.frombuffer() call; JSON records are parsed one by one.
+
+    Args:
+        records (list): ConsumerRecords (or objects with .value and .headers).
+
+    Returns:
+        list: {"timestamp", "temperature"} dicts in record order.
+    """
+    readings = []
+    binary_run = []
+    for record in records:
+        payload = record.value
+        if not isinstance(payload, str) and content_type_of(payload, record.headers) == SMOKER_CONTENT_TYPE:
+            binary_run.append(payload)
+            continue
+        if binary_run:
+            readings.extend(decode_smoker_payload(b"".join(binary_run), SMOKER_HEADERS))
+            binary_run = []
+        readings.extend(decode_smoker_payload(payload, record.headers))
+    if binary_run:
+        readings.extend(decode_smoker_payload(b"".join(binary_run), SMOKER_HEADERS))
+    return readings
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_readings: int = 100_000) -> dict:
+    """Compare payload size and decode time of the JSON and binary formats."""
+    rng = np.random.default_rng(0)
+    start_us = to_epoch_micros(datetime.now(timezone.utc))
+    timestamps_us = start_us + np.arange(num_readings, dtype=np.int64) * 1_000_000
+    temperatures = np.round(rng.uniform(60.0, 260.0, num_readings), 1)
+
+    json_payloads = [
+        serialize_smoker_json({"timestamp": ts, "temperature": t})
+        for ts, t in zip(micros_to_isoformat(timestamps_us), temperatures.tolist())
+    ]
+    binary_payloads = [
+        encode_smoker_reading(ts, t) for ts, t in zip(timestamps_us.tolist(), temperatures.tolist())
+    ]
+
+    start = time.perf_counter()
+    for payload in json_payloads:
+        json.loads(payload.decode("utf-8"))
+    json_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in binary_payloads:
+        decode_smoker_reading(payload)
+    struct_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded_ts, decoded_temps = decode_smoker_batch(binary_payloads)
+    batch_secs = time.perf_counter() - start
+    assert (decoded_ts == timestamps_us).all()
+    assert np.allclose(decoded_temps, temperatures, atol=1e-4)
+
+    result = {
+        "json_bytes_per_msg": round(sum(map(len, json_payloads)) / num_readings, 1),
+        "binary_bytes_per_msg": SMOKER_STRUCT.size,
+        "json_decode_us_per_msg": round(json_secs / num_readings * 1e6, 3),
+        "struct_decode_us_per_msg": round(struct_secs / num_readings * 1e6, 3),
+        "batch_decode_us_per_msg": round(batch_secs / num_readings * 1e6, 3),
+    }
+    logger.info(f"Smoker codec benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the smoker codec benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
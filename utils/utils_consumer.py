@@ -1,20 +1,20 @@
 """
 utils_consumer.py - common functions used by consumers.
 
-Consumers subscribe to a topic and read messages from the Kafka topic.
+Consumers subscribe to a topic and read messages from the Kafka topic,
+or from the file or memory transport when TRANSPORT is set (see
+utils_transport). kafka-python is only imported for a Kafka consumer.
 """
 
 #####################################
 # Imports
 #####################################
 
-
-# Import external packages
-from kafka import KafkaConsumer
-
 # Import functions from local modules
 from utils.utils_logger import logger
 from .utils_producer import get_kafka_broker_address
+from .utils_clients import registry
+from .utils_transport import get_transport, create_consumer_client
 
 
 #####################################
@@ -36,26 +36,37 @@ def create_kafka_consumer(
         value_deserializer_provided (callable, optional): Function to deserialize message values.
 
     Returns:
-        KafkaConsumer: Configured Kafka consumer instance.
+        KafkaConsumer: Configured Kafka consumer instance, or a look-alike
+                       for the file and memory transports.
     """
     kafka_broker = get_kafka_broker_address()
     topic = topic_provided
     consumer_group_id = group_id_provided or "test_group"
+    value_deserializer = value_deserializer_provided or (lambda x: x.decode("utf-8"))
+
+    transport = get_transport()
+    if transport != "kafka":
+        consumer = create_consumer_client(transport, topic, consumer_group_id, value_deserializer)
+        registry.track(consumer)
+        return consumer
+
     logger.info(
         f"Creating Kafka consumer. Topic='{topic}' and group ID='{group_id_provided}'."
     )
     logger.debug(f"Kafka broker: {kafka_broker}")
 
     try:
+        from kafka import KafkaConsumer
+
         consumer = KafkaConsumer(
             topic,
             group_id=consumer_group_id,
-            value_deserializer=value_deserializer_provided
-            or (lambda x: x.decode("utf-8")),
+            value_deserializer=value_deserializer,
             bootstrap_servers=kafka_broker,
             auto_offset_reset="earliest",
             enable_auto_commit=True,
         )
+        registry.track(consumer)  # Closed at exit if the caller does not
         logger.info("Kafka consumer created successfully.")
         return consumer
     except Exception as e:
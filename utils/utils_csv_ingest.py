@@ -0,0 +1,389 @@
+"""
+utils_csv_ingest.py - stream large sensor CSV files as typed column batches.
+
+csv.DictReader builds a dict per row and every value is converted with
+float() one at a time. For multi-GB exports with many columns, this
+module instead:
+
+- reads the file in fixed-size byte chunks (bounded memory, whatever the
+  file size), cut at the last full line,
+- finds every comma and newline in a chunk with one NumPy scan each,
+- slices out only the columns asked for and converts each column of the
+  chunk with a single NumPy call.
+
+Chunks the fast path cannot handle - quoted fields or rows with a
+different number of columns - are parsed with csv.reader instead, so
+results are the same either way.
+
+Column names are matched case-insensitively, and a column can be given
+under several names (e.g. "temperature" or "temp_f").
+
+Environment variables:
+    SMOKER_CSV_CHUNK_BYTES      Bytes read per batch (default 1 MiB).
+    SMOKER_TEMPERATURE_COLUMN   Temperature column name (default temperature).
+
+Run this module directly to benchmark against csv.DictReader on a
+synthetic file (default 10M rows; pass a smaller count as an argument):
+
+    python -m utils.utils_csv_ingest [rows]
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import csv
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_CHUNK_BYTES = 1024 * 1024  # Fits in CPU cache; bigger chunks parse slower
+DEFAULT_TEMPERATURE_COLUMN = "temperature"
+
+
+def get_chunk_bytes() -> int:
+    """Fetch bytes read per CSV batch from environment or use default."""
+    return max(4096, int(os.getenv("SMOKER_CSV_CHUNK_BYTES", DEFAULT_CHUNK_BYTES)))
+
+
+def get_temperature_column() -> str:
+    """Fetch the temperature column name from environment or use default."""
+    return os.getenv("SMOKER_TEMPERATURE_COLUMN", DEFAULT_TEMPERATURE_COLUMN)
+
+
+#####################################
+# Column Selection
+#####################################
+
+
+def read_header(file_path: pathlib.Path) -> list:
+    """Return the column names from the first line of a CSV file."""
+    with open(file_path, "r", newline="") as csv_file:
+        return next(csv.reader(csv_file), [])
+
+
+def resolve_columns(header: list, wanted: dict) -> dict:
+    """
+    Match wanted columns to the actual header.
+
+    Args:
+        header (list): Column names in the file.
+        wanted (dict): Output name -> candidate file column names.
+
+    Returns:
+        dict: Output name -> actual file column name.
+
+    Raises:
+        KeyError: If none of the candidates for a column is in the file.
+    """
+    by_lower = {name.strip().lower(): name for name in header}
+    resolved = {}
+    for output_name, candidates in wanted.items():
+        if isinstance(candidates, str):
+            candidates = [candidates]
+        match = next((by_lower[c.lower()] for c in candidates if c.lower() in by_lower), None)
+        if match is None:
+            raise KeyError(f"None of the columns {list(candidates)} found in {header}")
+        resolved[output_name] = match
+    return resolved
+
+
+#####################################
+# Batch Readers
+#####################################
+
+
+def _read_chunks(csv_file, chunk_bytes: int):
+    """Yield byte chunks that each end at a line boundary."""
+    rest = b""
+    while True:
+        data = csv_file.read(chunk_bytes)
+        if not data:
+            if rest:
+                yield rest if rest.endswith(b"\n") else rest + b"\n"
+            return
+        data = rest + data
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:
+            rest = data  # No full line yet; read more
+            continue
+        rest = data[cut:]
+        yield data[:cut]
+
+
+def _to_float(value) -> float:
+    """float(value), or NaN if the value is not a number."""
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+def _parse_decimals(chars: np.ndarray):
+    """
+    Parse fixed-width rows of plain decimals ("-12.5", "170") to float64.
+
+    Digits are accumulated as an exact integer and divided by an exact
+    power of ten, so the result matches float() bit for bit. Returns None
+    if any field has another form (exponent, spaces, nan, ...).
+
+    Args:
+        chars (numpy.ndarray): uint8 array of shape (rows, width), fields
+                               left-aligned and padded with NUL bytes.
+    """
+    rows, width = chars.shape
+    if width > 15:
+        return None  # Mantissa could pass 2**53
+    columns = np.ascontiguousarray(chars.T)
+    is_minus = columns[0] == 45
+    mantissa = np.zeros(rows)
+    digits_after_dot = np.zeros(rows, dtype=np.int64)
+    dots = np.zeros(rows, dtype=np.uint8)
+    any_digit = np.zeros(rows, dtype=bool)
+    padded = np.zeros(rows, dtype=bool)
+    bad = np.zeros(rows, dtype=bool)
+    for j, column in enumerate(columns):
+        digit = column - np.uint8(48)
+        is_digit = digit < 10
+        is_dot = column == 46
+        is_pad = column == 0
+        ok = is_digit | is_dot | is_pad
+        if j == 0:
+            ok |= is_minus | (column == 43)
+        bad |= ~ok | (padded & ~is_pad)
+        padded |= is_pad
+        mantissa = np.where(is_digit, mantissa * 10 + digit, mantissa)
+        digits_after_dot += is_digit & (dots > 0)
+        dots += is_dot
+        any_digit |= is_digit
+    if bad.any() or (dots > 1).any():
+        return None
+    values = mantissa / np.power(10.0, digits_after_dot)
+    values[is_minus] *= -1
+    values[~any_digit] = np.nan
+    return values
+
+
+def _convert(values: np.ndarray, is_numeric: bool) -> np.ndarray:
+    """Convert a bytes array (or list of str) to float64 or str."""
+    if not is_numeric:
+        return np.char.decode(values, "utf-8") if isinstance(values, np.ndarray) else np.array(values, dtype=str)
+    try:
+        return np.asarray(values).astype(np.float64)
+    except ValueError:
+        return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+
+def _parse_chunk_fast(chunk: bytes, positions: dict, numeric: set, num_columns: int):
+    """
+    Parse one chunk with NumPy, or return None if it needs the csv module.
+
+    Every line must have exactly num_columns fields and no quotes.
+    """
+    if b'"' in chunk:
+        return None
+    buf = np.frombuffer(chunk, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == 10)
+    commas = np.flatnonzero(buf == 44)
+    num_rows = len(newlines)
+    if len(commas) != num_rows * (num_columns - 1):
+        return None
+    commas = commas.reshape(num_rows, num_columns - 1)
+    line_starts = np.concatenate(([0], newlines[:-1] + 1))
+    # Same total, but each line must also hold exactly its own share
+    if num_rows and num_columns > 1 and (
+        (commas[:, 0] < line_starts).any() or (commas[:, -1] > newlines).any()
+    ):
+        return None
+    # Drop \r of \r\n; a newline at offset 0 (empty first line) has no \r to drop
+    carriage = (newlines > 0) & (buf[np.maximum(newlines - 1, 0)] == 13)
+    line_ends = newlines - carriage
+
+    batch = {}
+    for name, position in positions.items():
+        starts = line_starts if position == 0 else commas[:, position - 1] + 1
+        ends = line_ends if position == num_columns - 1 else commas[:, position]
+        width = int((ends - starts).max()) if num_rows else 1
+        width = max(width, 1)
+        # Gather each field into a fixed-width row, padded with NUL bytes.
+        # The last line ends in a newline, so no index runs past the chunk.
+        index = starts[:, None] + np.arange(width)
+        chars = buf[index]
+        chars[index >= ends[:, None]] = 0
+        if name in numeric:
+            values = _parse_decimals(chars)
+            batch[name] = values if values is not None else _convert(chars.view(f"S{width}").ravel(), True)
+        else:
+            batch[name] = _convert(np.char.strip(chars.view(f"S{width}").ravel()), False)
+    return batch
+
+
+def _parse_chunk_csv(chunk: bytes, positions: dict, numeric: set) -> dict:
+    """Parse one chunk with csv.reader (handles quotes and ragged rows)."""
+    rows = list(csv.reader(io.StringIO(chunk.decode("utf-8"), newline="")))
+    batch = {}
+    for name, position in positions.items():
+        values = [row[position] if position < len(row) else "" for row in rows if row]
+        batch[name] = _convert(values, name in numeric)
+    return batch
+
+
+def read_column_batches(file_path: pathlib.Path, columns: dict, numeric=(), chunk_bytes: int = None,
+                        drop_invalid: bool = True):
+    """
+    Stream a CSV file as batches of typed NumPy columns.
+
+    Args:
+        file_path (pathlib.Path): CSV file with a header row.
+        columns (dict): Output name -> file column name, or a list of
+                        candidate names. Only these columns are parsed.
+        numeric (iterable): Output names to parse as float64. Others are
+                            returned as str arrays.
+        chunk_bytes (int, optional): Bytes read per batch. Defaults to SMOKER_CSV_CHUNK_BYTES.
+        drop_invalid (bool): Drop rows where a numeric column is empty or not a number.
+
+    Yields:
+        dict: Output name -> NumPy array, all of the same length.
+    """
+    chunk_bytes = chunk_bytes or get_chunk_bytes()
+    numeric = set(numeric)
+    header = read_header(file_path)
+    resolved = resolve_columns(header, columns)
+    positions = {name: header.index(column) for name, column in resolved.items()}
+
+    dropped = 0
+    slow_chunks = 0
+    with open(file_path, "rb") as csv_file:
+        csv_file.readline()  # Header
+        for chunk in _read_chunks(csv_file, chunk_bytes):
+            batch = _parse_chunk_fast(chunk, positions, numeric, len(header))
+            if batch is None:
+                slow_chunks += 1
+                batch = _parse_chunk_csv(chunk, positions, numeric)
+            if drop_invalid and numeric:
+                valid = np.ones(len(next(iter(batch.values()))), dtype=bool)
+                for name in numeric:
+                    valid &= ~np.isnan(batch[name])
+                if not valid.all():
+                    dropped += int((~valid).sum())
+                    batch = {name: values[valid] for name, values in batch.items()}
+            yield batch
+
+    if slow_chunks:
+        logger.debug(f"Parsed {slow_chunks} chunk(s) of {file_path} with the csv module.")
+    if dropped:
+        logger.warning(f"Skipped {dropped} row(s) with missing or invalid numbers in {file_path}")
+
+
+def read_temperature_batches(file_path: pathlib.Path, chunk_bytes: int = None):
+    """
+    Stream temperatures from a smoker CSV export.
+
+    Yields:
+        numpy.ndarray: float64 temperatures, one array per chunk.
+    """
+    column = get_temperature_column()
+    for batch in read_column_batches(
+        file_path, {"temperature": column}, numeric=["temperature"], chunk_bytes=chunk_bytes
+    ):
+        yield batch["temperature"]
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def write_synthetic_smoker_file(file_path: pathlib.Path, num_rows: int, seed: int = 0) -> None:
+    """Write a smoker_data_random.csv-shaped file with num_rows rows."""
+    rng = np.random.default_rng(seed)
+    header = (
+        "timestamp,temperature,sensor_status,user_temp_setting,remote_control_status,"
+        "sensor_activity,status_message,temperature_status\n"
+    )
+    rest = ",active,170,ON,inactive,Sensor is active.,Temperature is within range.\n"
+    with open(file_path, "w") as out:
+        out.write(header)
+        block = 1_000_000
+        for start in range(0, num_rows, block):
+            n = min(block, num_rows - start)
+            seconds = np.arange(start, start + n) * 60
+            stamps = np.datetime_as_string(np.datetime64("2025-01-01T15:00:00") + seconds, unit="s")
+            temps = np.char.mod("%.2f", rng.uniform(60.0, 260.0, n))
+            out.writelines(
+                f"{stamp[:10]} {stamp[11:]},{temp}{rest}" for stamp, temp in zip(stamps, temps)
+            )
+
+
+def benchmark(num_rows: int = 10_000_000, chunk_bytes: int = None) -> dict:
+    """
+    Compare rows per second of csv.DictReader + float() and the batch reader.
+
+    Both read the temperature column of the same synthetic file.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = pathlib.Path(tmp) / "smoker_synthetic.csv"
+        start = time.perf_counter()
+        write_synthetic_smoker_file(file_path, num_rows)
+        logger.info(
+            f"Wrote {num_rows:,} rows ({file_path.stat().st_size / 1e6:.0f} MB) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        start = time.perf_counter()
+        total_dict = 0.0
+        with open(file_path, "r") as csv_file:
+            for row in csv.DictReader(csv_file):
+                total_dict += float(row["temperature"])
+        dict_secs = time.perf_counter() - start
+
+        start = time.perf_counter()
+        total_batch = 0.0
+        max_batch = 0
+        for temperatures in read_temperature_batches(file_path, chunk_bytes):
+            total_batch += float(temperatures.sum())
+            max_batch = max(max_batch, temperatures.nbytes)
+        batch_secs = time.perf_counter() - start
+        assert abs(total_dict - total_batch) < 1e-6 * abs(total_dict)
+
+    result = {
+        "rows": num_rows,
+        "dictreader_rows_per_sec": round(num_rows / dict_secs),
+        "batch_rows_per_sec": round(num_rows / batch_secs),
+        "speedup": round(dict_secs / batch_secs, 1),
+        "max_batch_bytes": max_batch,
+    }
+    logger.info(f"CSV ingest benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the CSV ingest benchmark with the row count given as the first argument."""
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+utils_entrypoints.py - console entry points and a startup-time benchmark.
+
+The producer and consumer scripts live in folders whose names contain
+spaces, so they cannot be imported as packages. Each console command in
+pyproject.toml points at a function here that loads the script from its
+file and calls its main().
+
+Install the project in editable mode so the scripts stay on disk next to
+the utils package:
+
+    pip install -e .
+    buzzline-json-producer
+    HEADLESS=true buzzline-json-consumer
+
+Run this module directly to measure how long each entry point takes to
+import, using `python -X importtime` in a fresh interpreter per run. The
+results are written as JSON:
+
+    python -m utils.utils_entrypoints [output.json]
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import importlib.util
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+from functools import partial
+
+# Import functions from local modules
+from utils.utils_logger import logger, LOG_FOLDER
+
+#####################################
+# Entry Point Table
+#####################################
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+PRODUCERS_FOLDER = "Kersha_Live_Visualization_Producers (p 4)"
+CONSUMERS_FOLDER = "Kersha_Live_Visualization_Consumers (p 4)"
+
+# Entry point name -> (folder, module file stem)
+ENTRY_POINTS = {
+    "basic-producer": (PRODUCERS_FOLDER, "kersha_basic_json_live_producer"),
+    "csv-producer": (PRODUCERS_FOLDER, "kersha_csv_live_producer"),
+    "json-producer": (PRODUCERS_FOLDER, "kersha_json_live_producer"),
+    "project-producer": (PRODUCERS_FOLDER, "project_producer_case"),
+    "basic-consumer": (CONSUMERS_FOLDER, "kersha_basic_json_live_consumer"),
+    "csv-consumer": (CONSUMERS_FOLDER, "kersha_csv_live_consumer"),
+    "json-consumer": (CONSUMERS_FOLDER, "kersha_json_live_consumer"),
+    "project-consumer": (CONSUMERS_FOLDER, "project_consumer_kersha"),
+}
+
+DEFAULT_BENCHMARK_FILE = LOG_FOLDER.joinpath("startup_benchmark.json")
+
+#####################################
+# Loading and Running
+#####################################
+
+
+def load_entry_point(name: str):
+    """
+    Import an entry point script from its file without running main().
+
+    Args:
+        name (str): Key in ENTRY_POINTS, e.g. "json-producer".
+
+    Returns:
+        module: The loaded script module.
+    """
+    folder, stem = ENTRY_POINTS[name]
+    module = sys.modules.get(stem)
+    if module is not None:
+        return module
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.append(str(PROJECT_ROOT))
+    spec = importlib.util.spec_from_file_location(stem, PROJECT_ROOT / folder / f"{stem}.py")
+    module = importlib.util.module_from_spec(spec)
+    # Registered before running so worker processes can find its functions
+    sys.modules[stem] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_entry_point(name: str):
+    """Load an entry point script and call its main()."""
+    return load_entry_point(name).main()
+
+
+# Console script targets (see [project.scripts] in pyproject.toml)
+basic_producer = partial(run_entry_point, "basic-producer")
+csv_producer = partial(run_entry_point, "csv-producer")
+json_producer = partial(run_entry_point, "json-producer")
+project_producer = partial(run_entry_point, "project-producer")
+basic_consumer = partial(run_entry_point, "basic-consumer")
+csv_consumer = partial(run_entry_point, "csv-consumer")
+json_consumer = partial(run_entry_point, "json-consumer")
+project_consumer = partial(run_entry_point, "project-consumer")
+
+#####################################
+# Startup Benchmark
+#####################################
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse `python -X importtime` output.
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) tuples in import order.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure_startup(name: str, headless: bool = True) -> dict:
+    """
+    Import one entry point in a fresh interpreter and record the cost.
+
+    Args:
+        name (str): Key in ENTRY_POINTS.
+        headless (bool): Run with HEADLESS=true, as a pod would.
+
+    Returns:
+        dict: Wall time, total import time, the heaviest top-level imports,
+              and whether Matplotlib, Kafka and NumPy were loaded.
+    """
+    folder, stem = ENTRY_POINTS[name]
+    # Load the script directly, so its own imports show up as top-level rows
+    code = "\n".join(
+        [
+            "import importlib.util, sys",
+            f"sys.path.append({str(PROJECT_ROOT)!r})",
+            f"spec = importlib.util.spec_from_file_location({stem!r}, {str(PROJECT_ROOT / folder / (stem + '.py'))!r})",
+            "module = importlib.util.module_from_spec(spec)",
+            f"sys.modules[{stem!r}] = module",
+            "spec.loader.exec_module(module)",
+        ]
+    )
+    env = dict(os.environ, HEADLESS="true" if headless else "false")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} failed to import: {completed.stderr.strip().splitlines()[-1:]}")
+
+    rows = parse_importtime(completed.stderr)
+    top_level = [row for row in rows if row[3] == 0]
+    loaded = {row[0] for row in rows}
+    heaviest = sorted(top_level, key=lambda row: row[2], reverse=True)[:5]
+    return {
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(row[2] for row in top_level) / 1000, 1),
+        "heaviest": {row[0]: round(row[2] / 1000, 1) for row in heaviest},
+        "matplotlib": "matplotlib" in loaded,
+        "kafka": "kafka" in loaded,
+        "numpy": "numpy" in loaded,
+    }
+
+
+def benchmark(names=None, repeats: int = 3, headless: bool = True, output_path: pathlib.Path = None) -> dict:
+    """
+    Measure import cost for each entry point and write the results as JSON.
+
+    Each entry point is imported repeats times; the run with the median
+    wall time is kept, so one cold disk cache does not skew the result.
+
+    Args:
+        names (list, optional): Entry point names. Defaults to all of them.
+        repeats (int): Fresh interpreter runs per entry point.
+        headless (bool): Run with HEADLESS=true.
+        output_path (pathlib.Path, optional): JSON file to write.
+                                              Defaults to logs/startup_benchmark.json.
+
+    Returns:
+        dict: Results keyed by entry point name.
+    """
+    output_path = pathlib.Path(output_path or DEFAULT_BENCHMARK_FILE)
+    results = {}
+    for name in names or ENTRY_POINTS:
+        try:
+            runs = [measure_startup(name, headless) for _ in range(repeats)]
+        except RuntimeError as e:
+            logger.error(str(e))
+            results[name] = {"error": str(e)}
+            continue
+        median_wall = statistics.median_low(run["wall_ms"] for run in runs)
+        results[name] = next(run for run in runs if run["wall_ms"] == median_wall)
+        logger.info(f"Startup {name}: {results[name]}")
+
+    report = {
+        "python": sys.version.split()[0],
+        "headless": headless,
+        "repeats": repeats,
+        "entry_points": results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2))
+    logger.info(f"Startup benchmark written to {output_path}")
+    return report
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the startup benchmark, writing to the path given as the first argument."""
+    benchmark(output_path=sys.argv[1] if len(sys.argv) > 1 else None)
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+utils_envelope.py - pack many buzz messages into one columnar Kafka record.
+
+One JSON record per message repeats every field name and the same few
+author, category and keyword strings. An envelope holds up to N messages
+(or T milliseconds' worth) as columns instead:
+
+- string fields (author, category, keyword_mentioned, message, timestamp)
+  are dictionary-encoded: each distinct value is stored once, and each
+  message stores a small integer code;
+- numeric fields (sentiment, message_length) are packed NumPy arrays;
+- anything else is kept as a JSON list.
+
+Binary layout (little-endian):
+
+    4 bytes   magic b"BZEN"
+    1 byte    envelope version (currently 1)
+    4 bytes   uint32 length of the JSON metadata
+    ...       JSON metadata: message count and column specs, including
+              the dictionaries
+    ...       column buffers (codes and numeric arrays), in column order
+
+Consumers can work on whole columns without building per-message dicts,
+e.g. Envelope.value_counts("author") is one numpy.bincount() call.
+
+Records carry a "content-type" header, as with utils_codec, and can also
+be recognised by the magic bytes.
+
+Environment variables (PREFIX is BUZZ or PROJECT):
+    PREFIX_ENVELOPE_MAX_MESSAGES  Messages per envelope. 0 or 1 turns envelopes off (default 0).
+    PREFIX_ENVELOPE_MAX_MS        Oldest message age before an envelope is sent (default 250).
+
+Run this module directly to compare record sizes and consumer CPU:
+
+    python -m utils.utils_envelope
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import json
+import os
+import struct
+import time
+from collections import namedtuple
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_logger import logger
+from utils.utils_codec import CONTENT_TYPE_HEADER
+
+#####################################
+# Envelope Format
+#####################################
+
+ENVELOPE_MAGIC = b"BZEN"
+ENVELOPE_VERSION = 1
+ENVELOPE_CONTENT_TYPE = f"application/x-buzz-envelope.v{ENVELOPE_VERSION}"
+ENVELOPE_HEADERS = [(CONTENT_TYPE_HEADER, ENVELOPE_CONTENT_TYPE.encode("ascii"))]
+
+PREAMBLE = struct.Struct("<4sBI")
+
+# Floating-point columns are packed as float32
+FLOAT_DTYPE = "<f4"
+
+DEFAULT_ENVELOPE_MAX_MESSAGES = 0
+DEFAULT_ENVELOPE_MAX_MS = 250
+
+#####################################
+# Encoding
+#####################################
+
+
+def _column_spec(name: str, values: list):
+    """Return (spec, buffer) for one column; buffer is None for JSON columns."""
+    if all(type(value) is str for value in values):
+        dictionary = list(dict.fromkeys(values))
+        index = {value: code for code, value in enumerate(dictionary)}
+        dtype = np.dtype(np.min_scalar_type(max(len(dictionary) - 1, 0))).newbyteorder("<")
+        codes = np.fromiter(map(index.__getitem__, values), dtype=dtype, count=len(values))
+        return {"name": name, "kind": "dict", "dtype": dtype.str, "values": dictionary}, codes.tobytes()
+
+    if all(type(value) is int for value in values):
+        low, high = min(values, default=0), max(values, default=0)
+        dtype = np.result_type(np.min_scalar_type(low), np.min_scalar_type(high)).newbyteorder("<")
+        return {"name": name, "kind": "array", "dtype": dtype.str}, np.array(values, dtype=dtype).tobytes()
+
+    if all(type(value) in (int, float) for value in values):
+        return {"name": name, "kind": "array", "dtype": FLOAT_DTYPE}, np.array(values, dtype=FLOAT_DTYPE).tobytes()
+
+    return {"name": name, "kind": "json", "values": values}, None
+
+
+def encode_envelope(messages: list) -> bytes:
+    """
+    Pack messages that share the same fields into one envelope.
+
+    Args:
+        messages (list): Message dicts, all with the same keys.
+
+    Returns:
+        bytes: Encoded envelope.
+    """
+    if not messages:
+        raise ValueError("Cannot encode an empty envelope")
+    fields = list(messages[0])
+    if any(message.keys() != messages[0].keys() for message in messages):
+        raise ValueError("All messages in an envelope must have the same fields")
+
+    columns = []
+    buffers = []
+    for name in fields:
+        spec, buffer = _column_spec(name, [message[name] for message in messages])
+        columns.append(spec)
+        if buffer is not None:
+            buffers.append(buffer)
+
+    metadata = json.dumps({"count": len(messages), "columns": columns}, separators=(",", ":")).encode("utf-8")
+    return b"".join([PREAMBLE.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, len(metadata)), metadata, *buffers])
+
+
+def serialize_envelope(payload: bytes) -> bytes:
+    """Kafka value serializer for envelopes, which are already bytes."""
+    return payload
+
+
+#####################################
+# Decoding
+#####################################
+
+
+class Envelope:
+    """
+    Columnar view of a decoded envelope.
+
+    Arrays are read-only views into the payload; nothing is copied until
+    messages() is called.
+    """
+
+    def __init__(self, count: int, columns: dict):
+        self.count = count
+        self._columns = columns
+
+    @property
+    def fields(self) -> list:
+        """Field names, in message order."""
+        return list(self._columns)
+
+    def dictionary(self, name: str) -> list:
+        """Return the distinct values of a dictionary-encoded field."""
+        return self._columns[name]["values"]
+
+    def codes(self, name: str) -> np.ndarray:
+        """Return the per-message dictionary codes of a dictionary-encoded field."""
+        return self._columns[name]["data"]
+
+    def column(self, name: str):
+        """Return a field's values for every message (an array, or a list for JSON columns)."""
+        spec = self._columns[name]
+        if spec["kind"] == "dict":
+            return np.array(spec["values"], dtype=object)[spec["data"]]
+        if spec["kind"] == "array":
+            return spec["data"]
+        return spec["values"]
+
+    def value_counts(self, name: str) -> dict:
+        """
+        Count messages per value of a dictionary-encoded field.
+
+        Returns:
+            dict: Value -> count, for values that occur.
+        """
+        spec = self._columns[name]
+        counts = np.bincount(spec["data"], minlength=len(spec["values"]))
+        return {value: count for value, count in zip(spec["values"], counts.tolist()) if count}
+
+    def messages(self) -> list:
+        """Materialize the envelope as message dicts (the slow, compatible path)."""
+        columns = []
+        for name, spec in self._columns.items():
+            if spec["kind"] == "dict":
+                values = spec["values"]
+                columns.append([values[code] for code in spec["data"].tolist()])
+            elif spec["kind"] == "array" and spec["data"].dtype.kind == "f":
+                # Shortest repr that round-trips the float32, e.g. 0.87 not 0.8700000047683716
+                columns.append([float(value) for value in spec["data"].astype(str)])
+            elif spec["kind"] == "array":
+                columns.append(spec["data"].tolist())
+            else:
+                columns.append(spec["values"])
+        names = list(self._columns)
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def is_envelope(payload, headers=None) -> bool:
+    """Return True if a record is an envelope, by content-type header or magic bytes."""
+    if isinstance(payload, str):
+        return False
+    for name, value in headers or ():
+        if name.lower() == CONTENT_TYPE_HEADER:
+            value = value.decode("ascii") if isinstance(value, bytes) else value
+            return value == ENVELOPE_CONTENT_TYPE
+    return payload[:4] == ENVELOPE_MAGIC
+
+
+def decode_envelope(payload: bytes) -> Envelope:
+    """
+    Decode an envelope.
+
+    Args:
+        payload (bytes): Encoded envelope.
+
+    Returns:
+        Envelope: Columnar view of the messages.
+    """
+    magic, version, metadata_length = PREAMBLE.unpack_from(payload)
+    if magic != ENVELOPE_MAGIC:
+        raise ValueError("Not a buzz envelope")
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported envelope version {version}")
+
+    offset = PREAMBLE.size
+    metadata = json.loads(payload[offset:offset + metadata_length])
+    offset += metadata_length
+    count = metadata["count"]
+
+    columns = {}
+    for spec in metadata["columns"]:
+        if spec["kind"] in ("dict", "array"):
+            dtype = np.dtype(spec["dtype"])
+            spec["data"] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+            offset += dtype.itemsize * count
+        columns[spec["name"]] = spec
+    return Envelope(count, columns)
+
+
+#####################################
+# Producer-Side Batching
+#####################################
+
+SealedEnvelope = namedtuple("SealedEnvelope", ["key", "count", "payload"])
+
+
+class EnvelopeBatcher:
+    """
+    Collect messages into envelopes of up to max_messages or max_age_ms.
+
+    Messages can be grouped (for example by target partition) so each
+    envelope only holds messages that would have gone to the same
+    partition, keeping per-key order. Age is checked when a message is
+    added and by flush_due(); call flush() on shutdown. Between messages,
+    a paced producer sends envelopes as they come due with
+    envelope_flusher() (see below).
+    """
+
+    def __init__(self, max_messages: int, max_age_ms: float = DEFAULT_ENVELOPE_MAX_MS,
+                 key_field: str = None, group_by=None, clock=time.monotonic):
+        """
+        Args:
+            max_messages (int): Messages per envelope.
+            max_age_ms (float): Oldest message age before an envelope is sealed.
+            key_field (str, optional): Field whose value (from the first
+                                       message) becomes the envelope's key.
+            group_by (callable, optional): message -> group; one open
+                                           envelope per group.
+            clock (callable): Monotonic clock in seconds.
+        """
+        self.max_messages = max(1, int(max_messages))
+        self.max_age_secs = max_age_ms / 1000
+        self.key_field = key_field
+        self.group_by = group_by
+        self.clock = clock
+        self._pending = {}  # group -> (opened_at, [messages])
+
+    def _seal(self, group) -> SealedEnvelope:
+        _, messages = self._pending.pop(group)
+        key = messages[0].get(self.key_field) if self.key_field else None
+        return SealedEnvelope(key, len(messages), encode_envelope(messages))
+
+    def add(self, message: dict) -> list:
+        """
+        Add a message.
+
+        Returns:
+            list: SealedEnvelopes ready to send (usually empty).
+        """
+        group = self.group_by(message) if self.group_by else None
+        entry = self._pending.get(group)
+        if entry is not None and entry[1][0].keys() != message.keys():
+            # Field set changed; an envelope holds one schema
+            sealed = [self._seal(group)]
+            entry = None
+        else:
+            sealed = []
+        if entry is None:
+            entry = self._pending[group] = (self.clock(), [])
+        entry[1].append(message)
+        if len(entry[1]) >= self.max_messages:
+            sealed.append(self._seal(group))
+        sealed.extend(self.flush_due())
+        return sealed
+
+    def next_due_secs(self):
+        """Return seconds until the oldest open envelope is due, or None if none is open."""
+        if not self._pending:
+            return None
+        oldest = min(opened_at for opened_at, _ in self._pending.values())
+        return max(0.0, oldest + self.max_age_secs - self.clock())
+
+    def flush_due(self) -> list:
+        """Seal and return envelopes whose oldest message is older than max_age_ms."""
+        now = self.clock()
+        due = [group for group, (opened_at, _) in self._pending.items() if now - opened_at >= self.max_age_secs]
+        return [self._seal(group) for group in due]
+
+    def flush(self) -> list:
+        """Seal and return every open envelope."""
+        return [self._seal(group) for group in list(self._pending)]
+
+
+def send_envelopes(producer, topic: str, sealed: list) -> int:
+    """
+    Send sealed envelopes through a producer created with serialize_envelope.
+
+    Args:
+        producer: BufferedProducer (or KafkaProducer) whose value serializer
+                  passes bytes through.
+        topic (str): Kafka topic.
+        sealed (list): SealedEnvelopes from EnvelopeBatcher.
+
+    Returns:
+        int: Number of messages sent.
+    """
+    sent = 0
+    for envelope in sealed:
+        producer.send(topic, value=envelope.payload, key=envelope.key, headers=ENVELOPE_HEADERS)
+        sent += envelope.count
+        logger.debug(f"Sent envelope of {envelope.count} messages ({len(envelope.payload)} bytes) to '{topic}'.")
+    return sent
+
+
+def envelope_flusher(batcher: EnvelopeBatcher, producer, topic: str, sleep=time.sleep):
+    """
+    Return an on_wait callback for RateScheduler.paced that sends envelopes
+    coming due while the producer waits for its next message.
+
+    Without it, at slow rates an open envelope would wait for the next
+    message (or forever, if the stream goes idle) rather than max_age_ms.
+
+    Args:
+        batcher (EnvelopeBatcher): The producer's batcher.
+        producer: Producer passed to send_envelopes.
+        topic (str): Kafka topic.
+        sleep (callable): Sleep function, replaceable for testing.
+    """
+
+    def on_wait(wait_secs: float) -> None:
+        due_secs = batcher.next_due_secs()
+        while due_secs is not None and due_secs < wait_secs:
+            sleep(due_secs)
+            wait_secs -= due_secs
+            send_envelopes(producer, topic, batcher.flush_due())
+            due_secs = batcher.next_due_secs()
+
+    return on_wait
+
+
+def get_envelope_settings(prefix: str) -> tuple:
+    """
+    Fetch envelope settings for a producer from environment or use defaults.
+
+    Args:
+        prefix (str): Environment variable prefix, e.g. "BUZZ".
+
+    Returns:
+        tuple: (max_messages, max_age_ms). max_messages <= 1 means off.
+    """
+    max_messages = int(os.getenv(f"{prefix}_ENVELOPE_MAX_MESSAGES", DEFAULT_ENVELOPE_MAX_MESSAGES))
+    max_age_ms = float(os.getenv(f"{prefix}_ENVELOPE_MAX_MS", DEFAULT_ENVELOPE_MAX_MS))
+    return max_messages, max_age_ms
+
+
+def create_envelope_batcher(prefix: str, key_field: str = None, group_by=None):
+    """
+    Create an EnvelopeBatcher from {prefix}_ENVELOPE_* settings.
+
+    Returns:
+        EnvelopeBatcher: Or None if envelopes are turned off.
+    """
+    max_messages, max_age_ms = get_envelope_settings(prefix)
+    if max_messages <= 1:
+        return None
+    logger.info(f"{prefix} envelopes: up to {max_messages} messages or {max_age_ms:g} ms each.")
+    return EnvelopeBatcher(max_messages, max_age_ms, key_field=key_field, group_by=group_by)
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_messages: int = 100_000, envelope_size: int = 500) -> dict:
+    """Compare bytes per message and author counting cost: JSON records vs envelopes."""
+    rng = np.random.default_rng(0)
+    authors = ["Alice", "Bob", "Charlie", "Eve", "Kersha"]
+    categories = ["humor", "tech", "food", "travel", "entertainment", "gaming", "other"]
+    texts = [f"I just tried thing {i}! It was great." for i in range(250)]
+    messages = [
+        {
+            "message": texts[i % 250],
+            "author": authors[a],
+            "timestamp": f"2025-01-29 14:35:{i // 2000 % 60:02d}",
+            "category": categories[i % 7],
+            "sentiment": round(float(s), 2),
+            "keyword_mentioned": "meme",
+            "message_length": len(texts[i % 250]),
+        }
+        for i, (a, s) in enumerate(zip(rng.integers(0, 5, num_messages), rng.uniform(-1, 1, num_messages)))
+    ]
+
+    json_records = [json.dumps(message).encode("utf-8") for message in messages]
+    envelopes = [
+        encode_envelope(messages[i:i + envelope_size]) for i in range(0, num_messages, envelope_size)
+    ]
+
+    start = time.perf_counter()
+    counts = {}
+    for record in json_records:
+        author = json.loads(record)["author"]
+        counts[author] = counts.get(author, 0) + 1
+    json_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    envelope_counts = {}
+    for payload in envelopes:
+        for author, count in decode_envelope(payload).value_counts("author").items():
+            envelope_counts[author] = envelope_counts.get(author, 0) + count
+    envelope_secs = time.perf_counter() - start
+    assert counts == envelope_counts
+
+    result = {
+        "json_records": len(json_records),
+        "envelope_records": len(envelopes),
+        "json_bytes_per_msg": round(sum(map(len, json_records)) / num_messages, 1),
+        "envelope_bytes_per_msg": round(sum(map(len, envelopes)) / num_messages, 1),
+        "json_count_us_per_msg": round(json_secs / num_messages * 1e6, 3),
+        "envelope_count_us_per_msg": round(envelope_secs / num_messages * 1e6, 3),
+    }
+    logger.info(f"Envelope benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the envelope benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+utils_fanout.py - run a producer as several worker processes.
+
+Each worker process owns a slice of the keyspace (for example a subset
+of authors or sensor ids). Keys are dealt out in turn, so slices differ
+in size by at most one and no worker is left without keys while there
+are at least as many keys as workers. Per-key order is kept, because
+each key only ever comes from one process. Producers share their target
+rate between the workers (see utils_rate.create_rate_scheduler).
+
+Environment variables:
+    PRODUCER_WORKERS  Number of worker processes (default 1, no fan-out).
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import multiprocessing
+import os
+
+# Import functions from local modules
+from utils.utils_logger import logger
+from utils.utils_profiling import run_profiled
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_PRODUCER_WORKERS = 1
+
+#####################################
+# Keyspace Slicing
+#####################################
+
+
+def get_producer_workers() -> int:
+    """Fetch the number of producer worker processes from environment or use default."""
+    workers = int(os.getenv("PRODUCER_WORKERS", DEFAULT_PRODUCER_WORKERS))
+    return max(1, workers)
+
+
+def key_slice(keys, worker_index: int, num_workers: int) -> list:
+    """
+    Return the keys owned by one worker.
+
+    Args:
+        keys (iterable): All keys, e.g. the list of authors.
+        worker_index (int): This worker's index, from 0 to num_workers - 1.
+        num_workers (int): Total number of workers.
+
+    Returns:
+        list: Keys owned by this worker, in their original order.
+    """
+    return list(keys)[worker_index::num_workers]
+
+
+#####################################
+# Worker Launcher
+#####################################
+
+
+def run_workers(target, num_workers: int, args: tuple = ()) -> int:
+    """
+    Run target(worker_index, num_workers, *args) in num_workers processes.
+
+    Blocks until every worker exits. Ctrl+C stops all workers. Each
+    worker runs under utils_profiling.run_profiled, so PROFILE profiles
+    every worker with its own reports.
+
+    Args:
+        target (callable): Top-level worker function (must be picklable).
+        num_workers (int): Number of processes to start.
+        args (tuple): Extra arguments passed to every worker.
+
+    Returns:
+        int: 0 if every worker succeeded, otherwise the largest nonzero
+             exit code (a worker killed by signal N counts as N).
+    """
+    processes = [
+        multiprocessing.Process(
+            target=run_profiled,
+            args=(target, worker_index, num_workers, *args),
+            name=f"producer-worker-{worker_index}",
+        )
+        for worker_index in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {num_workers} producer worker processes.")
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.warning("Stopping producer workers...")
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+    exit_codes = [process.exitcode or 0 for process in processes]
+    logger.info(f"Producer workers exited with codes {exit_codes}.")
+    return max(abs(code) for code in exit_codes)
@@ -0,0 +1,365 @@
+"""
+utils_file_sink.py - buffered, group-committed appends to a local file.
+
+The JSON producers used to open the data file, write one line and close
+it for every message. A FileSink keeps the file open and hands lines to
+a background writer thread. The writer joins everything queued since its
+last pass and writes it with one call (a group commit) once flush_bytes
+are waiting or flush_interval_ms has passed, so the generate/send loop
+never waits on the disk.
+
+Durability is chosen with an fsync policy:
+    never     Leave it to the OS (fastest; a crash can lose recent lines).
+    batch     fsync after every group commit.
+    interval  fsync at most once every fsync_interval_ms.
+
+Environment variables (PREFIX is chosen by each producer, e.g. BUZZ):
+    PREFIX_FILE_FSYNC              never, batch or interval (default never).
+    PREFIX_FILE_FSYNC_INTERVAL_MS  Interval for the interval policy (default 1000).
+    PREFIX_FILE_FLUSH_MS           Longest a line waits before it is written (default 200).
+    PREFIX_FILE_FLUSH_BYTES        Write as soon as this many bytes wait (default 256 KiB).
+
+Run this module directly to compare the policies with one open/write/close
+per line:
+
+    python -m utils.utils_file_sink [records]
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import atexit
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+DEFAULT_FSYNC_POLICY = "never"
+DEFAULT_FSYNC_INTERVAL_MS = 1000
+DEFAULT_FLUSH_INTERVAL_MS = 200
+DEFAULT_FLUSH_BYTES = 256 * 1024
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+# write() waits once this much is queued, so a stalled disk cannot use up memory
+DEFAULT_MAX_PENDING_BYTES = 64 * 1024 * 1024
+
+
+def get_fsync_policy(prefix: str) -> str:
+    """Fetch the fsync policy for a producer from environment or use default."""
+    policy = os.getenv(f"{prefix}_FILE_FSYNC", DEFAULT_FSYNC_POLICY).strip().lower()
+    if policy not in FSYNC_POLICIES:
+        logger.warning(f"Unknown {prefix}_FILE_FSYNC '{policy}'. Using '{DEFAULT_FSYNC_POLICY}'.")
+        policy = DEFAULT_FSYNC_POLICY
+    return policy
+
+
+#####################################
+# File Sink
+#####################################
+
+
+class FileSink:
+    """
+    Append lines to a file from a background writer thread.
+
+    write() only queues the line. Errors from the writer thread are
+    raised by the next write(), flush() or close().
+    """
+
+    def __init__(
+        self,
+        file_path: pathlib.Path,
+        fsync: str = DEFAULT_FSYNC_POLICY,
+        fsync_interval_ms: float = DEFAULT_FSYNC_INTERVAL_MS,
+        flush_interval_ms: float = DEFAULT_FLUSH_INTERVAL_MS,
+        flush_bytes: int = DEFAULT_FLUSH_BYTES,
+        buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+        max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+    ):
+        """
+        Args:
+            file_path (pathlib.Path): File to append to. Parent folders are created.
+            fsync (str): never, batch or interval.
+            fsync_interval_ms (float): Smallest gap between fsyncs for the interval policy.
+            flush_interval_ms (float): Longest a queued line waits before it is written.
+            flush_bytes (int): Write as soon as this many bytes are queued.
+            buffer_bytes (int): Size of the open file's buffer.
+            max_pending_bytes (int): write() blocks while this much is queued.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'. Choose from {FSYNC_POLICIES}.")
+        self.file_path = pathlib.Path(file_path)
+        self.fsync = fsync
+        self.fsync_interval_secs = fsync_interval_ms / 1000
+        self.flush_interval_secs = flush_interval_ms / 1000
+        self.flush_bytes = flush_bytes
+        self.max_pending_bytes = max_pending_bytes
+
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.file_path, "ab", buffering=buffer_bytes)
+        self._pending = []
+        self._pending_bytes = 0
+        self._queued = 0  # Lines accepted by write()
+        self._written = 0  # Lines handed to the OS (and fsynced, for the batch policy)
+        self._error = None
+        self._closing = False
+        self._flush_requested = False  # Set by flush() to write without waiting for the interval
+        self._last_fsync = time.monotonic()
+        self._cond = threading.Condition()
+
+        self.batches = 0
+        self.bytes_written = 0
+        self.fsyncs = 0
+        self.largest_batch = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"file-sink-{self.file_path.name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, line) -> None:
+        """
+        Queue one line (str or bytes, including its newline) for writing.
+
+        Raises:
+            RuntimeError: If the sink is closed.
+            OSError: If an earlier write failed on the writer thread.
+        """
+        data = line.encode("utf-8") if isinstance(line, str) else line
+        with self._cond:
+            self._raise_error()
+            if self._closing:
+                raise RuntimeError(f"File sink for {self.file_path} is closed")
+            while self._pending_bytes >= self.max_pending_bytes and self._error is None:
+                self._cond.wait()
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            self._queued += 1
+            if self._pending_bytes >= self.flush_bytes:
+                self._cond.notify_all()
+
+    def write_record(self, record: dict) -> None:
+        """Queue a record as one line of JSON."""
+        self.write(json.dumps(record) + "\n")
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every line queued so far has been written (and fsynced,
+        unless the policy is never or interval).
+
+        Returns:
+            bool: True if everything was written before the timeout.
+        """
+        with self._cond:
+            target = self._queued
+            if self._written < target:
+                self._flush_requested = True
+                self._cond.notify_all()
+            done = self._cond.wait_for(lambda: self._written >= target or self._error is not None, timeout)
+            self._raise_error()
+            return done
+
+    def close(self, timeout: float = None) -> None:
+        """Write everything queued, fsync unless the policy is never, and close the file."""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"File sink for {self.file_path} did not finish writing within {timeout}s")
+            return
+        self._file.close()
+        logger.info(f"File sink closed for {self.file_path}: {self.snapshot()}")
+        self._raise_error()
+
+    def snapshot(self) -> dict:
+        """Return counts of lines, batches, bytes and fsyncs so far."""
+        return {
+            "lines": self._written,
+            "batches": self.batches,
+            "bytes": self.bytes_written,
+            "fsyncs": self.fsyncs,
+            "largest_batch": self.largest_batch,
+        }
+
+    def _raise_error(self) -> None:
+        """Re-raise a writer thread error on the calling thread (lock held)."""
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        """Writer thread: group-commit queued lines until closed."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closing or self._flush_requested or self._pending_bytes >= self.flush_bytes,
+                    self.flush_interval_secs,
+                )
+                batch, count = self._pending, len(self._pending)
+                self._pending, self._pending_bytes = [], 0
+                self._flush_requested = False
+                self._cond.notify_all()  # Wake writers waiting on max_pending_bytes
+                closing = self._closing
+
+            try:
+                if batch:
+                    self._commit(batch, closing)
+                elif closing and self.fsync != "never":
+                    os.fsync(self._file.fileno())
+            except OSError as e:
+                logger.error(f"File sink write to {self.file_path} failed: {e}")
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self._written += count
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    return
+
+    def _commit(self, batch: list, closing: bool) -> None:
+        """Write one batch with a single call and fsync as the policy requires."""
+        data = b"".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        self.batches += 1
+        self.bytes_written += len(data)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        now = time.monotonic()
+        if self.fsync == "batch" or (
+            self.fsync == "interval" and (closing or now - self._last_fsync >= self.fsync_interval_secs)
+        ):
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+            self._last_fsync = now
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def get_file_sink_options(prefix: str) -> dict:
+    """
+    Read FileSink options from PREFIX_FILE_* environment variables.
+
+    Args:
+        prefix (str): Environment variable prefix, e.g. "BUZZ".
+
+    Returns:
+        dict: Keyword arguments for FileSink.
+    """
+    return {
+        "fsync": get_fsync_policy(prefix),
+        "fsync_interval_ms": float(os.getenv(f"{prefix}_FILE_FSYNC_INTERVAL_MS", DEFAULT_FSYNC_INTERVAL_MS)),
+        "flush_interval_ms": float(os.getenv(f"{prefix}_FILE_FLUSH_MS", DEFAULT_FLUSH_INTERVAL_MS)),
+        "flush_bytes": int(os.getenv(f"{prefix}_FILE_FLUSH_BYTES", DEFAULT_FLUSH_BYTES)),
+    }
+
+
+def create_file_sink(file_path: pathlib.Path, prefix: str) -> FileSink:
+    """
+    Build a FileSink from PREFIX_FILE_* environment variables.
+
+    Args:
+        file_path (pathlib.Path): File to append to.
+        prefix (str): Environment variable prefix, e.g. "BUZZ".
+
+    Returns:
+        FileSink: Open sink with its writer thread running.
+    """
+    sink = FileSink(file_path, **get_file_sink_options(prefix))
+    logger.info(f"File sink for {file_path}: fsync {sink.fsync}, flush every {sink.flush_interval_secs * 1000:g} ms")
+    return sink
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_records: int = 100_000) -> dict:
+    """
+    Compare appending one JSON line per record with each fsync policy.
+
+    For each variant, enqueue_per_sec is the rate the producer loop sees;
+    total_per_sec includes waiting for close() to write and fsync.
+    """
+    record = {
+        "message": "I just tried a movie! It was boring.",
+        "author": "Alice",
+        "timestamp": "2025-02-07 19:04:30",
+        "category": "entertainment",
+        "sentiment": 0.86,
+        "keyword_mentioned": "movie",
+        "message_length": 36,
+    }
+    variants = {
+        "open_per_line": None,
+        "never": {"fsync": "never"},
+        "interval_100ms": {"fsync": "interval", "fsync_interval_ms": 100},
+        "batch": {"fsync": "batch"},
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, options in variants.items():
+            file_path = pathlib.Path(tmp) / f"{name}.json"
+            start = time.perf_counter()
+            if options is None:
+                for _ in range(num_records):
+                    with open(file_path, "a") as f:
+                        f.write(json.dumps(record) + "\n")
+                enqueue_secs = total_secs = time.perf_counter() - start
+                fsyncs = 0
+            else:
+                sink = FileSink(file_path, **options)
+                for _ in range(num_records):
+                    sink.write_record(record)
+                enqueue_secs = time.perf_counter() - start
+                sink.close()
+                total_secs = time.perf_counter() - start
+                fsyncs = sink.fsyncs
+            with open(file_path, "rb") as check:
+                assert sum(1 for _ in check) == num_records
+            results[name] = {
+                "enqueue_per_sec": round(num_records / enqueue_secs),
+                "total_per_sec": round(num_records / total_secs),
+                "fsyncs": fsyncs,
+            }
+            logger.info(f"File sink benchmark {name}: {results[name]}")
+    return results
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the file sink benchmark with the record count given as the first argument."""
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
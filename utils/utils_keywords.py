@@ -0,0 +1,371 @@
+"""
+utils_keywords.py - categorize messages by keyword in a single pass.
+
+A KeywordMatcher compiles a keyword -> category taxonomy into an
+Aho-Corasick automaton. Matching walks the message text once, however
+many keywords there are, and reports every match, not just the first.
+For small taxonomies (the default has seven keywords) categorize() scans
+for each keyword with str.find instead, which is faster than walking the
+automaton in Python and returns the same result.
+
+Taxonomies can be loaded from a JSON object file ({"keyword": "category"})
+or from a CSV file with keyword and category columns.
+
+Run this module directly to benchmark the matcher against the linear
+`next(word for word in KEYWORD_CATEGORIES if word in text)` scan:
+
+    python -m utils.utils_keywords
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import csv
+import json
+import os
+import pathlib
+import random
+import string
+import time
+from collections import deque
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_CATEGORY = "other"
+
+# categorize() uses str.find per keyword up to this many keywords
+LINEAR_SCAN_MAX_KEYWORDS = 16
+
+DEFAULT_KEYWORD_CATEGORIES = {
+    "meme": "humor",
+    "Python": "tech",
+    "JavaScript": "tech",
+    "recipe": "food",
+    "travel": "travel",
+    "movie": "entertainment",
+    "game": "gaming",
+}
+
+#####################################
+# Keyword Matcher
+#####################################
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick matcher over a keyword -> category taxonomy.
+
+    Building the automaton costs time proportional to the total keyword
+    length. Matching costs time proportional to the text length plus the
+    number of matches.
+    """
+
+    def __init__(self, keyword_categories: dict, case_sensitive: bool = True):
+        """
+        Args:
+            keyword_categories (dict): Map of keyword to category.
+            case_sensitive (bool): If False, keywords and text are lowercased.
+        """
+        self.case_sensitive = case_sensitive
+        self.keyword_categories = dict(keyword_categories)
+
+        # State 0 is the root. goto[s] maps a character to the next state,
+        # fail[s] is the longest proper suffix state, and output[s] lists
+        # the keywords that end at state s (including via fail links).
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for keyword in self.keyword_categories:
+            self._add_keyword(keyword)
+        self._build_fail_links()
+
+        # Small taxonomies: (pattern, keyword) pairs for a str.find scan
+        self._scan = None
+        if len(self.keyword_categories) <= LINEAR_SCAN_MAX_KEYWORDS:
+            self._scan = [
+                (keyword if case_sensitive else keyword.lower(), keyword)
+                for keyword in self.keyword_categories
+                if keyword
+            ]
+
+    def _add_keyword(self, keyword: str) -> None:
+        """Add one keyword to the trie."""
+        if not keyword:
+            return
+        pattern = keyword if self.case_sensitive else keyword.lower()
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + ((keyword, len(pattern)),)
+
+    def _build_fail_links(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    def __len__(self) -> int:
+        return len(self.keyword_categories)
+
+    def find_all(self, text: str) -> list:
+        """
+        Find every keyword occurrence in text.
+
+        Args:
+            text (str): Text to scan.
+
+        Returns:
+            list: (start_index, keyword) tuples in order of where each match ends.
+        """
+        if not self.case_sensitive:
+            text = text.lower()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for keyword, length in output[state]:
+                    matches.append((i - length + 1, keyword))
+        return matches
+
+    def keywords_in(self, text: str) -> list:
+        """Return the distinct keywords found in text, in order of first appearance."""
+        return list(dict.fromkeys(keyword for _, keyword in sorted(self.find_all(text))))
+
+    def categorize(self, text: str, default: str = DEFAULT_CATEGORY) -> tuple:
+        """
+        Return the first keyword in text and its category.
+
+        Args:
+            text (str): Text to scan.
+            default (str): Keyword and category to use when nothing matches.
+
+        Returns:
+            tuple: (keyword_mentioned, category)
+        """
+        if self._scan is not None:
+            return self._scan_categorize(text, default)
+        matches = self.find_all(text)
+        if not matches:
+            return default, default
+        _, keyword = min(matches)
+        return keyword, self.keyword_categories[keyword]
+
+    def _scan_categorize(self, text: str, default: str) -> tuple:
+        """categorize() for small taxonomies: the earliest str.find hit wins."""
+        if not self.case_sensitive:
+            text = text.lower()
+        first = None
+        for pattern, keyword in self._scan:
+            start = text.find(pattern)
+            if start >= 0 and (first is None or (start, keyword) < first):
+                first = (start, keyword)
+        if first is None:
+            return default, default
+        return first[1], self.keyword_categories[first[1]]
+
+    def enrich(self, message: dict, text_field: str = "message") -> dict:
+        """
+        Add keyword and category fields to a message dict.
+
+        Sets "keywords" and "categories" to every match, and fills in
+        "keyword_mentioned" and "category" from the first match if the
+        message does not already have them.
+
+        Args:
+            message (dict): Message to enrich in place.
+            text_field (str): Field holding the text to scan.
+
+        Returns:
+            dict: The same message, for chaining.
+        """
+        keywords = self.keywords_in(message.get(text_field, ""))
+        message["keywords"] = keywords
+        message["categories"] = list(
+            dict.fromkeys(self.keyword_categories[k] for k in keywords)
+        )
+        message.setdefault("keyword_mentioned", keywords[0] if keywords else DEFAULT_CATEGORY)
+        message.setdefault(
+            "category", message["categories"][0] if keywords else DEFAULT_CATEGORY
+        )
+        return message
+
+    def enrich_messages(self, messages, text_field: str = "message"):
+        """Yield each message from an iterable after enriching it."""
+        for message in messages:
+            yield self.enrich(message, text_field)
+
+
+#####################################
+# Taxonomy Loading
+#####################################
+
+
+def load_keyword_categories(file_path: pathlib.Path) -> dict:
+    """
+    Load a keyword -> category taxonomy from a JSON or CSV file.
+
+    Args:
+        file_path (pathlib.Path): A .json file holding one object, or a .csv
+                                  file with "keyword" and "category" columns.
+
+    Returns:
+        dict: Map of keyword to category.
+    """
+    file_path = pathlib.Path(file_path)
+    if file_path.suffix.lower() == ".csv":
+        with open(file_path, "r", newline="") as csv_file:
+            return {
+                row["keyword"]: row["category"]
+                for row in csv.DictReader(csv_file)
+                if row.get("keyword")
+            }
+    with open(file_path, "r") as json_file:
+        return json.load(json_file)
+
+
+def get_keyword_taxonomy_file():
+    """Fetch keyword taxonomy file path from environment, or None for the defaults."""
+    path = os.getenv("KEYWORD_TAXONOMY_FILE")
+    return pathlib.Path(path) if path else None
+
+
+def create_keyword_matcher(file_path: pathlib.Path = None) -> KeywordMatcher:
+    """
+    Create a KeywordMatcher from a taxonomy file or the default categories.
+
+    Args:
+        file_path (pathlib.Path, optional): Taxonomy file. Defaults to the
+                                            KEYWORD_TAXONOMY_FILE environment variable.
+
+    Returns:
+        KeywordMatcher: Compiled matcher.
+    """
+    file_path = file_path or get_keyword_taxonomy_file()
+    if file_path is None:
+        return KeywordMatcher(DEFAULT_KEYWORD_CATEGORIES)
+    try:
+        keyword_categories = load_keyword_categories(file_path)
+    except (OSError, json.JSONDecodeError, KeyError) as e:
+        logger.error(f"Could not load keyword taxonomy {file_path}: {e}. Using defaults.")
+        return KeywordMatcher(DEFAULT_KEYWORD_CATEGORIES)
+    logger.info(f"Loaded {len(keyword_categories)} keywords from {file_path}")
+    return KeywordMatcher(keyword_categories)
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def linear_categorize(keyword_categories: dict, text: str) -> tuple:
+    """The original scan: first keyword (in dict order) found in text."""
+    keyword = next((word for word in keyword_categories if word in text), DEFAULT_CATEGORY)
+    return keyword, keyword_categories.get(keyword, DEFAULT_CATEGORY)
+
+
+def build_synthetic_taxonomy(size: int, seed: int = 0) -> dict:
+    """Return the default keywords padded with random words up to size entries."""
+    rng = random.Random(seed)
+    taxonomy = dict(list(DEFAULT_KEYWORD_CATEGORIES.items())[:size])
+    while len(taxonomy) < size:
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+        taxonomy[word] = f"category_{len(taxonomy) % 50}"
+    return taxonomy
+
+
+def benchmark(sizes=(7, 10, 100, 1_000, 10_000), num_messages: int = 20_000) -> list:
+    """
+    Time the linear scan and the compiled matcher over templated messages.
+
+    Returns:
+        list: One dict per taxonomy size with per-message times in microseconds.
+    """
+    rng = random.Random(1)
+    topics = ["a movie", "a meme", "an app", "Python", "JavaScript", "recipe", "travel", "game"]
+    adjectives = ["amazing", "funny", "boring", "exciting", "weird"]
+    texts = [
+        f"I just tried {rng.choice(topics)}! It was {rng.choice(adjectives)}."
+        for _ in range(num_messages)
+    ]
+
+    results = []
+    for size in sizes:
+        taxonomy = build_synthetic_taxonomy(size)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(taxonomy)
+        build_secs = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            linear_categorize(taxonomy, text)
+        linear_secs = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            matcher.find_all(text)
+        matcher_secs = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            matcher.categorize(text)
+        categorize_secs = time.perf_counter() - start
+
+        result = {
+            "keywords": size,
+            "build_ms": round(build_secs * 1e3, 2),
+            "linear_us_per_msg": round(linear_secs / num_messages * 1e6, 2),
+            "matcher_us_per_msg": round(matcher_secs / num_messages * 1e6, 2),
+            "categorize_us_per_msg": round(categorize_secs / num_messages * 1e6, 2),
+        }
+        logger.info(f"Keyword benchmark: {result}")
+        results.append(result)
+    return results
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the keyword matcher benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+utils_loadgen.py - seeded synthetic buzz traffic with skewed authors and bursty arrivals.
+
+utils_gen_buzz_json_data.py writes 100 messages from 5 equally likely
+authors. Real traffic has millions of authors, a few of whom send most
+of the messages, and arrives in bursts. A load profile sets:
+
+- authors and zipf_s: number of distinct authors, and the Zipf exponent
+  of their popularity (0 = uniform; about 1 = heavy-tailed),
+- length_median and length_sigma: log-normal message length in characters,
+- arrival, rate, burst_factor, burst_secs, calm_secs: Poisson arrivals at
+  rate msgs/s, or "bursty" arrivals that switch between calm periods at
+  rate and bursts at rate x burst_factor,
+- messages: total volume.
+
+Messages have the same fields as the JSON producers. The same seed,
+profile and batch size always give the same messages, so benchmarks can
+be repeated.
+
+Output goes to an NDJSON file, or straight to a Kafka topic with the
+arrival gaps kept (divided by --speed, or "max"):
+
+    python -m utils.utils_loadgen --profile realistic --seed 7 --output data/load.ndjson
+    python -m utils.utils_loadgen --profile stress --topic buzz_json --speed max
+    python -m utils.utils_loadgen --benchmark
+
+One process renders about 110 MB/s of NDJSON with the default realistic
+profile (what --benchmark measures unless --profile is given), so
+hundreds of MB/s take --workers. With --workers N, N processes each
+make 1/N of the messages at 1/N of the rate, from independent seeds,
+writing to load-00.ndjson, load-01.ndjson, ... or to the topic.
+
+Environment variables (defaults for the command line options):
+    LOADGEN_PROFILE  Name of a profile in LOAD_PROFILES (default realistic).
+    LOADGEN_SEED     Seed for repeatable output (default 0).
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_keywords import DEFAULT_KEYWORD_CATEGORIES
+from utils.utils_logger import logger, configure_logging
+from utils.utils_replay import parse_speed, prefetch, replay, serialize_raw
+
+#####################################
+# Default Configurations
+#####################################
+
+# Named load profiles.
+# - smoke: a handful of authors at a trickle, for checking a pipeline end to end.
+# - realistic: a million heavy-tailed authors with periodic bursts.
+# - stress: millions of authors at a high steady Poisson rate.
+LOAD_PROFILES = {
+    "smoke": {
+        "authors": 5,
+        "zipf_s": 0.0,
+        "length_median": 30,
+        "length_sigma": 0.3,
+        "arrival": "poisson",
+        "rate": 10.0,
+        "messages": 1_000,
+    },
+    "realistic": {
+        "authors": 1_000_000,
+        "zipf_s": 1.1,
+        "length_median": 60,
+        "length_sigma": 0.7,
+        "arrival": "bursty",
+        "rate": 2_000.0,
+        "burst_factor": 10.0,
+        "burst_secs": 2.0,
+        "calm_secs": 30.0,
+        "messages": 1_000_000,
+    },
+    "stress": {
+        "authors": 5_000_000,
+        "zipf_s": 1.3,
+        "length_median": 120,
+        "length_sigma": 0.9,
+        "arrival": "poisson",
+        "rate": 100_000.0,
+        "messages": 10_000_000,
+    },
+}
+DEFAULT_LOAD_PROFILE = "realistic"
+ARRIVAL_PROCESSES = ("poisson", "bursty")
+
+# Used where a profile leaves a bursty setting out
+DEFAULT_BURST_FACTOR = 10.0
+DEFAULT_BURST_SECS = 2.0
+DEFAULT_CALM_SECS = 30.0
+
+MAX_MESSAGE_LENGTH = 1000
+DEFAULT_BATCH_SIZE = 65_536
+DEFAULT_START_TIME = datetime(2025, 1, 1)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Filler text; plain ASCII words, so messages never need JSON escaping
+FILLER_WORDS = (
+    "streaming data kafka broker topic partition offset consumer producer latency "
+    "batch window stall smoker brisket sensor alert message buzz fun great day "
+    "love learning today really pretty quick slow new old big small team"
+).split()
+CORPUS_WORDS = 20_000
+# Filler strings are cut once per length; each message picks one of these variants
+FILLER_VARIANTS = 8
+
+
+def get_load_profile() -> str:
+    """Fetch the load profile name from environment or use default."""
+    return os.getenv("LOADGEN_PROFILE", DEFAULT_LOAD_PROFILE)
+
+
+def get_load_seed() -> int:
+    """Fetch the load generator seed from environment or use default."""
+    return int(os.getenv("LOADGEN_SEED", 0))
+
+
+def resolve_profile(name: str, **overrides) -> dict:
+    """
+    Return a copy of a named profile with any non-None overrides applied.
+
+    Raises:
+        ValueError: For an unknown profile or arrival process.
+    """
+    if name not in LOAD_PROFILES:
+        raise ValueError(f"Unknown load profile '{name}'. Choose from {sorted(LOAD_PROFILES)}.")
+    profile = dict(LOAD_PROFILES[name])
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    if profile["arrival"] not in ARRIVAL_PROCESSES:
+        raise ValueError(f"Unknown arrival process '{profile['arrival']}'. Choose from {ARRIVAL_PROCESSES}.")
+    return profile
+
+
+#####################################
+# Distributions
+#####################################
+
+
+class ZipfAuthors:
+    """
+    Draw author ids 1..num_authors with P(id = k) proportional to 1 / k**s.
+
+    s = 0 is uniform. Unlike numpy's zipf(), the support is finite and
+    any s >= 0 is allowed.
+    """
+
+    def __init__(self, num_authors: int, s: float):
+        self.num_authors = num_authors
+        self.s = s
+        self._cdf = None
+        if s > 0:
+            weights = np.arange(1, num_authors + 1, dtype=np.float64) ** -s
+            self._cdf = np.cumsum(weights)
+            self._cdf /= self._cdf[-1]
+
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Return n author ids."""
+        if self._cdf is None:
+            return rng.integers(1, self.num_authors + 1, size=n)
+        ranks = np.searchsorted(self._cdf, rng.random(n), side="right")
+        return np.minimum(ranks, self.num_authors - 1) + 1
+
+
+class ArrivalProcess:
+    """
+    Arrival times, in seconds from the start, for a Poisson or bursty stream.
+
+    The bursty process alternates calm periods (rate) and bursts
+    (rate x burst_factor) of exponentially distributed length. Within a
+    period arrivals are Poisson, so a gap that runs past the period end
+    is redrawn from the boundary without bias.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        arrival: str = "poisson",
+        burst_factor: float = DEFAULT_BURST_FACTOR,
+        burst_secs: float = DEFAULT_BURST_SECS,
+        calm_secs: float = DEFAULT_CALM_SECS,
+    ):
+        self.rate = rate
+        self.bursty = arrival == "bursty"
+        self.burst_factor = burst_factor
+        self.burst_secs = burst_secs
+        self.calm_secs = calm_secs
+        self.now = 0.0
+        self.in_burst = False
+        self.period_end = None
+
+    def next_offsets(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Return the next n arrival times as a float64 array."""
+        if not self.bursty:
+            offsets = self.now + np.cumsum(rng.exponential(1.0 / self.rate, size=n))
+            self.now = float(offsets[-1])
+            return offsets
+
+        if self.period_end is None:
+            self.period_end = rng.exponential(self.calm_secs)
+        pieces = []
+        needed = n
+        while needed:
+            rate = self.rate * (self.burst_factor if self.in_burst else 1.0)
+            expected = int((self.period_end - self.now) * rate * 1.2) + 16
+            times = self.now + np.cumsum(rng.exponential(1.0 / rate, size=min(needed, expected)))
+            inside = times[times < self.period_end]
+            pieces.append(inside)
+            needed -= len(inside)
+            if len(inside) < len(times):
+                # Period over: switch state and continue from its end
+                self.now = self.period_end
+                self.in_burst = not self.in_burst
+                self.period_end = self.now + rng.exponential(self.burst_secs if self.in_burst else self.calm_secs)
+            elif len(inside):
+                self.now = float(inside[-1])
+        return np.concatenate(pieces)
+
+
+#####################################
+# Load Generator
+#####################################
+
+
+class LoadGenerator:
+    """
+    Render seeded synthetic buzz messages as NDJSON lines, a batch at a time.
+
+    All random draws for a batch are made with NumPy; each line is then
+    filled into a per-keyword template with one % operation.
+    """
+
+    def __init__(self, profile: dict, seed: int = 0, start_time: datetime = DEFAULT_START_TIME):
+        """
+        Args:
+            profile (dict): Load profile, e.g. resolve_profile("realistic").
+            seed (int): Seed for every random draw.
+            start_time (datetime): Timestamp of time 0.
+        """
+        self.profile = profile
+        self.rng = np.random.default_rng(seed)
+        self.start_time = start_time
+        self.authors = ZipfAuthors(profile["authors"], profile["zipf_s"])
+        self.arrivals = ArrivalProcess(
+            profile["rate"],
+            profile["arrival"],
+            profile.get("burst_factor", DEFAULT_BURST_FACTOR),
+            profile.get("burst_secs", DEFAULT_BURST_SECS),
+            profile.get("calm_secs", DEFAULT_CALM_SECS),
+        )
+        self.author_format = f"user%0{len(str(profile['authors']))}d"
+
+        keywords = list(DEFAULT_KEYWORD_CATEGORIES)
+        self.keyword_lengths = np.array([len(keyword) + 1 for keyword in keywords])
+        self.templates = [
+            '{"message": "' + keyword + ' %s", "author": "' + self.author_format + '", '
+            '"timestamp": "%s", "category": "' + category + '", "sentiment": %s, '
+            '"keyword_mentioned": "' + keyword + '", "message_length": %d}\n'
+            for keyword, category in DEFAULT_KEYWORD_CATEGORIES.items()
+        ]
+        self.sentiments = [repr(round(i / 100, 2)) for i in range(-100, 101)]
+        corpus = " ".join(self.rng.choice(FILLER_WORDS, CORPUS_WORDS).tolist())
+        word_starts = np.flatnonzero(np.frombuffer(corpus.encode("ascii"), dtype=np.uint8) == 32) + 1
+        word_starts = word_starts[word_starts < len(corpus) - MAX_MESSAGE_LENGTH]
+        variant_starts = self.rng.choice(word_starts, FILLER_VARIANTS).tolist()
+        # fillers[length * FILLER_VARIANTS + variant] is a slice of that length
+        self.fillers = [
+            corpus[start:start + length]
+            for length in range(MAX_MESSAGE_LENGTH + 1)
+            for start in variant_starts
+        ]
+        self.generated = 0
+
+    def _timestamps(self, offsets: np.ndarray) -> list:
+        """Format arrival offsets as timestamps, formatting each distinct second once."""
+        seconds, inverse = np.unique(offsets.astype(np.int64), return_inverse=True)
+        texts = [(self.start_time + timedelta(seconds=int(s))).strftime(TIMESTAMP_FORMAT) for s in seconds]
+        return [texts[i] for i in inverse.tolist()]
+
+    def next_batch(self, n: int) -> tuple:
+        """
+        Generate the next n messages.
+
+        Returns:
+            tuple: (offsets float64 array of arrival seconds,
+                    author ids int array,
+                    list of NDJSON lines ending in a newline).
+        """
+        rng = self.rng
+        profile = self.profile
+        keyword_idx = rng.integers(0, len(self.templates), size=n)
+        author_ids = self.authors.draw(rng, n)
+        lengths = rng.lognormal(np.log(profile["length_median"]), profile["length_sigma"], size=n)
+        lengths = np.clip(lengths.astype(np.int64), self.keyword_lengths[keyword_idx] + 1, MAX_MESSAGE_LENGTH)
+        filler_idx = (lengths - self.keyword_lengths[keyword_idx]) * FILLER_VARIANTS
+        filler_idx += rng.integers(0, FILLER_VARIANTS, size=n)
+        sentiment_idx = rng.integers(0, len(self.sentiments), size=n)
+        offsets = self.arrivals.next_offsets(rng, n)
+
+        fillers = map(self.fillers.__getitem__, filler_idx.tolist())
+        templates = [self.templates[i] for i in keyword_idx.tolist()]
+        sentiments = [self.sentiments[i] for i in sentiment_idx.tolist()]
+        fields = zip(fillers, author_ids.tolist(), self._timestamps(offsets), sentiments, lengths.tolist())
+        self.generated += n
+        return offsets, author_ids, list(map(str.__mod__, templates, fields))
+
+    def batches(self, num_messages: int = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Yield next_batch() results until num_messages (default: the profile's) are made."""
+        remaining = self.profile["messages"] if num_messages is None else num_messages
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            remaining -= n
+            yield self.next_batch(n)
+
+    def write_ndjson(self, file_path: pathlib.Path, num_messages: int = None) -> int:
+        """
+        Write messages to an NDJSON file.
+
+        Returns:
+            int: Bytes written.
+        """
+        written = 0
+        pathlib.Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "wb") as out:
+            for _offsets, _authors, lines in self.batches(num_messages):
+                written += out.write("".join(lines).encode("utf-8"))
+        logger.info(f"Wrote {self.generated:,} messages ({written / 1e6:.1f} MB) to {file_path}")
+        return written
+
+    def send_batches(self, num_messages: int = None):
+        """Yield (offsets, keys, payloads) batches for utils_replay.replay(), keyed by author."""
+        author_format = self.author_format
+        for offsets, author_ids, lines in self.batches(num_messages):
+            keys = [author_format % author_id for author_id in author_ids.tolist()]
+            payloads = [line[:-1].encode("utf-8") for line in lines]
+            yield offsets.tolist(), keys, payloads
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(profile_name: str = DEFAULT_LOAD_PROFILE, num_messages: int = 1_000_000, seed: int = 0) -> dict:
+    """Measure NDJSON write throughput and check the seed gives identical output."""
+    profile = resolve_profile(profile_name)
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = pathlib.Path(tmp) / "load.ndjson"
+        start = time.perf_counter()
+        written = LoadGenerator(profile, seed).write_ndjson(file_path, num_messages)
+        secs = time.perf_counter() - start
+        _offsets, _authors, lines = LoadGenerator(profile, seed).next_batch(min(DEFAULT_BATCH_SIZE, num_messages))
+        with open(file_path, "r", encoding="utf-8") as check:
+            assert [check.readline() for _ in range(1000)] == lines[:1000]
+
+    result = {
+        "profile": profile_name,
+        "messages": num_messages,
+        "mb_per_sec": round(written / secs / 1e6, 1),
+        "messages_per_sec": round(num_messages / secs),
+        "bytes_per_message": round(written / num_messages, 1),
+    }
+    logger.info(f"Load generator benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def worker_output_path(output: pathlib.Path, worker_index: int, num_workers: int) -> pathlib.Path:
+    """Return the NDJSON file for one worker: output itself, or output-NN.suffix."""
+    if num_workers == 1:
+        return output
+    return output.with_name(f"{output.stem}-{worker_index:02d}{output.suffix}")
+
+
+def run_loadgen_worker(
+    worker_index: int,
+    num_workers: int,
+    profile: dict,
+    seed: int,
+    output: pathlib.Path = None,
+    topic: str = None,
+    speed: str = "max",
+):
+    """
+    Generate this worker's share of the load to a file or a Kafka topic.
+
+    Worker i of N makes messages / N messages at rate / N msgs/s, with
+    the i-th child of the seed, so a run is repeatable for a given N.
+    """
+    configure_logging()
+    if num_workers > 1:
+        profile = dict(
+            profile,
+            messages=profile["messages"] // num_workers + (worker_index < profile["messages"] % num_workers),
+            rate=profile["rate"] / num_workers,
+        )
+        seed = np.random.SeedSequence(seed).spawn(num_workers)[worker_index]
+    generator = LoadGenerator(profile, seed)
+
+    if output:
+        generator.write_ndjson(worker_output_path(output, worker_index, num_workers))
+        return
+
+    from utils.utils_producer import create_buffered_producer
+
+    producer = create_buffered_producer(value_serializer=serialize_raw)
+    if producer is None:
+        logger.error("Failed to create Kafka producer. Exiting...")
+        sys.exit(3)
+
+    def send(payload, key):
+        producer.send(topic, value=payload, key=key)
+
+    try:
+        stats = replay(send, prefetch(generator.send_batches()), parse_speed(speed))
+        logger.info(f"Worker {worker_index} sent load to topic '{topic}': {stats}")
+    except KeyboardInterrupt:
+        logger.warning("Load generator interrupted by user.")
+    finally:
+        producer.close()
+
+
+def main(argv=None):
+    """Generate load to an NDJSON file or a Kafka topic from the command line."""
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic buzz traffic.")
+    parser.add_argument("--profile", default=get_load_profile(), choices=sorted(LOAD_PROFILES))
+    parser.add_argument("--seed", type=int, default=get_load_seed())
+    parser.add_argument("--messages", type=int, help="Total messages")
+    parser.add_argument("--authors", type=int, help="Distinct authors")
+    parser.add_argument("--zipf-s", type=float, help="Zipf exponent of author popularity (0 = uniform)")
+    parser.add_argument("--length-median", type=float, help="Median message length in characters")
+    parser.add_argument("--length-sigma", type=float, help="Log-normal sigma of message length")
+    parser.add_argument("--arrival", choices=ARRIVAL_PROCESSES, help="Arrival process")
+    parser.add_argument("--rate", type=float, help="Messages per second (calm rate when bursty)")
+    parser.add_argument("--burst-factor", type=float, help="Burst rate as a multiple of rate")
+    parser.add_argument("--output", type=pathlib.Path, help="NDJSON file to write")
+    parser.add_argument("--topic", help="Kafka topic to send to instead of a file")
+    parser.add_argument("--speed", default="max", help="Speed factor for --topic, e.g. 1, 10, or max")
+    parser.add_argument("--workers", type=int, default=1, help="Generator processes")
+    parser.add_argument("--benchmark", action="store_true", help="Time NDJSON output and exit")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.benchmark:
+        benchmark(args.profile, args.messages or 1_000_000, args.seed)
+        return
+    if not args.output and not args.topic:
+        parser.error("give --output FILE or --topic TOPIC")
+
+    profile = resolve_profile(
+        args.profile,
+        messages=args.messages,
+        authors=args.authors,
+        zipf_s=args.zipf_s,
+        length_median=args.length_median,
+        length_sigma=args.length_sigma,
+        arrival=args.arrival,
+        rate=args.rate,
+        burst_factor=args.burst_factor,
+    )
+    logger.info(f"Load profile '{args.profile}' (seed {args.seed}, {args.workers} workers): {profile}")
+
+    if args.topic:
+        from utils.utils_producer import verify_services, create_kafka_topic
+
+        verify_services()
+        create_kafka_topic(args.topic)
+
+    worker_args = (profile, args.seed, args.output, None if args.output else args.topic, args.speed)
+    if args.workers <= 1:
+        run_loadgen_worker(0, 1, *worker_args)
+        return
+
+    from utils.utils_fanout import run_workers
+
+    sys.exit(run_workers(run_loadgen_worker, args.workers, args=worker_args))
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,58 @@ This script provides logging functions for the project.
 Logging is an essential way to track events and issues during execution. 
 
 Features:
-- Logs information, warnings, and errors to a designated log file.
+- Logs information, warnings, and errors to a log file per process
+  (e.g. logs/kersha_json_live_producer-producer-worker-1-pid4242.log), so
+  processes, including two runs of the same script, never share a file.
+- Rotates files by size or time, gzips rotated files on a background
+  thread and deletes the oldest beyond a retention limit, counted across
+  every run of the script, bounding disk use.
+- Optionally writes compact JSON lines that read_log_records() can load
+  without regex parsing.
 - Ensures the log directory exists.
+- Sets up the log file only when configure_logging() is called, so
+  importing the logger stays cheap and free of side effects. loguru
+  itself is imported on the first logger call.
+- Can write log records from a background thread (LOG_ENQUEUE) when the
+  console or disk is slow enough to block the caller.
+- Per-module levels, e.g. quiet kafka internals while debugging a producer.
+- log_sampled() for per-message logs: keeps 1 in N calls and at most a few
+  lines per second per call site, and formats nothing for dropped calls.
+
+Hot paths should pass values as arguments instead of f-strings, so the
+message is only formatted when it is actually written:
+
+    logger.debug("Raw message: {}", message)
+    log_sampled("INFO", "Processed JSON message: {}", message_dict)
+
+Environment variables (read by configure_logging):
+    LOG_LEVEL           Level for the log file (default INFO).
+    LOG_CONSOLE_LEVEL   Level for the console (default INFO; loguru alone shows DEBUG).
+    LOG_MODULE_LEVELS   Per-module overrides, e.g. "__main__=WARNING,utils.utils_producer=DEBUG".
+    LOG_ENQUEUE         Write from a background thread (default false).
+                        loguru pickles each queued record, which costs more
+                        than a local file write; enable it for slow sinks.
+    LOG_SAMPLE_EVERY    log_sampled() keeps 1 call in N per call site (default 1).
+    LOG_MAX_PER_SECOND  log_sampled() lines per second per call site (default 10, 0 = no limit).
+    LOG_PER_PROCESS     One file per script and worker (default true); false shares LOG_FILE.
+    LOG_ROTATION        Start a new file at this size or age, e.g. "50 MB", "1 day", "00:00" (default 50 MB).
+    LOG_RETENTION       Files to keep per script or worker (e.g. 10) or an age such as "7 days" (default 10).
+    LOG_COMPRESSION     gz to compress rotated files in the background, or none (default gz).
+    LOG_FORMAT          text or json (default text).
 """
 
 # Imports from Python Standard Library
+import gzip
+import json
+import os
+import shutil
 import pathlib
-
-# Imports from external packages
-from loguru import logger
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from glob import escape as glob_escape
 
 # Get this file name without the extension
 CURRENT_SCRIPT = pathlib.Path(__file__).stem
@@ -22,27 +65,355 @@ CURRENT_SCRIPT = pathlib.Path(__file__).stem
 # Set directory where logs will be stored
 LOG_FOLDER: pathlib.Path = pathlib.Path("logs")
 
-# Set the name of the log file
+# Set the name of the shared log file (used when LOG_PER_PROCESS is false)
 LOG_FILE: pathlib.Path = LOG_FOLDER.joinpath("project_log.log")
 
-# Ensure the log folder exists or create it
-try:
-    LOG_FOLDER.mkdir(exist_ok=True)
-    logger.info(f"Log folder created at: {LOG_FOLDER}")
-except Exception as e:
-    logger.error(f"Error creating log folder: {e}")
+DEFAULT_ROTATION = "50 MB"
+DEFAULT_RETENTION = "10"
+LOG_FORMATS = ("text", "json")
+
+# LOG_RETENTION age units, in seconds
+RETENTION_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+
+# Numbers of loguru's built-in levels
+LEVEL_NUMBERS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# Set once the file sink has been added. Until then loguru's default
+# console handler is active and every level is enabled.
+_configured = {"done": False, "min_level": 0, "sample_every": 1, "max_per_second": 0.0, "log_file": LOG_FILE}
+
+# Per call site state for log_sampled(), keyed by (code object, line number)
+_call_sites = {}
+
+
+class LazyLogger:
+    """
+    Stand-in for loguru's logger that imports loguru on first use.
+
+    Each attribute looked up is cached on the instance, so after the
+    first call logger.info and friends are loguru's own bound methods.
+    """
+
+    def __getattr__(self, name):
+        from loguru import logger as loguru_logger
+
+        value = getattr(loguru_logger, name)
+        setattr(self, name, value)
+        return value
+
+
+logger = LazyLogger()
+
+
+def get_log_level() -> str:
+    """Fetch the log file level from environment or use default."""
+    return os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def get_console_level() -> str:
+    """Fetch the console log level from environment or use default."""
+    return os.getenv("LOG_CONSOLE_LEVEL", "INFO").upper()
+
+
+def get_module_levels() -> dict:
+    """Parse LOG_MODULE_LEVELS ("module=LEVEL,...") into a dict."""
+    levels = {}
+    for item in os.getenv("LOG_MODULE_LEVELS", "").split(","):
+        module, _, level = item.partition("=")
+        if module.strip() and level.strip():
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def get_log_enqueue() -> bool:
+    """Fetch whether log records are written from a background thread."""
+    return os.getenv("LOG_ENQUEUE", "false").strip().lower() in ("1", "true", "yes")
+
+
+def get_log_per_process() -> bool:
+    """Fetch whether each process writes its own log file."""
+    return os.getenv("LOG_PER_PROCESS", "true").strip().lower() not in ("0", "false", "no")
+
+
+def get_log_retention():
+    """Fetch the retention as a file count (int) or an age string for loguru."""
+    retention = os.getenv("LOG_RETENTION", DEFAULT_RETENTION).strip()
+    return int(retention) if retention.isdigit() else retention
+
+
+def get_log_format() -> str:
+    """Fetch the log file format from environment or use default."""
+    log_format = os.getenv("LOG_FORMAT", "text").strip().lower()
+    return log_format if log_format in LOG_FORMATS else "text"
+
+
+def get_process_log_file() -> pathlib.Path:
+    """
+    Return the log file for this process: the script name, plus the
+    process name for multiprocessing workers, plus the process id so two
+    runs of the same script never write or rotate the same file.
+    """
+    import multiprocessing
+
+    name = pathlib.Path(sys.argv[0]).stem if sys.argv and sys.argv[0] not in ("", "-c") else "python"
+    process_name = multiprocessing.current_process().name
+    if process_name != "MainProcess":
+        name = f"{name}-{process_name}"
+    return LOG_FOLDER.joinpath(f"{name}-pid{os.getpid()}.log")
+
+
+def retention_seconds(retention: str) -> float:
+    """Parse an age such as "7 days" or "12 hours" into seconds."""
+    amount, _, unit = retention.strip().partition(" ")
+    unit = unit.strip().lower().rstrip("s")
+    if unit not in RETENTION_UNITS:
+        raise ValueError(f"Unknown LOG_RETENTION unit '{unit}'. Choose from {sorted(RETENTION_UNITS)}.")
+    return float(amount) * RETENTION_UNITS[unit]
+
+
+def make_retention(log_file: pathlib.Path, retention):
+    """
+    Return a loguru retention callable covering every run of the script.
+
+    loguru only sees files named like this process's log file, and the
+    name holds the process id, so files left by earlier runs would never
+    be removed. This callable looks at all "<name>-pid*" files instead.
+
+    Args:
+        log_file (pathlib.Path): This process's log file, from get_process_log_file().
+        retention (int or str): Number of files to keep, or an age such as "7 days".
+    """
+    name = log_file.stem.rsplit("-pid", 1)[0]
+    max_age = None if isinstance(retention, int) else retention_seconds(retention)
+
+    def remove_old_logs(_logs: list) -> None:
+        logs = []
+        for path in log_file.parent.glob(f"{glob_escape(name)}-pid*.log*"):
+            try:
+                logs.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue  # Removed by another process meanwhile
+        logs.sort(reverse=True)
+        if max_age is None:
+            old = logs[retention:]
+        else:
+            old = [entry for entry in logs if entry[0] <= time.time() - max_age]
+        for _, path in old:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    return remove_old_logs
+
+
+def compress_in_background(path: str) -> threading.Thread:
+    """
+    Gzip a rotated log file on a separate thread, then delete the original.
 
-# Configure Loguru to write to the log file
-try:
-    logger.add(LOG_FILE, level="INFO")
-    logger.info(f"Logging to file: {LOG_FILE}")
-except Exception as e:
-    logger.error(f"Error configuring logger to write to file: {e}")
+    Used as loguru's compression callable, so rotation never waits for
+    gzip. The thread is not a daemon, so a compression in progress
+    finishes before the interpreter exits. The .gz file appears only when
+    complete. Until then it is written to a hidden name, so retention
+    (which matches names starting with the log file's stem) skips it.
+    """
+
+    def compress():
+        folder, base = os.path.split(path)
+        partial = os.path.join(folder, f".{base}.gz.partial")
+        try:
+            with open(path, "rb") as source, gzip.open(partial, "wb", compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.replace(partial, f"{path}.gz")
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Removed by retention before it was compressed
+        except OSError as e:
+            logger.warning(f"Could not compress rotated log {path}: {e}")
+
+    thread = threading.Thread(target=compress, name=f"log-compress-{os.path.basename(path)}")
+    thread.start()
+    return thread
+
+
+def format_json_line(record: dict) -> str:
+    """
+    loguru format function writing one compact JSON object per record.
+
+    Keys: time, level, name (module), function, line, process, message,
+    plus any values bound with logger.bind() and exception text if present.
+    """
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "process": record["process"].id,
+        "message": record["message"],
+    }
+    extra = {key: value for key, value in record["extra"].items() if key != "json_line"}
+    if extra:
+        entry["extra"] = extra
+    if record["exception"] is not None:
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json_line"] = json.dumps(entry, default=str, separators=(",", ":"))
+    return "{extra[json_line]}\n"
+
+
+def read_log_records(path: pathlib.Path):
+    """
+    Yield one dict per line of a JSON-lines log file (plain or .gz).
+
+    Lines that are not JSON (e.g. written with LOG_FORMAT=text) are
+    yielded as {"message": line}.
+    """
+    path = pathlib.Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as lines:
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield {"message": line}
+
+
+def configure_logging() -> pathlib.Path:
+    """
+    Add the project log file sink, creating the log folder if needed.
+
+    Importing this module only exposes the logger; nothing touches the
+    file system until an entry point calls this. Safe to call repeatedly.
+
+    The console and file handlers share the LOG_MODULE_LEVELS overrides.
+    With LOG_ENQUEUE, loguru hands each record to a background thread
+    and flushes it at exit (logger.complete() waits for it on demand).
+
+    The file rotates at LOG_ROTATION; LOG_RETENTION files (rotated and
+    compressed ones included) are kept per script or worker, across runs.
+
+    Returns:
+        pathlib.Path: The log file path.
+    """
+    if _configured["done"]:
+        return _configured["log_file"]
+    _configured["done"] = True
+    log_file = get_process_log_file() if get_log_per_process() else LOG_FILE
+    _configured["log_file"] = log_file
+    _configured["sample_every"] = max(1, int(os.getenv("LOG_SAMPLE_EVERY", 1)))
+    _configured["max_per_second"] = float(os.getenv("LOG_MAX_PER_SECOND", 10))
+
+    module_levels = get_module_levels()
+    enqueue = get_log_enqueue()
+
+    def handler_options(level: str) -> dict:
+        # loguru filters by the longest matching module prefix; "" is the default
+        levels = {"": level, **module_levels}
+        lowest = min(logger.level(name).no for name in levels.values())
+        return {"level": lowest, "filter": levels, "enqueue": enqueue}
+
+    # Ensure the log folder exists or create it
+    try:
+        LOG_FOLDER.mkdir(exist_ok=True)
+    except Exception as e:
+        logger.error(f"Error creating log folder: {e}")
+
+    # Replace loguru's default console handler with one that uses the same settings
+    try:
+        console = handler_options(get_console_level())
+        file = handler_options(get_log_level())
+        logger.remove(0)
+        logger.add(sys.stderr, **console)
+        _configured["min_level"] = min(console["level"], file["level"])
+    except Exception as e:
+        logger.error(f"Error configuring console logging: {e}")
+        file = {"level": "INFO", "enqueue": enqueue}
+
+    file["rotation"] = os.getenv("LOG_ROTATION", DEFAULT_ROTATION)
+    retention = get_log_retention()
+    try:
+        file["retention"] = make_retention(log_file, retention) if log_file != LOG_FILE else retention
+    except ValueError as e:
+        logger.error(f"{e} Keeping {DEFAULT_RETENTION} files.")
+        file["retention"] = int(DEFAULT_RETENTION)
+    if os.getenv("LOG_COMPRESSION", "gz").strip().lower() == "gz":
+        file["compression"] = compress_in_background
+    if get_log_format() == "json":
+        file["format"] = format_json_line
+
+    # Configure Loguru to write to the log file
+    try:
+        logger.add(log_file, **file)
+        logger.debug(f"Logging to file: {log_file}")
+    except Exception as e:
+        logger.error(f"Error configuring logger to write to file: {e}")
+    return log_file
 
 
 def get_log_file_path() -> pathlib.Path:
-    """Return the path to the log file."""
-    return LOG_FILE
+    """Return the path to this process's log file."""
+    return _configured["log_file"]
+
+
+def log_enabled(level: str) -> bool:
+    """
+    Return True if any handler may write a record at this level.
+
+    Use it to skip building expensive log arguments on hot paths.
+    """
+    return LEVEL_NUMBERS.get(level, 0) >= _configured["min_level"]
+
+
+def log_sampled(level: str, message: str, *args, every: int = None, per_second: float = None, **kwargs) -> None:
+    """
+    Log from a hot path, keeping 1 call in `every` and at most `per_second`
+    lines per second for this call site.
+
+    Dropped calls cost a dict lookup and a counter; the message is not
+    formatted. The next line written says how many calls were rate limited.
+    Counters are not locked, so with several threads they are approximate.
+
+    Args:
+        level (str): Level name, e.g. "INFO".
+        message (str): Message, formatted with args/kwargs like logger.info.
+        every (int, optional): Keep 1 call in N. Defaults to LOG_SAMPLE_EVERY.
+        per_second (float, optional): Lines per second, 0 for no limit.
+                                      Defaults to LOG_MAX_PER_SECOND.
+    """
+    if not log_enabled(level):
+        return
+    caller = sys._getframe(1)
+    key = (caller.f_code, caller.f_lineno)
+    site = _call_sites.get(key)
+    if site is None:
+        site = _call_sites[key] = {"calls": 0, "tokens": 1.0, "last": time.monotonic(), "limited": 0}
+    site["calls"] += 1
+
+    every = _configured["sample_every"] if every is None else every
+    if every > 1 and (site["calls"] - 1) % every:
+        return
+
+    per_second = _configured["max_per_second"] if per_second is None else per_second
+    if per_second > 0:
+        now = time.monotonic()
+        site["tokens"] = min(max(per_second, 1.0), site["tokens"] + (now - site["last"]) * per_second)
+        site["last"] = now
+        if site["tokens"] < 1:
+            site["limited"] += 1
+            return
+        site["tokens"] -= 1
+
+    limited = site["limited"]
+    if limited:
+        site["limited"] = 0
+        if args or kwargs:
+            message, args = message + " (+{} rate limited)", args + (limited,)
+        else:
+            message = f"{message} (+{limited} rate limited)"
+    logger.opt(depth=1).log(level, message, *args, **kwargs)
 
 
 def log_example() -> None:
@@ -55,14 +426,66 @@ def log_example() -> None:
         logger.error(f"An error occurred during logging: {e}")
 
 
+def benchmark(num_messages: int = 20_000) -> dict:
+    """
+    Measure caller-side messages per second for per-message logging styles.
+
+    Each variant logs a typical buzz message dict once per message to a
+    temporary file. Console logging is left out so the numbers do not
+    depend on the terminal. json_format uses the LOG_FORMAT=json layout.
+    """
+    message = {
+        "message": "I just tried a movie! It was boring.",
+        "author": "Alice",
+        "timestamp": "2025-02-07 19:04:30",
+        "category": "entertainment",
+        "sentiment": 0.86,
+        "keyword_mentioned": "movie",
+        "message_length": 36,
+    }
+    fstring = lambda: logger.info(f"Processed JSON message: {message}")  # noqa: E731
+    variants = {
+        "fstring": ({}, fstring),
+        "fstring_enqueue": ({"enqueue": True}, fstring),
+        "json_format": ({"format": format_json_line}, fstring),
+        "disabled_debug_fstring": ({}, lambda: logger.debug(f"Processed JSON message: {message}")),
+        "disabled_debug_args": ({}, lambda: logger.debug("Processed JSON message: {}", message)),
+        "sampled_1_in_100": ({}, lambda: log_sampled("INFO", "Processed JSON message: {}", message, every=100, per_second=0)),
+        "rate_limited_10_per_sec": ({}, lambda: log_sampled("INFO", "Processed JSON message: {}", message, per_second=10)),
+    }
+    results = {}
+    saved = dict(_configured)
+    logger.remove()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, (options, log_one) in variants.items():
+                handler_id = logger.add(pathlib.Path(tmp) / f"{name}.log", level="INFO", **options)
+                _configured["min_level"] = LEVEL_NUMBERS["INFO"]
+                start = time.perf_counter()
+                for _ in range(num_messages):
+                    log_one()
+                elapsed = time.perf_counter() - start
+                logger.remove(handler_id)
+                results[name] = round(num_messages / elapsed)
+    finally:
+        _configured.update(saved)
+        logger.add(sys.stderr)
+    logger.info(f"Logging benchmark (messages/s): {results}")
+    return results
+
+
 def main() -> None:
     """Main function to execute logger setup and demonstrate its usage."""
+    if sys.argv[1:] == ["benchmark"]:
+        benchmark()
+        return
+    configure_logging()
     logger.info(f"STARTING {CURRENT_SCRIPT}.py")
 
     # Call the example logging function
     log_example()
 
-    logger.info(f"View the log output at {LOG_FILE}")
+    logger.info(f"View the log output at {get_log_file_path()}")
     logger.info(f"EXITING {CURRENT_SCRIPT}.py.")
 
 
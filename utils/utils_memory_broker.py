@@ -0,0 +1,404 @@
+"""
+utils_memory_broker.py - an in-process stand-in for a Kafka broker.
+
+MemoryProducer and MemoryConsumer implement the parts of the
+kafka-python KafkaProducer and KafkaConsumer APIs this project uses, on
+top of a MemoryBroker held in the same process. Code written for Kafka
+(BufferedProducer, the consumers' process_message functions) runs
+unchanged against it, so producer/consumer pairs can be benchmarked and
+run without a broker on localhost:9092.
+
+Behaviour kept from Kafka:
+- values and keys go through the producer's serializers and the
+  consumer's deserializers, so records are bytes in between,
+- keyed records go to partition_for_key(key, partitions), the same
+  murmur2 partitioner as the Kafka client,
+- offsets count up per partition, and a consumer group resumes from its
+  committed offsets (auto_offset_reset "earliest" or "latest" otherwise),
+- records carry headers and a millisecond timestamp.
+
+Simplified:
+- sends complete immediately on the caller's thread (no linger or batching),
+- all partitions of a topic go to every consumer, one consumer per group,
+- each partition keeps at most retention_records records; older ones are
+  dropped and consumers that fall further behind skip ahead.
+
+Run this module directly for the send and consume rates:
+
+    python -m utils.utils_memory_broker
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import threading
+import time
+from collections import namedtuple
+
+# Import functions from local modules
+from utils.utils_logger import logger
+from utils.utils_producer import encode_key, partition_for_key
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_NUM_PARTITIONS = 1
+DEFAULT_RETENTION_RECORDS = 1_000_000
+
+# Same fields (and order) as kafka-python's, for the fields this project reads
+TopicPartition = namedtuple("TopicPartition", ["topic", "partition"])
+MemoryRecord = namedtuple(
+    "MemoryRecord", ["topic", "partition", "offset", "timestamp", "timestamp_type", "key", "value", "headers"]
+)
+RecordMetadata = namedtuple("RecordMetadata", ["topic", "partition", "offset", "timestamp"])
+
+#####################################
+# Broker
+#####################################
+
+
+class _Partition:
+    """Records of one topic partition, with the offset of the first one kept."""
+
+    __slots__ = ("records", "base_offset")
+
+    def __init__(self):
+        self.records = []
+        self.base_offset = 0
+
+    @property
+    def end_offset(self) -> int:
+        return self.base_offset + len(self.records)
+
+
+class MemoryBroker:
+    """Topics, partitions and committed group offsets held in memory."""
+
+    def __init__(self, num_partitions: int = DEFAULT_NUM_PARTITIONS, retention_records: int = DEFAULT_RETENTION_RECORDS):
+        """
+        Args:
+            num_partitions (int): Partitions for topics created on first use.
+            retention_records (int): Records kept per partition.
+        """
+        self.num_partitions = num_partitions
+        self.retention_records = retention_records
+        self._topics = {}
+        self._committed = {}  # (group, TopicPartition) -> next offset
+        self._cond = threading.Condition()
+
+    def create_topic(self, topic: str, num_partitions: int = None) -> None:
+        """Create a topic if it does not exist yet."""
+        with self._cond:
+            self._partitions(topic, num_partitions)
+
+    def partitions_for(self, topic: str) -> list:
+        """Return the partition numbers of topic, creating it if needed."""
+        with self._cond:
+            return list(range(len(self._partitions(topic))))
+
+    def _partitions(self, topic: str, num_partitions: int = None) -> list:
+        """Return the partitions of topic (lock held)."""
+        partitions = self._topics.get(topic)
+        if partitions is None:
+            partitions = self._topics[topic] = [_Partition() for _ in range(num_partitions or self.num_partitions)]
+        return partitions
+
+    def append(self, topic: str, key: bytes, value: bytes, headers: list, partition: int = None) -> RecordMetadata:
+        """
+        Append one serialized record and wake waiting consumers.
+
+        Returns:
+            RecordMetadata: Where the record was written.
+        """
+        timestamp = time.time_ns() // 1_000_000
+        with self._cond:
+            partitions = self._partitions(topic)
+            if partition is None:
+                partition = 0 if key is None or len(partitions) == 1 else partition_for_key(key, len(partitions))
+            log = partitions[partition]
+            offset = log.end_offset
+            log.records.append(MemoryRecord(topic, partition, offset, timestamp, 0, key, value, headers or []))
+            # Trim in chunks so appends stay O(1) on average
+            if len(log.records) >= 2 * self.retention_records:
+                dropped = len(log.records) - self.retention_records
+                del log.records[:dropped]
+                log.base_offset += dropped
+            self._cond.notify_all()
+        return RecordMetadata(topic, partition, offset, timestamp)
+
+    def fetch(self, tp: TopicPartition, offset: int, max_records: int) -> tuple:
+        """
+        Return (records, next offset) from offset on, skipping dropped records.
+        """
+        with self._cond:
+            log = self._partitions(tp.topic)[tp.partition]
+            start = max(offset, log.base_offset) - log.base_offset
+            records = log.records[start:start + max_records]
+            return records, log.base_offset + start + len(records)
+
+    def end_offset(self, tp: TopicPartition) -> int:
+        """Return the offset the next record in tp will get."""
+        with self._cond:
+            return self._partitions(tp.topic)[tp.partition].end_offset
+
+    def wait(self, has_data, timeout_secs: float) -> bool:
+        """Wait until has_data() is true or the timeout passes."""
+        with self._cond:
+            return self._cond.wait_for(has_data, timeout_secs)
+
+    def wake(self) -> None:
+        """Wake every waiting consumer, e.g. so a closed one can return."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def commit(self, group_id: str, offsets: dict) -> None:
+        """Store a group's next offsets, given as {TopicPartition: offset}."""
+        with self._cond:
+            for tp, offset in offsets.items():
+                self._committed[(group_id, tp)] = offset
+
+    def committed(self, group_id: str, tp: TopicPartition):
+        """Return a group's committed offset for tp, or None."""
+        with self._cond:
+            return self._committed.get((group_id, tp))
+
+
+#####################################
+# Producer
+#####################################
+
+
+class CompletedFuture:
+    """A send result that is already known, with kafka-python's callback methods."""
+
+    __slots__ = ("value", "exception")
+
+    def __init__(self, value=None, exception=None):
+        self.value = value
+        self.exception = exception
+
+    def add_callback(self, function, *args, **kwargs):
+        if self.exception is None:
+            function(*args, self.value, **kwargs)
+        return self
+
+    def add_errback(self, function, *args, **kwargs):
+        if self.exception is not None:
+            function(*args, self.exception, **kwargs)
+        return self
+
+    def get(self, timeout=None):
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+    def succeeded(self) -> bool:
+        return self.exception is None
+
+
+class MemoryProducer:
+    """KafkaProducer look-alike that appends to a MemoryBroker."""
+
+    def __init__(self, broker: MemoryBroker, value_serializer=None, key_serializer=encode_key, **_settings):
+        """
+        Args:
+            broker (MemoryBroker): Broker to write to.
+            value_serializer (callable): Turns values into bytes.
+            key_serializer (callable): Turns keys into bytes.
+            _settings: KafkaProducer tuning options (linger_ms, ...); ignored.
+        """
+        self.broker = broker
+        self.value_serializer = value_serializer
+        self.key_serializer = key_serializer
+        self._closed = False
+
+    def send(self, topic: str, value=None, key=None, headers=None, partition=None, timestamp_ms=None):
+        """Serialize and append one record. Returns a completed future."""
+        if self._closed:
+            raise RuntimeError("Producer is closed")
+        value_bytes = self.value_serializer(value) if self.value_serializer and value is not None else value
+        key_bytes = self.key_serializer(key) if self.key_serializer and key is not None else key
+        return CompletedFuture(self.broker.append(topic, key_bytes, value_bytes, headers, partition))
+
+    def flush(self, timeout=None) -> None:
+        """Nothing to do: every send completes immediately."""
+
+    def close(self, timeout=None) -> None:
+        self._closed = True
+
+
+#####################################
+# Consumer
+#####################################
+
+
+class MemoryConsumer:
+    """KafkaConsumer look-alike that reads from a MemoryBroker."""
+
+    def __init__(
+        self,
+        broker: MemoryBroker,
+        *topics,
+        group_id: str = None,
+        value_deserializer=None,
+        key_deserializer=None,
+        auto_offset_reset: str = "latest",
+        enable_auto_commit: bool = True,
+        consumer_timeout_ms: float = float("inf"),
+        max_poll_records: int = 500,
+        **_settings,
+    ):
+        """
+        Args:
+            broker (MemoryBroker): Broker to read from.
+            topics (str): Topics to read.
+            group_id (str): Group whose committed offsets are used and updated.
+            value_deserializer (callable): Turns value bytes into values.
+            key_deserializer (callable): Turns key bytes into keys.
+            auto_offset_reset (str): "earliest" or "latest", used without a committed offset.
+            enable_auto_commit (bool): Commit offsets after each poll.
+            consumer_timeout_ms (float): Iteration stops after this long without records.
+            max_poll_records (int): Largest batch returned by one poll.
+            _settings: Other KafkaConsumer options (bootstrap_servers, ...); ignored.
+        """
+        self.broker = broker
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer
+        self.key_deserializer = key_deserializer
+        self.enable_auto_commit = enable_auto_commit
+        self.consumer_timeout_secs = consumer_timeout_ms / 1000
+        self.max_poll_records = max_poll_records
+        self._positions = {}
+        self._buffer = []
+        self._closed = False
+        for topic in topics:
+            for partition in broker.partitions_for(topic):
+                tp = TopicPartition(topic, partition)
+                committed = broker.committed(group_id, tp) if group_id else None
+                if committed is not None:
+                    self._positions[tp] = committed
+                elif auto_offset_reset == "earliest":
+                    self._positions[tp] = 0
+                else:
+                    self._positions[tp] = broker.end_offset(tp)
+
+    def _has_data(self) -> bool:
+        return self._closed or any(self.broker.end_offset(tp) > offset for tp, offset in self._positions.items())
+
+    def poll(self, timeout_ms: float = 0, max_records: int = None) -> dict:
+        """
+        Return new records as {TopicPartition: [records]}, waiting up to timeout_ms.
+        """
+        if self._closed:
+            raise RuntimeError("Consumer is closed")
+        max_records = max_records or self.max_poll_records
+        if timeout_ms and not self._has_data():
+            self.broker.wait(self._has_data, timeout_ms / 1000)
+
+        batches = {}
+        for tp, offset in self._positions.items():
+            if max_records <= 0:
+                break
+            records, next_offset = self.broker.fetch(tp, offset, max_records)
+            if records:
+                batches[tp] = [self._deserialize(record) for record in records]
+                max_records -= len(records)
+            self._positions[tp] = next_offset
+        if batches and self.enable_auto_commit and self.group_id:
+            self.commit()
+        return batches
+
+    def _deserialize(self, record: MemoryRecord) -> MemoryRecord:
+        value, key = record.value, record.key
+        if self.value_deserializer and value is not None:
+            value = self.value_deserializer(value)
+        if self.key_deserializer and key is not None:
+            key = self.key_deserializer(key)
+        return record._replace(key=key, value=value)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> MemoryRecord:
+        """Return the next record, waiting up to consumer_timeout_ms for one."""
+        if not self._buffer:
+            deadline = time.monotonic() + self.consumer_timeout_secs
+            while not self._buffer:
+                if self._closed:
+                    raise StopIteration
+                remaining = deadline - time.monotonic()
+                for records in self.poll(timeout_ms=max(min(remaining, 1.0), 0) * 1000).values():
+                    self._buffer.extend(records)
+                if not self._buffer and remaining <= 0:
+                    raise StopIteration
+            self._buffer.reverse()  # pop() from the end returns records in order
+        return self._buffer.pop()
+
+    def commit(self, offsets: dict = None) -> None:
+        """Commit the current positions (or the given offsets) for the group."""
+        if self.group_id:
+            self.broker.commit(self.group_id, offsets or dict(self._positions))
+
+    def assignment(self) -> set:
+        return set(self._positions)
+
+    def close(self, autocommit: bool = True) -> None:
+        """Commit (if auto-commit is on) and stop; a waiting iterator returns."""
+        if self._closed:
+            return
+        if autocommit and self.enable_auto_commit and self.group_id:
+            self.commit()
+        self._closed = True
+        self.broker.wake()
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_messages: int = 200_000) -> dict:
+    """Measure send and consume rates for small JSON-sized records."""
+    broker = MemoryBroker(num_partitions=4)
+    producer = MemoryProducer(broker, value_serializer=lambda value: value)
+    payload = b'{"message": "I just tried a movie! It was boring.", "author": "Alice"}'
+    authors = ["Alice", "Bob", "Charlie", "Eve"]
+
+    start = time.perf_counter()
+    for i in range(num_messages):
+        producer.send("bench", value=payload, key=authors[i % 4])
+    send_secs = time.perf_counter() - start
+
+    consumer = MemoryConsumer(broker, "bench", group_id="bench", auto_offset_reset="earliest", consumer_timeout_ms=0)
+    start = time.perf_counter()
+    received = sum(1 for _ in consumer)
+    consume_secs = time.perf_counter() - start
+    assert received == num_messages
+
+    result = {
+        "send_per_sec": round(num_messages / send_secs),
+        "consume_per_sec": round(num_messages / consume_secs),
+    }
+    logger.info(f"Memory broker benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the memory broker benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
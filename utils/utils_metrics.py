@@ -0,0 +1,444 @@
+"""
+utils_metrics.py - counters, gauges and histograms served in Prometheus format.
+
+Metrics live in a process-wide registry and cost a few attribute updates
+on the hot path. They take no lock unless created with threadsafe=True,
+which is only needed when they are updated from more than one thread
+(for example Kafka delivery callbacks).
+
+Pipeline code records per-stage throughput and latency through Stage
+objects: stage("decode") updates buzzline_stage_messages_total and the
+buzzline_stage_seconds histogram with the label stage="decode". Use
+Prometheus rate() on the counter for msgs/s per stage.
+
+Stages used by the producers and consumers:
+    generate, serialize, send        (producers; send includes serialize)
+    poll, decode, aggregate, render  (consumers)
+
+Each process can serve its metrics at http://METRICS_HOST:METRICS_PORT/metrics.
+If the port is taken (e.g. by another worker), the next free port is used
+and logged.
+
+Environment variables:
+    METRICS_PORT  Port for the metrics endpoint (default 0 = do not serve).
+    METRICS_HOST  Address to bind (default 127.0.0.1).
+
+Run this module directly to measure the hot-path cost of each metric type:
+
+    python -m utils.utils_metrics
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import bisect
+import os
+import threading
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+# Seconds; covers sub-microsecond stage work up to multi-second polls
+DEFAULT_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+# Ports tried after METRICS_PORT when it is already in use
+METRICS_PORT_ATTEMPTS = 32
+
+
+def get_metrics_port() -> int:
+    """Fetch the metrics port from environment or use default (0 = off)."""
+    return int(os.getenv("METRICS_PORT", 0))
+
+
+def get_metrics_host() -> str:
+    """Fetch the address for the metrics endpoint from environment or use default."""
+    return os.getenv("METRICS_HOST", DEFAULT_METRICS_HOST)
+
+
+#####################################
+# Metric Types
+#####################################
+
+
+class Counter:
+    """A value that only goes up."""
+
+    def __init__(self, threadsafe: bool = False):
+        self.value = 0
+        if threadsafe:
+            self._lock = threading.Lock()
+            self.inc = self._inc_locked
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount (default 1)."""
+        self.value += amount
+
+    def _inc_locked(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: str):
+        yield f"{name}{labels} {_format_value(self.value)}"
+
+
+class Gauge:
+    """A value that can go up and down, or be read from a function at scrape time."""
+
+    def __init__(self):
+        self.value = 0
+        self._function = None
+
+    def set(self, value: float) -> None:
+        """Set the current value."""
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount (default 1)."""
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        """Subtract amount (default 1)."""
+        self.value -= amount
+
+    def set_function(self, function) -> None:
+        """Report function() instead of the stored value."""
+        self._function = function
+
+    def samples(self, name: str, labels: str):
+        value = self._function() if self._function is not None else self.value
+        yield f"{name}{labels} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Count observations into fixed buckets.
+
+    Buckets are stored non-cumulative (one increment per observation)
+    and summed when rendered.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, threadsafe: bool = False):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        if threadsafe:
+            self._lock = threading.Lock()
+            self.observe = self._observe_locked
+
+    def observe(self, value: float, count: int = 1) -> None:
+        """
+        Record a value.
+
+        Args:
+            value (float): Observed value, e.g. seconds.
+            count (int): Number of observations with this value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += count
+        self.sum += value * count
+        self.count += count
+
+    def _observe_locked(self, value: float, count: int = 1) -> None:
+        with self._lock:
+            Histogram.observe(self, value, count)
+
+    def samples(self, name: str, labels: str):
+        prefix = labels[:-1] + "," if labels else "{"
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            yield f'{name}_bucket{prefix}le="{_format_value(bound)}"}} {cumulative}'
+        yield f'{name}_bucket{prefix}le="+Inf"}} {cumulative + self.counts[-1]}'
+        yield f"{name}_sum{labels} {_format_value(self.sum)}"
+        yield f"{name}_count{labels} {self.count}"
+
+
+def _format_value(value) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if isinstance(value, float):
+        return repr(value) if value == value else "NaN"
+    return str(value)
+
+
+def _escape_label_value(value) -> str:
+    """Escape backslashes, quotes and newlines in a label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    """Render (key, value) pairs as {key="value",...}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+#####################################
+# Registry
+#####################################
+
+
+class MetricsRegistry:
+    """
+    Metric families by name, each with one series per label set.
+
+    Asking for the same name and labels again returns the same object,
+    so modules can look metrics up once at import and keep them.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, help_text: str, labels: dict, factory):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        if family is None or key not in family["series"]:
+            with self._lock:
+                family = self._families.setdefault(name, {"kind": kind, "help": help_text, "series": {}})
+                if family["kind"] != kind:
+                    raise ValueError(f"Metric '{name}' is already registered as a {family['kind']}")
+                family["series"].setdefault(key, factory())
+        return family["series"][key]
+
+    def counter(self, name: str, help_text: str = "", threadsafe: bool = False, **labels) -> Counter:
+        """Return the counter for name and labels, creating it if needed."""
+        return self._get("counter", name, help_text, labels, lambda: Counter(threadsafe))
+
+    def gauge(self, name: str, help_text: str = "", **labels) -> Gauge:
+        """Return the gauge for name and labels, creating it if needed."""
+        return self._get("gauge", name, help_text, labels, Gauge)
+
+    def histogram(
+        self, name: str, help_text: str = "", buckets: tuple = DEFAULT_BUCKETS, threadsafe: bool = False, **labels
+    ) -> Histogram:
+        """Return the histogram for name and labels, creating it if needed."""
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(buckets, threadsafe))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            families = [(name, dict(family, series=dict(family["series"]))) for name, family in self._families.items()]
+        for name, family in sorted(families):
+            if family["help"]:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for labels, metric in sorted(family["series"].items()):
+                lines.extend(metric.samples(name, _format_labels(labels)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+#####################################
+# Pipeline Stages
+#####################################
+
+
+class Stage:
+    """Message count and latency histogram for one pipeline stage."""
+
+    def __init__(self, name: str, registry: MetricsRegistry = REGISTRY, threadsafe: bool = False):
+        self.name = name
+        self.messages = registry.counter(
+            "buzzline_stage_messages_total", "Messages through each pipeline stage.", threadsafe, stage=name
+        )
+        self.seconds = registry.histogram(
+            "buzzline_stage_seconds", "Seconds spent per call of each pipeline stage.",
+            threadsafe=threadsafe, stage=name,
+        )
+
+    def observe(self, seconds: float, count: int = 1) -> None:
+        """Record one call that took seconds and handled count messages."""
+        self.messages.inc(count)
+        self.seconds.observe(seconds)
+
+    def time(self, count: int = 1) -> "_StageTimer":
+        """Context manager that records the time spent in its block."""
+        return _StageTimer(self, count)
+
+    def wrap(self, iterable):
+        """Yield from iterable, recording the time spent producing each item."""
+        iterator = iter(iterable)
+        perf_counter = time.perf_counter
+        observe = self.observe
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            observe(perf_counter() - start)
+            yield item
+
+    def timed(self, function):
+        """Return function wrapped so each call is recorded."""
+        perf_counter = time.perf_counter
+        observe = self.observe
+
+        def timed_function(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(perf_counter() - start)
+
+        return timed_function
+
+
+class _StageTimer:
+    __slots__ = ("stage", "count", "start")
+
+    def __init__(self, stage: Stage, count: int):
+        self.stage = stage
+        self.count = count
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stage.observe(time.perf_counter() - self.start, self.count)
+
+
+_stages = {}
+
+
+def stage(name: str, threadsafe: bool = False) -> Stage:
+    """Return the Stage for name in the default registry, creating it if needed."""
+    found = _stages.get(name)
+    if found is None:
+        found = _stages.setdefault(name, Stage(name, threadsafe=threadsafe))
+    return found
+
+
+def stage_message_counts() -> dict:
+    """Return the messages counted so far by each stage in this process."""
+    return {name: found.messages.value for name, found in list(_stages.items())}
+
+
+#####################################
+# HTTP Endpoint
+#####################################
+
+_server = {"port": None}
+
+
+def start_metrics_server(port: int = None, host: str = None, registry: MetricsRegistry = REGISTRY):
+    """
+    Serve registry.render() at /metrics on a daemon thread (once per process).
+
+    Args:
+        port (int, optional): First port to try. Defaults to METRICS_PORT; 0 disables.
+        host (str, optional): Address to bind. Defaults to METRICS_HOST.
+        registry (MetricsRegistry): Registry to serve.
+
+    Returns:
+        int: The port in use, or None if not serving.
+    """
+    if _server["port"] is not None:
+        return _server["port"]
+    port = get_metrics_port() if port is None else port
+    if not port:
+        return None
+    host = host or get_metrics_host()
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes are not worth a log line each
+
+    for candidate in range(port, port + METRICS_PORT_ATTEMPTS):
+        try:
+            server = ThreadingHTTPServer((host, candidate), MetricsHandler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        _server["port"] = candidate
+        logger.info(f"Serving metrics at http://{host}:{candidate}/metrics")
+        return candidate
+    logger.warning(f"No free metrics port in {port}-{port + METRICS_PORT_ATTEMPTS - 1}. Metrics not served.")
+    return None
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_calls: int = 1_000_000) -> dict:
+    """Measure nanoseconds per update for each metric type, with and without locks."""
+    registry = MetricsRegistry()
+    timed_stage = Stage("benchmark", registry)
+    cases = {
+        "counter_inc": registry.counter("bench_counter").inc,
+        "counter_inc_threadsafe": registry.counter("bench_counter_locked", threadsafe=True).inc,
+        "histogram_observe": registry.histogram("bench_histogram").observe,
+        "histogram_observe_threadsafe": registry.histogram("bench_histogram_locked", threadsafe=True).observe,
+        "stage_observe": timed_stage.observe,
+    }
+    result = {}
+    for name, update in cases.items():
+        start = time.perf_counter()
+        for _ in range(num_calls):
+            update(0.0003)
+        result[f"{name}_ns"] = round((time.perf_counter() - start) / num_calls * 1e9)
+
+    start = time.perf_counter()
+    for _ in timed_stage.wrap(range(num_calls)):
+        pass
+    result["stage_wrap_per_item_ns"] = round((time.perf_counter() - start) / num_calls * 1e9)
+
+    start = time.perf_counter()
+    for _ in range(num_calls // 10):
+        with timed_stage.time():
+            pass
+    result["stage_time_block_ns"] = round((time.perf_counter() - start) / (num_calls // 10) * 1e9)
+
+    start = time.perf_counter()
+    text = registry.render()
+    result["render_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    result["render_lines"] = text.count("\n")
+    logger.info(f"Metrics benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the metrics benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+utils_plotting.py - load Matplotlib only when a chart is actually shown.
+
+Importing matplotlib.pyplot takes a few hundred milliseconds, which used
+to be paid at import time by every consumer, even ones started without
+a display. Consumers now call get_pyplot() when they set up their chart.
+In headless mode it returns None and Matplotlib is never imported.
+
+Environment variables:
+    HEADLESS  Set to true/1/yes to run consumers without charts (default false).
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import os
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+TRUE_VALUES = frozenset({"1", "true", "yes", "on"})
+
+# pyplot module once imported
+_loaded = {"pyplot": None}
+
+#####################################
+# Lazy Matplotlib
+#####################################
+
+
+def is_headless() -> bool:
+    """Return True if charts are disabled through the HEADLESS environment variable."""
+    return os.getenv("HEADLESS", "false").strip().lower() in TRUE_VALUES
+
+
+def get_pyplot(backend: str = None):
+    """
+    Import matplotlib.pyplot on first use.
+
+    Args:
+        backend (str, optional): Matplotlib backend to select before the
+                                 first pyplot import, e.g. "TkAgg".
+
+    Returns:
+        module: matplotlib.pyplot, or None in headless mode.
+    """
+    if is_headless():
+        return None
+    if _loaded["pyplot"] is None:
+        import matplotlib
+
+        if backend:
+            matplotlib.use(backend)
+        import matplotlib.pyplot as plt
+
+        _loaded["pyplot"] = plt
+        logger.debug(f"Loaded Matplotlib with backend {matplotlib.get_backend()}.")
+    return _loaded["pyplot"]
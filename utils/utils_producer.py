@@ -1,7 +1,13 @@
 """
 utils_producer.py - common functions used by producers.
 
-Producers send messages to a Kafka topic.
+Producers send messages to a Kafka topic. With TRANSPORT set to file or
+memory, the same functions send to a local transport instead (see
+utils_transport), and the Kafka readiness and topic calls are skipped.
+
+kafka-python and python-dotenv are imported by the functions that use
+them, so importing this module (or running on a local transport) does
+not pay for loading the Kafka client.
 """
 
 #####################################
@@ -9,29 +15,20 @@ Producers send messages to a Kafka topic.
 #####################################
 
 # Import packages from Python Standard Library
+import atexit
+import json
 import os
 import sys
 import socket
+import threading
 import time
-
-# Import external packages
-from dotenv import load_dotenv
-from kafka import KafkaProducer, KafkaConsumer, errors
-from kafka.admin import (
-    KafkaAdminClient,
-    ConfigResource,
-    ConfigResourceType,
-    NewTopic,
-)
+from collections import defaultdict
 
 # Import functions from local modules
 from utils.utils_logger import logger
-
-#####################################
-# Load Environment Variables
-#####################################
-
-load_dotenv()
+from utils.utils_clients import registry
+from utils.utils_metrics import REGISTRY, stage
+from utils.utils_tracing import create_tracer
 
 #####################################
 # Default Configurations
@@ -40,21 +37,102 @@ load_dotenv()
 DEFAULT_ZOOKEEPER_ADDRESS = "localhost:2181"
 DEFAULT_KAFKA_BROKER_ADDRESS = "localhost:9092"
 
+# Named producer tuning profiles.
+# - latency: send each message right away, one request in flight.
+# - balanced: small linger so sends are grouped without noticeable delay.
+# - throughput: large compressed batches for bulk and load-test runs.
+PRODUCER_PROFILES = {
+    "latency": {
+        "batch_size": 16384,
+        "linger_ms": 0,
+        "compression_type": None,
+        "max_in_flight_requests_per_connection": 1,
+        "acks": 1,
+    },
+    "balanced": {
+        "batch_size": 65536,
+        "linger_ms": 5,
+        "compression_type": None,
+        "max_in_flight_requests_per_connection": 5,
+        "acks": 1,
+    },
+    "throughput": {
+        "batch_size": 524288,
+        "linger_ms": 20,
+        "compression_type": "gzip",
+        "max_in_flight_requests_per_connection": 5,
+        "acks": 1,
+        "buffer_memory": 134217728,
+    },
+}
+DEFAULT_PRODUCER_PROFILE = "balanced"
+
+DEFAULT_NUM_PARTITIONS = 1
+DEFAULT_REPLICATION_FACTOR = 1
+
 #####################################
 # Helper Functions
 #####################################
 
+# Settings already logged by the getters below, so each is logged once
+_logged_settings = set()
+_environment = {"loaded": False}
+
+
+def load_environment() -> None:
+    """Load .env into os.environ once, the first time a setting is read."""
+    if not _environment["loaded"]:
+        _environment["loaded"] = True
+        from dotenv import load_dotenv
+
+        load_dotenv()
+
+
+def _log_setting_once(message: str) -> None:
+    """Log a configuration message the first time it is seen."""
+    if message not in _logged_settings:
+        _logged_settings.add(message)
+        logger.info(message)
+
+
 def get_kafka_broker_address():
     """Fetch Kafka broker address from environment or use default."""
+    load_environment()
     broker_address = os.getenv("KAFKA_BROKER_ADDRESS", "localhost:9092")
-    logger.info(f"Kafka broker address: {broker_address}")
+    _log_setting_once(f"Kafka broker address: {broker_address}")
     return broker_address
 
 
+def get_producer_profile():
+    """Fetch producer profile name from environment or use default."""
+    load_environment()
+    profile = os.getenv("KAFKA_PRODUCER_PROFILE", DEFAULT_PRODUCER_PROFILE)
+    if profile not in PRODUCER_PROFILES:
+        logger.warning(
+            f"Unknown producer profile '{profile}'. Using '{DEFAULT_PRODUCER_PROFILE}'."
+        )
+        profile = DEFAULT_PRODUCER_PROFILE
+    _log_setting_once(f"Kafka producer profile: {profile}")
+    return profile
+
+
+def get_num_partitions():
+    """Fetch default partition count for new topics from environment or use default."""
+    load_environment()
+    return int(os.getenv("KAFKA_NUM_PARTITIONS", DEFAULT_NUM_PARTITIONS))
+
+
+def get_replication_factor():
+    """Fetch default replication factor for new topics from environment or use default."""
+    load_environment()
+    return int(os.getenv("KAFKA_REPLICATION_FACTOR", DEFAULT_REPLICATION_FACTOR))
+
+
 def get_zookeeper_address():
     """Fetch Zookeeper address from environment or use default."""
+    load_environment()
     zk_address = os.getenv("ZOOKEEPER_ADDRESS", "localhost:2181")
-    logger.info(f"Zookeeper address: {zk_address}")
+    _log_setting_once(f"Zookeeper address: {zk_address}")
     return zk_address
 
 
@@ -87,16 +165,19 @@ def check_kafka_service_is_ready():
     """
     Check if Kafka is ready by connecting to the broker and fetching metadata.
 
+    The shared admin client and cached cluster metadata are reused, so a
+    check made shortly after another costs no extra round trip.
+
     Returns:
         bool: True if Kafka is ready, False otherwise.
     """
+    from kafka import errors
+
     kafka_broker = get_kafka_broker_address()
 
     try:
-        admin_client = KafkaAdminClient(bootstrap_servers=kafka_broker)
-        brokers = admin_client.describe_cluster()
+        brokers = registry.describe_cluster(kafka_broker)
         logger.info(f"Kafka is ready. Brokers: {brokers}")
-        admin_client.close()
         return True
     except errors.KafkaError as e:
         logger.error(f"Error checking Kafka: {e}")
@@ -108,32 +189,94 @@ def check_kafka_service_is_ready():
 #####################################
 
 
-def verify_services():
+def verify_services(timeout_secs=None):
+    """
+    Wait for Zookeeper and Kafka to be ready, probing both in parallel.
+
+    Failed probes are retried with jittered exponential backoff until
+    READINESS_TIMEOUT_SECONDS (or timeout_secs) runs out, so a broker
+    restart does not kill the producer. Exits if a service never comes up.
+
+    Returns:
+        ReadinessReport: Per-service attempts and time-to-ready, or None
+                         for the file and memory transports.
+    """
+    from utils.utils_transport import get_transport
+
+    transport = get_transport()
+    if transport != "kafka":
+        logger.info(f"Using the {transport} transport; no services to wait for.")
+        return None
+    from utils.utils_readiness import check_services_ready  # Loads asyncio
+
+    report = check_services_ready(
+        get_zookeeper_address(), get_kafka_broker_address(), timeout_secs
+    )
+    failed = report.failed()
+
     # Verify Zookeeper is ready
-    if not check_zookeeper_service_is_ready():
+    if "zookeeper" in failed:
         logger.error(
             "Zookeeper is not ready. Please check your Zookeeper setup. Exiting..."
         )
         sys.exit(1)
 
     # Verify Kafka is ready
-    if not check_kafka_service_is_ready():
+    if "kafka" in failed:
         logger.error(
             "Kafka broker is not ready. Please check your Kafka setup. Exiting..."
         )
         sys.exit(2)
 
+    return report
 
-def create_kafka_producer(value_serializer=None):
+
+def encode_key(key) -> bytes:
+    """Serialize a message key. Strings are UTF-8 encoded; bytes pass through."""
+    if key is None or isinstance(key, bytes):
+        return key
+    return str(key).encode("utf-8")
+
+
+def partition_for_key(key, num_partitions: int) -> int:
+    """
+    Return the partition Kafka's default partitioner picks for a key.
+
+    Uses the same murmur2 hash as kafka-python and the Java client, so
+    every message with the same key goes to the same partition and keeps
+    its order.
+
+    Args:
+        key: Message key (str or bytes).
+        num_partitions (int): Number of partitions in the topic.
+
+    Returns:
+        int: Partition index.
+    """
+    from kafka.partitioner.default import murmur2
+
+    return (murmur2(encode_key(key)) & 0x7FFFFFFF) % num_partitions
+
+
+def create_kafka_producer(value_serializer=None, profile=None, key_serializer=encode_key, file_prefix=None):
     """
     Create and return a Kafka producer instance.
 
     Args:
         value_serializer (callable): A custom serializer for message values.
                                      Defaults to UTF-8 string encoding.
+        profile (str): Name of a tuning profile in PRODUCER_PROFILES.
+                       If None, the producer uses kafka-python defaults.
+        key_serializer (callable): Serializer for message keys.
+                                   Keyed messages are partitioned by key hash.
+        file_prefix (str, optional): PREFIX_FILE_* settings for the file transport.
 
     Returns:
-        KafkaProducer: Configured Kafka producer instance.
+        KafkaProducer: Configured Kafka producer instance, or a look-alike
+                       for the file and memory transports.
+
+    Raises:
+        ValueError: If profile is not a key of PRODUCER_PROFILES.
     """
     kafka_broker = get_kafka_broker_address()
 
@@ -142,11 +285,28 @@ def create_kafka_producer(value_serializer=None):
         def value_serializer(x):
             return x.encode("utf-8")  # Default to string serialization
 
+    # Pipeline stage (see utils_metrics); KafkaProducer.send serializes on the caller's thread
+    value_serializer = stage("serialize").timed(value_serializer)
+    if profile and profile not in PRODUCER_PROFILES:
+        raise ValueError(f"Unknown producer profile '{profile}'. Choose from {sorted(PRODUCER_PROFILES)}.")
+    settings = PRODUCER_PROFILES[profile] if profile else {}
+
+    # Imported here: utils_transport builds on this module
+    from utils.utils_transport import get_transport, create_producer_client
+
+    transport = get_transport()
+    if transport != "kafka":
+        return create_producer_client(transport, value_serializer, key_serializer, file_prefix=file_prefix, **settings)
+
     try:
+        from kafka import KafkaProducer
+
         logger.info(f"Connecting to Kafka broker at {kafka_broker}...")
         producer = KafkaProducer(
             bootstrap_servers=kafka_broker,
             value_serializer=value_serializer,
+            key_serializer=key_serializer,
+            **settings,
         )
         logger.info("Kafka producer successfully created.")
         return producer
@@ -155,86 +315,507 @@ def create_kafka_producer(value_serializer=None):
         return None
 
 
-def create_kafka_topic(topic_name, group_id=None):
+#####################################
+# Buffered Producer with Delivery Tracking
+#####################################
+
+
+class DeliveryMetrics:
+    """
+    Per-topic counts of queued, acknowledged and failed messages.
+
+    Sends are counted on the caller's thread and results on the producer's
+    I/O thread, so every update and read takes the lock.
+    """
+
+    def __init__(self):
+        self.queued = defaultdict(int)
+        self.acked = defaultdict(int)
+        self.failed = defaultdict(int)
+        self.last_error = {}
+        self._lock = threading.Lock()
+
+    def record_queued(self, topic: str) -> None:
+        """Count a message handed to the producer."""
+        with self._lock:
+            self.queued[topic] += 1
+
+    def record_acked(self, topic: str) -> None:
+        """Count a message the broker acknowledged."""
+        with self._lock:
+            self.acked[topic] += 1
+
+    def record_failed(self, topic: str, error) -> None:
+        """Count a message that could not be queued or delivered."""
+        with self._lock:
+            self.failed[topic] += 1
+            self.last_error[topic] = str(error)
+
+    def in_flight(self, topic: str) -> int:
+        """Return how many messages for topic are still waiting for a result."""
+        with self._lock:
+            return self.queued[topic] - self.acked[topic] - self.failed[topic]
+
+    def snapshot(self) -> dict:
+        """Return the counts for every topic seen so far."""
+        with self._lock:
+            return {
+                topic: {
+                    "queued": queued,
+                    "acked": self.acked[topic],
+                    "failed": self.failed[topic],
+                    "in_flight": queued - self.acked[topic] - self.failed[topic],
+                }
+                for topic, queued in self.queued.items()
+            }
+
+
+class BufferedProducer:
+    """
+    Wrap a KafkaProducer with batching profiles and delivery tracking.
+
+    send() never blocks on the broker. Each send registers callbacks that
+    update the per-topic DeliveryMetrics when the broker answers.
+    The producer is flushed and closed at interpreter exit.
+
+    If key_field is set, messages sent without a key are keyed by that
+    field (for example "author"), so each key stays on one partition and
+    keeps its order.
+    """
+
+    def __init__(
+        self,
+        producer,
+        profile: str,
+        key_field: str = None,
+        registry_key: tuple = None,
+    ):
+        self.producer = producer
+        self.profile = profile
+        self.key_field = key_field
+        self.registry_key = registry_key
+        self.metrics = DeliveryMetrics()
+        self._delivered = {}  # topic -> (acked, failed) Counters
+        self._send_stage = stage("send")  # Includes serialize
+        self.tracer = create_tracer()  # Sequence and send-time header per record (TRACE_HEADERS)
+        self._partition_counts = {}  # topic -> partitions, for traced records
+        self._next_unkeyed = 0
+        self._closed = False
+        atexit.register(self.close)
+
+    def send(self, topic: str, value, key=None, headers=None, partition=None):
+        """
+        Queue a message for delivery.
+
+        Args:
+            topic (str): Kafka topic.
+            value: Message value, passed to the value serializer.
+            key (str or bytes, optional): Message key. Defaults to value[key_field].
+            headers (list, optional): (str, bytes) Kafka record headers.
+            partition (int, optional): Partition to send to. Traced records
+                                       are given one here if not set, since
+                                       sequences are numbered per partition.
+
+        Returns:
+            FutureRecordMetadata: The future returned by KafkaProducer.send.
+        """
+        if key is None and self.key_field is not None:
+            key = value.get(self.key_field)
+        metrics = self.metrics
+        metrics.record_queued(topic)
+        if self.tracer is not None:
+            if partition is None:
+                partition = self._pick_partition(topic, key)
+            headers = [*(headers or ()), self.tracer.stamp(topic, partition)]
+        acked, failed = self._delivery_counters(topic)
+        start = time.perf_counter()
+        try:
+            future = self.producer.send(topic, value=value, key=key, headers=headers, partition=partition)
+        except Exception as e:
+            metrics.record_failed(topic, e)
+            failed.inc()
+            logger.error(f"Failed to queue message for topic '{topic}': {e}")
+            raise
+        self._send_stage.observe(time.perf_counter() - start)
+
+        # Callbacks run on the producer's I/O thread
+        def on_success(_record_metadata):
+            metrics.record_acked(topic)
+            acked.inc()
+
+        def on_error(exc):
+            metrics.record_failed(topic, exc)
+            failed.inc()
+            from kafka import errors
+
+            if isinstance(exc, (errors.KafkaConnectionError, errors.KafkaTimeoutError)):
+                registry.connection_failed()
+            logger.error(f"Delivery to topic '{topic}' failed: {exc}")
+
+        future.add_callback(on_success)
+        future.add_errback(on_error)
+        return future
+
+    def _pick_partition(self, topic: str, key) -> int:
+        """
+        Return the partition for a traced record: where Kafka's partitioner
+        sends its key, or round robin for records without a key.
+        """
+        num_partitions = self._partition_counts.get(topic)
+        if num_partitions is None:
+            try:
+                num_partitions = get_topic_partition_count(topic)
+            except Exception as e:
+                logger.warning(f"Could not read partitions for topic '{topic}' ({e}). Tracing partition 0 only.")
+                num_partitions = 1
+            self._partition_counts[topic] = num_partitions
+        if num_partitions <= 1:
+            return 0
+        if key is None:
+            self._next_unkeyed += 1
+            return self._next_unkeyed % num_partitions
+        return partition_for_key(key, num_partitions)
+
+    def _delivery_counters(self, topic: str) -> tuple:
+        """Return the (acked, failed) delivery counters for topic."""
+        counters = self._delivered.get(topic)
+        if counters is None:
+            counters = self._delivered[topic] = tuple(
+                REGISTRY.counter(
+                    "buzzline_delivered_total", "Messages with a delivery result from the broker.",
+                    threadsafe=True, topic=topic, result=result,
+                )
+                for result in ("acked", "failed")
+            )
+        return counters
+
+    def flush(self, timeout=None) -> None:
+        """Block until all queued messages have a delivery result."""
+        self.producer.flush(timeout=timeout)
+
+    def log_metrics(self) -> None:
+        """Log the current per-topic delivery counts."""
+        for topic, counts in self.metrics.snapshot().items():
+            logger.info(f"Delivery metrics for topic '{topic}': {counts}")
+
+    def close(self, timeout=None) -> None:
+        """Flush outstanding messages, log delivery counts and close."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.registry_key is not None:
+            registry.discard(self.registry_key)
+        try:
+            self.producer.flush(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Error flushing Kafka producer: {e}")
+        self.log_metrics()
+        self.producer.close(timeout=timeout)
+        logger.info("Buffered Kafka producer closed.")
+
+
+def create_buffered_producer(value_serializer=None, profile=None, key_field=None, file_prefix=None):
+    """
+    Create a BufferedProducer using a named tuning profile.
+
+    Calls with the same broker, profile, serializer and key field share one
+    producer (and its connections) for the life of the process. Pass a
+    module-level serializer such as serialize_json, not a new lambda, to
+    get that reuse.
+
+    Args:
+        value_serializer (callable): A custom serializer for message values.
+        profile (str): Name of a profile in PRODUCER_PROFILES.
+                       Defaults to the KAFKA_PRODUCER_PROFILE environment variable.
+        key_field (str, optional): Message field to use as the partition key.
+        file_prefix (str, optional): PREFIX_FILE_* settings for the file transport.
+
+    Returns:
+        BufferedProducer: Wrapped producer, or None if the connection failed.
+    """
+    from utils.utils_transport import get_transport
+
+    profile = profile or get_producer_profile()
+    key = ("producer", get_transport(), get_kafka_broker_address(), profile, value_serializer, key_field, file_prefix)
+
+    def factory():
+        producer = create_kafka_producer(value_serializer=value_serializer, profile=profile, file_prefix=file_prefix)
+        if producer is None:
+            return None
+        return BufferedProducer(producer, profile, key_field=key_field, registry_key=key)
+
+    buffered = registry.get_or_create(key, factory)
+    if buffered is None:
+        registry.discard(key)
+    return buffered
+
+
+def serialize_json(value) -> bytes:
+    """Serialize a message value as UTF-8 JSON."""
+    return json.dumps(value).encode("utf-8")
+
+
+def create_kafka_topic(topic_name, group_id=None, num_partitions=None, replication_factor=None):
     """
     Create a fresh Kafka topic with the given name.
     Args:
         topic_name (str): Name of the Kafka topic.
+        group_id (str): Consumer group ID used when clearing an existing topic.
+        num_partitions (int): Partition count. Defaults to KAFKA_NUM_PARTITIONS.
+                              An existing topic with fewer partitions is grown.
+        replication_factor (int): Replicas per partition for a new topic.
+                                  Defaults to KAFKA_REPLICATION_FACTOR.
     """
     kafka_broker = get_kafka_broker_address()
+    num_partitions = num_partitions or get_num_partitions()
+    replication_factor = replication_factor or get_replication_factor()
+
+    from utils.utils_transport import get_transport, create_topic
+
+    transport = get_transport()
+    if transport != "kafka":
+        create_topic(transport, topic_name, num_partitions)
+        return
 
     try:
-        admin_client = KafkaAdminClient(bootstrap_servers=kafka_broker)
+        from kafka.admin import NewTopic
+
+        admin_client = registry.admin(kafka_broker)
 
         # Check if the topic exists
-        topics = admin_client.list_topics()
+        topics = registry.list_topics(kafka_broker)
         if topic_name in topics:
             logger.info(f"Topic '{topic_name}' already exists. Clearing it out...")
             clear_kafka_topic(topic_name, group_id)
+            alter_topic_partitions(topic_name, num_partitions)
 
         else:
-            logger.info(f"Creating '{topic_name}'.")
+            logger.info(
+                f"Creating '{topic_name}' with {num_partitions} partition(s) "
+                f"and replication factor {replication_factor}."
+            )
             new_topic = NewTopic(
-                name=topic_name, num_partitions=1, replication_factor=1
+                name=topic_name,
+                num_partitions=num_partitions,
+                replication_factor=replication_factor,
             )
             admin_client.create_topics([new_topic])
+            registry.invalidate(kafka_broker, topic_name)
             logger.info(f"Topic '{topic_name}' created successfully.")
 
     except Exception as e:
         logger.error(f"Error managing topic '{topic_name}': {e}")
         sys.exit(1)
 
-    finally:
-        admin_client.close()
 
-
-def clear_kafka_topic(topic_name, group_id):
+def ensure_kafka_topic(topic_name, num_partitions=None, replication_factor=None):
     """
-    Consume and discard all messages in the Kafka topic to clear it.
+    Make sure a topic exists with at least num_partitions partitions.
+
+    Unlike create_kafka_topic, an existing topic keeps its messages.
+    Errors are logged, not raised, so a producer can still start and
+    report its own connection failure.
 
     Args:
         topic_name (str): Name of the Kafka topic.
-        group_id (str): Consumer group ID.
+        num_partitions (int): Partition count. Defaults to KAFKA_NUM_PARTITIONS.
+        replication_factor (int): Replicas per partition for a new topic.
+                                  Defaults to KAFKA_REPLICATION_FACTOR.
     """
     kafka_broker = get_kafka_broker_address()
-    admin_client = KafkaAdminClient(bootstrap_servers=kafka_broker)
+    num_partitions = num_partitions or get_num_partitions()
+    replication_factor = replication_factor or get_replication_factor()
+
+    from utils.utils_transport import get_transport, create_topic
+
+    transport = get_transport()
+    if transport != "kafka":
+        create_topic(transport, topic_name, num_partitions)
+        return
 
     try:
-        # Fetch the current retention period
-        config_resource = ConfigResource(ConfigResourceType.TOPIC, topic_name)
-        configs = admin_client.describe_configs([config_resource])
-        original_retention = configs[config_resource].get("retention.ms", "604800000")  # Default to 7 days
-        logger.info(f"Original retention.ms for topic '{topic_name}': {original_retention}")
-
-        # Temporarily set retention to 1ms
-        admin_client.alter_configs({config_resource: {"retention.ms": "1"}})
-        logger.info(f"Retention.ms temporarily set to 1ms for topic '{topic_name}'.")
-
-        # Wait a moment for Kafka to apply retention and delete old data
-        time.sleep(2)
-
-        # Clear remaining messages by consuming and discarding them
-        logger.info(f"Clearing topic '{topic_name}' by consuming all messages...")
-        consumer = KafkaConsumer(
-            topic_name,
-            group_id=group_id,
-            bootstrap_servers=kafka_broker,
-            auto_offset_reset="earliest",
-            enable_auto_commit=True,
+        from kafka.admin import NewTopic
+
+        if topic_name in registry.list_topics(kafka_broker):
+            alter_topic_partitions(topic_name, num_partitions)
+            return
+        logger.info(
+            f"Creating '{topic_name}' with {num_partitions} partition(s) "
+            f"and replication factor {replication_factor}."
         )
-        for message in consumer:
-            logger.debug(f"Clearing message: {message.value}")
-        consumer.close()
-        logger.info(f"All messages cleared from topic '{topic_name}'.")
+        registry.admin(kafka_broker).create_topics(
+            [NewTopic(name=topic_name, num_partitions=num_partitions, replication_factor=replication_factor)]
+        )
+        registry.invalidate(kafka_broker, topic_name)
+    except Exception as e:
+        logger.error(f"Could not ensure topic '{topic_name}' has {num_partitions} partition(s): {e}")
+
+
+def get_topic_partition_count(topic_name, refresh=False) -> int:
+    """Return the number of partitions in an existing topic (cached metadata)."""
+    from utils.utils_transport import get_transport, topic_partition_count
 
-        # Restore the original retention period
-        admin_client.alter_configs({config_resource: {"retention.ms": original_retention}})
-        logger.info(f"Retention.ms restored to {original_retention} for topic '{topic_name}'.")
+    transport = get_transport()
+    if transport != "kafka":
+        return topic_partition_count(transport, topic_name)
+    description = registry.describe_topic(get_kafka_broker_address(), topic_name, refresh)
+    return len(description["partitions"])
 
+
+def partitioner_for_topic(topic_name, key_field):
+    """
+    Return a function mapping a message to the partition its key would go to.
+
+    Used to group messages bound for the same partition, e.g. when packing
+    envelopes. If the topic cannot be described, every message maps to 0.
+
+    Args:
+        topic_name (str): Name of the Kafka topic.
+        key_field (str): Message field used as the partition key.
+
+    Returns:
+        callable: message dict -> partition index.
+    """
+    try:
+        num_partitions = get_topic_partition_count(topic_name)
+    except Exception as e:
+        logger.warning(f"Could not read partitions for topic '{topic_name}' ({e}). Using one group.")
+        num_partitions = 1
+    if num_partitions <= 1:
+        return lambda message: 0
+    return lambda message: partition_for_key(message[key_field], num_partitions)
+
+
+def alter_topic_partitions(topic_name, num_partitions):
+    """
+    Grow a topic to at least num_partitions partitions.
+
+    Kafka cannot remove partitions, so a topic that already has enough
+    partitions is left alone.
+
+    Args:
+        topic_name (str): Name of the Kafka topic.
+        num_partitions (int): Desired partition count.
+    """
+    from kafka.admin import NewPartitions
+
+    kafka_broker = get_kafka_broker_address()
+    current = get_topic_partition_count(topic_name, refresh=True)
+    if current >= num_partitions:
+        logger.info(f"Topic '{topic_name}' has {current} partition(s).")
+        return
+    registry.admin(kafka_broker).create_partitions(
+        {topic_name: NewPartitions(total_count=num_partitions)}
+    )
+    registry.invalidate(kafka_broker, topic_name)
+    logger.info(
+        f"Topic '{topic_name}' grown from {current} to {num_partitions} partition(s)."
+    )
+
+
+def _truncate_topic(admin_client, kafka_broker, topic_name, num_partitions, timeout_ms):
+    """Delete every record below each partition's end offset (delete-records)."""
+    from kafka import TopicPartition
+
+    consumer = registry.metadata_consumer(kafka_broker)
+    partitions = [TopicPartition(topic_name, p) for p in range(num_partitions)]
+    end_offsets = consumer.end_offsets(partitions)
+    records_to_delete = {tp: offset for tp, offset in end_offsets.items() if offset > 0}
+    if records_to_delete:
+        admin_client.delete_records(records_to_delete, timeout_ms=timeout_ms)
+    return sum(records_to_delete.values())
+
+
+def _recreate_topic(admin_client, topic_name, num_partitions, replication_factor, deadline):
+    """Delete the topic and create it again with the same partition layout."""
+    from kafka import errors
+    from kafka.admin import NewTopic
+
+    admin_client.delete_topics([topic_name], timeout_ms=_remaining_ms(deadline))
+    new_topic = NewTopic(
+        name=topic_name,
+        num_partitions=num_partitions,
+        replication_factor=replication_factor,
+    )
+    # Deletion finishes asynchronously; retry until the broker accepts the create
+    while True:
+        try:
+            admin_client.create_topics([new_topic], timeout_ms=_remaining_ms(deadline))
+            return
+        except errors.TopicAlreadyExistsError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+def _remaining_ms(deadline) -> int:
+    """Milliseconds left before a monotonic deadline (at least 1)."""
+    return max(1, int((deadline - time.monotonic()) * 1000))
+
+
+def reset_kafka_topic(topic_name, timeout_secs=10.0):
+    """
+    Remove all messages from a topic without reading them.
+
+    Uses delete-records up to each partition's end offset when the client
+    supports it (kafka-python 2.1+). Otherwise the topic is deleted and
+    recreated with the same partition count and replication factor; other
+    topic-level config overrides are not copied. Both paths take about
+    the same time however much data the topic holds.
+
+    Args:
+        topic_name (str): Name of the Kafka topic.
+        timeout_secs (float): Give up after this many seconds.
+
+    Returns:
+        float: Elapsed seconds.
+    """
+    kafka_broker = get_kafka_broker_address()
+    start = time.monotonic()
+    deadline = start + timeout_secs
+    timeout_ms = int(timeout_secs * 1000)
+    admin_client = registry.admin(kafka_broker)
+
+    # Fresh metadata: what gets deleted must match the topic as it is now
+    partitions = registry.describe_topic(kafka_broker, topic_name, refresh=True)["partitions"]
+    num_partitions = len(partitions)
+    replication_factor = max(len(p["replicas"]) for p in partitions)
+
+    if hasattr(admin_client, "delete_records"):
+        method = "delete-records"
+        deleted = _truncate_topic(
+            admin_client, kafka_broker, topic_name, num_partitions, timeout_ms
+        )
+        logger.debug(f"Deleted {deleted} records from topic '{topic_name}'.")
+    else:
+        method = "recreate"
+        _recreate_topic(
+            admin_client, topic_name, num_partitions, replication_factor, deadline
+        )
+        registry.invalidate(kafka_broker, topic_name)
+
+    elapsed = time.monotonic() - start
+    logger.info(
+        f"Topic '{topic_name}' reset by {method} in {elapsed * 1000:.0f} ms "
+        f"({num_partitions} partition(s))."
+    )
+    return elapsed
+
+
+def clear_kafka_topic(topic_name, group_id=None, timeout_secs=10.0):
+    """
+    Remove all messages from the Kafka topic.
+
+    Args:
+        topic_name (str): Name of the Kafka topic.
+        group_id (str): Consumer group ID. Kept for existing callers; a reset
+                        does not read the topic, so no offsets are committed.
+        timeout_secs (float): Give up after this many seconds.
+    """
+    try:
+        reset_kafka_topic(topic_name, timeout_secs=timeout_secs)
     except Exception as e:
-        logger.error(f"Error managing retention for topic '{topic_name}': {e}")
-    finally:
-        admin_client.close()
+        logger.error(f"Error clearing topic '{topic_name}': {e}")
 
 
 #####################################
@@ -0,0 +1,485 @@
+"""
+utils_profiling.py - opt-in profiling of producer and consumer entry points.
+
+Entry points run their main function through run_profiled(main), and
+utils_fanout runs every worker through it. With PROFILE unset it calls
+main directly, so profiling costs nothing unless asked for.
+
+Profilers (PROFILE, comma separated for more than one):
+    cprofile     Deterministic cProfile of the main thread. Reports are
+                 .prof files (pstats, snakeviz) plus a text top list.
+    sample       Wall-clock sampling of every thread's stack every
+                 PROFILE_SAMPLE_MS. Reports are .collapsed files (one
+                 stack per line with a count, for flamegraph.pl or
+                 speedscope) plus a text top list. Time spent waiting
+                 (poll, sleep) shows up here but not in cProfile.
+    tracemalloc  Top allocation sites, and the change since the last report.
+
+Reports are written to PROFILE_DIR as <process>-<YYYYmmdd-HHMMSS>-<profiler>.*
+every PROFILE_INTERVAL_SECS, every PROFILE_EVERY_MESSAGES messages
+(counted by the busiest utils_metrics pipeline stage), on SIGUSR1
+(kill -USR1 <pid>) and when main returns. Reports are cumulative from
+the start of the run.
+
+cProfile can only be read on the thread it profiles, so its totals are
+copied in a SIGUSR1 handler on the main thread. Without SIGUSR1
+(Windows), cProfile reports only at exit. While profiling, SIGTERM exits
+through the normal shutdown path, so terminated workers still report.
+
+Environment variables:
+    PROFILE                 cprofile, sample and/or tracemalloc (default off).
+    PROFILE_DIR             Report folder (default profiles).
+    PROFILE_INTERVAL_SECS   Seconds between reports (default 60, 0 = only at exit).
+    PROFILE_EVERY_MESSAGES  Messages between reports (default 0 = off).
+    PROFILE_SAMPLE_MS       Sampling interval (default 10).
+    PROFILE_TOP             Entries in the text reports (default 30).
+
+Profile any script without editing it:
+
+    python -m utils.utils_profiling --profile sample --interval 30 "Kersha_Live_Visualization_Consumers (p 4)/kersha_csv_live_consumer.py"
+
+Run this module with benchmark to measure each profiler's overhead:
+
+    python -m utils.utils_profiling benchmark
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import collections
+import cProfile
+import functools
+import io
+import json
+import linecache
+import marshal
+import os
+import pathlib
+import runpy
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# Import functions from local modules
+from utils.utils_logger import logger, get_process_log_file
+from utils.utils_metrics import stage_message_counts
+
+#####################################
+# Default Configurations
+#####################################
+
+PROFILERS = ("cprofile", "sample", "tracemalloc")
+DEFAULT_PROFILE_DIR = pathlib.Path("profiles")
+DEFAULT_INTERVAL_SECS = 60
+DEFAULT_SAMPLE_MS = 10
+DEFAULT_TOP = 30
+TRACEMALLOC_FRAMES = 1  # Reports group by line, so deeper stacks only cost time
+# How often the report thread checks the interval and message triggers
+CHECK_SECS = 1.0
+
+# Set while a profiling session runs, so nested run_profiled calls run plainly.
+# The pid tells a forked worker that the session it inherited is not its own.
+_active = {"session": None, "pid": None}
+
+
+def get_profilers() -> list:
+    """Parse PROFILE into a list of profiler names, ignoring unknown ones."""
+    names = [name.strip().lower() for name in os.getenv("PROFILE", "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROFILERS]
+    if unknown:
+        logger.warning(f"Unknown PROFILE entries {unknown}. Choose from {PROFILERS}.")
+    return [name for name in names if name in PROFILERS]
+
+
+def get_profile_dir() -> pathlib.Path:
+    """Fetch the report folder from environment or use default."""
+    return pathlib.Path(os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR))
+
+
+#####################################
+# Profilers
+#####################################
+
+
+class CProfileRecorder:
+    """cProfile of the thread that started it (the main thread)."""
+
+    name = "cprofile"
+
+    def start(self) -> None:
+        self.profiler = cProfile.Profile()
+        self._stats = None
+        self.profiler.enable()
+
+    def capture(self) -> None:
+        """Copy the totals so far. Must run on the profiled thread."""
+        # disable/enable keep the totals collected so far
+        self.profiler.disable()
+        try:
+            self.profiler.create_stats()
+            self._stats = dict(self.profiler.stats)
+        finally:
+            self.profiler.enable()
+
+    def dump(self, stem: str, top: int) -> None:
+        if self._stats is None:
+            return
+        with open(f"{stem}.prof", "wb") as out:
+            marshal.dump(self._stats, out)  # The format pstats and snakeviz read
+        import pstats
+
+        text = io.StringIO()
+        pstats.Stats(f"{stem}.prof", stream=text).sort_stats("cumulative").print_stats(top)
+        pathlib.Path(f"{stem}.txt").write_text(text.getvalue(), encoding="utf-8")
+
+    def stop(self) -> None:
+        self.profiler.disable()
+
+
+class SamplingRecorder:
+    """Wall-clock stack samples of every thread from a background thread."""
+
+    name = "sample"
+
+    def __init__(self, interval_ms: float = DEFAULT_SAMPLE_MS):
+        self.interval_secs = interval_ms / 1000
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval_secs):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def dump(self, stem: str, top: int) -> None:
+        stacks = self.stacks.copy()
+        with open(f"{stem}.collapsed", "w", encoding="utf-8") as out:
+            out.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+        # Self time: innermost frame; total time: any frame on the stack
+        self_counts, total_counts = collections.Counter(), collections.Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for frame in set(frames[1:]):
+                total_counts[frame] += count
+        lines = [f"{self.samples} samples every {self.interval_secs * 1000:g} ms", "", "Self samples:"]
+        lines += [f"{count:8d}  {frame}" for frame, count in self_counts.most_common(top)]
+        lines += ["", "Total samples (on stack):"]
+        lines += [f"{count:8d}  {frame}" for frame, count in total_counts.most_common(top)]
+        pathlib.Path(f"{stem}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class TracemallocRecorder:
+    """Top allocation sites, with the change since the previous report."""
+
+    name = "tracemalloc"
+
+    def start(self) -> None:
+        self._started_here = not tracemalloc.is_tracing()
+        if self._started_here:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._previous = None
+
+    def dump(self, stem: str, top: int) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, linecache.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)", "", "Top allocation sites:"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+        if self._previous is not None:
+            lines += ["", "Change since the previous report:"]
+            lines += [str(stat) for stat in snapshot.compare_to(self._previous, "lineno")[:top]]
+        self._previous = snapshot
+        pathlib.Path(f"{stem}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def stop(self) -> None:
+        if self._started_here:
+            tracemalloc.stop()
+
+
+#####################################
+# Profiling Session
+#####################################
+
+
+class ProfileSession:
+    """
+    Run the chosen profilers and write reports on the configured triggers.
+
+    Reports are written by a background thread. The SIGUSR1 handler only
+    copies the cProfile totals (which can only be read on the main
+    thread) and wakes that thread, so nothing is logged or written from
+    inside a signal handler.
+    """
+
+    def __init__(
+        self,
+        profilers: list,
+        directory: pathlib.Path = None,
+        interval_secs: float = None,
+        every_messages: int = None,
+        sample_ms: float = None,
+        top: int = None,
+    ):
+        env = os.getenv
+        self.directory = directory or get_profile_dir()
+        self.interval_secs = float(env("PROFILE_INTERVAL_SECS", DEFAULT_INTERVAL_SECS)) if interval_secs is None else interval_secs
+        self.every_messages = int(env("PROFILE_EVERY_MESSAGES", 0)) if every_messages is None else every_messages
+        self.top = int(env("PROFILE_TOP", DEFAULT_TOP)) if top is None else top
+        sample_ms = float(env("PROFILE_SAMPLE_MS", DEFAULT_SAMPLE_MS)) if sample_ms is None else sample_ms
+
+        recorders = {
+            "cprofile": CProfileRecorder,
+            "sample": lambda: SamplingRecorder(sample_ms),
+            "tracemalloc": TracemallocRecorder,
+        }
+        self.recorders = [recorders[name]() for name in profilers]
+        self.cprofile = next((r for r in self.recorders if isinstance(r, CProfileRecorder)), None)
+        self.process_name = get_process_log_file().stem
+        self._dump_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._requested = threading.Event()
+        self._signal = None
+        self._previous_handlers = {}
+        self.reports = 0
+
+    def start(self) -> None:
+        """Start the profilers, the signal handlers and the report thread."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if threading.current_thread() is threading.main_thread():
+            self._signal = getattr(signal, "SIGUSR1", None)
+            if self._signal is not None:
+                self._previous_handlers[self._signal] = signal.signal(self._signal, self._on_signal)
+            # A terminated worker (see utils_fanout) still unwinds and writes its final report
+            if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+                self._previous_handlers[signal.SIGTERM] = signal.signal(signal.SIGTERM, _exit_on_sigterm)
+        if self._signal is None and self.cprofile is not None:
+            logger.warning("cProfile reports will only be written at exit on this platform.")
+        for recorder in self.recorders:
+            recorder.start()
+        self._thread = threading.Thread(target=self._run, name="profile-reports", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Profiling with {[r.name for r in self.recorders]}; reports in {self.directory} "
+            f"every {self.interval_secs:g}s / {self.every_messages} messages"
+            + (f", or on kill -USR1 {os.getpid()}" if self._signal is not None else "")
+        )
+
+    def _on_signal(self, signum, frame) -> None:
+        """SIGUSR1 on the main thread: copy the cProfile totals and wake the report thread."""
+        if self.cprofile is not None:
+            self.cprofile.capture()
+        self._requested.set()
+
+    def _run(self) -> None:
+        """Report thread: write reports when requested or when a trigger is due."""
+        last_time = time.monotonic()
+        last_messages = 0
+        while not self._stop.is_set():
+            if self._requested.wait(CHECK_SECS):
+                self._requested.clear()
+                if not self._stop.is_set():
+                    self.dump("requested")
+                continue
+            now = time.monotonic()
+            messages = max(stage_message_counts().values(), default=0)
+            due = (self.interval_secs > 0 and now - last_time >= self.interval_secs) or (
+                self.every_messages > 0 and messages - last_messages >= self.every_messages
+            )
+            if not due:
+                continue
+            last_time, last_messages = now, messages
+            if self._signal is not None:
+                os.kill(os.getpid(), self._signal)  # Copies cProfile totals, then wakes this thread
+            else:
+                self.dump("interval")
+
+    def dump(self, reason: str) -> None:
+        """Write one report per profiler."""
+        with self._dump_lock:
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            for recorder in self.recorders:
+                stem = self.directory / f"{self.process_name}-{stamp}-{recorder.name}"
+                try:
+                    recorder.dump(str(stem), self.top)
+                except Exception as e:
+                    logger.error(f"Could not write {recorder.name} report {stem}: {e}")
+            self.reports += 1
+            logger.info(f"Wrote profile reports {self.directory / f'{self.process_name}-{stamp}-*'} ({reason}).")
+
+    def stop(self) -> None:
+        """Write the final reports and stop profiling."""
+        self._stop.set()
+        self._requested.set()
+        self._thread.join()
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        if self.cprofile is not None:
+            self.cprofile.capture()
+        self.dump("exit")
+        for recorder in self.recorders:
+            recorder.stop()
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    """Turn SIGTERM into SystemExit so finally blocks and the exit report run."""
+    raise SystemExit(128 + signum)
+
+
+def run_profiled(function, *args, **kwargs):
+    """
+    Call function(*args, **kwargs), profiled as PROFILE asks.
+
+    Nested calls in the same process run inside the outer session.
+    Worker processes (see utils_fanout) get a session and reports of
+    their own.
+    """
+    profilers = get_profilers()
+    if not profilers or (_active["session"] is not None and _active["pid"] == os.getpid()):
+        return function(*args, **kwargs)
+    session = ProfileSession(profilers)
+    _active["session"], _active["pid"] = session, os.getpid()
+    session.start()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        session.stop()
+        _active["session"] = _active["pid"] = None
+
+
+def profiled(function):
+    """Decorator form of run_profiled."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return run_profiled(function, *args, **kwargs)
+
+    return wrapper
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def _benchmark_loop(num_messages: int) -> None:
+    """A stand-in main loop: build, encode and decode one small record per message."""
+    for i in range(num_messages):
+        record = {"sensor_id": f"sensor-{i % 8}", "reading": i * 0.5, "status": "ok"}
+        json.loads(json.dumps(record))
+
+
+def benchmark(num_messages: int = 200_000) -> dict:
+    """
+    Time the stand-in loop plain, through run_profiled with PROFILE unset,
+    and under each profiler (reports go to a temporary folder).
+    """
+    results = {}
+    saved = os.environ.get("PROFILE")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.pop("PROFILE", None)
+        _benchmark_loop(num_messages // 10)  # Warm up
+        start = time.perf_counter()
+        _benchmark_loop(num_messages)
+        plain_secs = time.perf_counter() - start
+        results["plain_msgs_per_sec"] = round(num_messages / plain_secs)
+
+        for name in ("off", *PROFILERS):
+            if name == "off":
+                os.environ.pop("PROFILE", None)
+            else:
+                os.environ["PROFILE"] = name
+            os.environ["PROFILE_DIR"] = tmp
+            start = time.perf_counter()
+            run_profiled(_benchmark_loop, num_messages)
+            secs = time.perf_counter() - start
+            results[f"{name}_msgs_per_sec"] = round(num_messages / secs)
+            results[f"{name}_overhead_pct"] = round((secs / plain_secs - 1) * 100, 1)
+        os.environ.pop("PROFILE_DIR")
+    if saved is None:
+        os.environ.pop("PROFILE", None)
+    else:
+        os.environ["PROFILE"] = saved
+    logger.info(f"Profiling benchmark: {results}")
+    return results
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main(argv: list = None) -> None:
+    """Run a script as __main__ under the profilers named on the command line, or the benchmark."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["benchmark"]:
+        benchmark()
+        return
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile a producer or consumer script.")
+    parser.add_argument("--profile", default=os.getenv("PROFILE") or "cprofile",
+                        help="cprofile, sample and/or tracemalloc, comma separated (default cprofile)")
+    parser.add_argument("--interval", type=float, help="Seconds between reports (PROFILE_INTERVAL_SECS)")
+    parser.add_argument("--every-messages", type=int, help="Messages between reports (PROFILE_EVERY_MESSAGES)")
+    parser.add_argument("--dir", help="Report folder (PROFILE_DIR)")
+    parser.add_argument("script", help="Script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    options = parser.parse_args(argv)
+
+    # Through the environment, so worker processes started by the script profile too
+    os.environ["PROFILE"] = options.profile
+    for name, value in (
+        ("PROFILE_INTERVAL_SECS", options.interval),
+        ("PROFILE_EVERY_MESSAGES", options.every_messages),
+        ("PROFILE_DIR", options.dir),
+    ):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    script = pathlib.Path(options.script).resolve()
+    sys.argv = [str(script), *options.args]
+    sys.path.insert(0, str(script.parent))
+    run_profiled(runpy.run_path, str(script), run_name="__main__")
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
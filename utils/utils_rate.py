@@ -0,0 +1,186 @@
+"""
+utils_rate.py - pace producers at a target message rate.
+
+A token bucket replaces fixed time.sleep() loops. The bucket refills at
+the target rate from a monotonic clock, so time spent generating and
+sending a message counts toward the interval instead of adding to it.
+Rates can be fractional (0.2 msgs/s) or very high (100k+ msgs/s).
+
+Environment variables (PREFIX is chosen by each producer, e.g. SMOKER):
+    PREFIX_MESSAGES_PER_SECOND  Target rate, or "max" for no pacing.
+    PREFIX_BURST                Messages allowed back-to-back after idle time.
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import os
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+MAX_SPEED = "max"
+DEFAULT_BURST = 1
+
+# Sleeps shorter than this are skipped and repaid on a later call.
+# time.sleep() cannot reliably wait less than about a millisecond.
+DEFAULT_MIN_SLEEP_SECS = 0.001
+
+#####################################
+# Rate Scheduler
+#####################################
+
+
+class RateScheduler:
+    """
+    Token-bucket scheduler for a target message rate.
+
+    Call acquire() once per message (or acquire(n) per batch of n).
+    The bucket may go into debt by up to min_sleep_secs worth of tokens
+    before the scheduler sleeps, so high rates do not pay for a sleep
+    call on every message. The long-run rate stays exact.
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float = None,
+        burst: int = DEFAULT_BURST,
+        min_sleep_secs: float = DEFAULT_MIN_SLEEP_SECS,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            rate_per_sec (float): Target messages per second.
+                                  None or <= 0 means max speed (no pacing).
+            burst (int): Messages allowed back-to-back after idle time.
+            min_sleep_secs (float): Smallest sleep the scheduler will make.
+            clock (callable): Monotonic clock, replaceable for testing.
+            sleep (callable): Sleep function, replaceable for testing.
+        """
+        self.max_speed = rate_per_sec is None or rate_per_sec <= 0
+        self.rate = None if self.max_speed else float(rate_per_sec)
+        self.min_sleep_secs = min_sleep_secs
+        self._clock = clock
+        self._sleep = sleep
+
+        if self.max_speed:
+            self.capacity = 0.0
+        else:
+            # Capacity must cover sleep overshoot or high rates fall short
+            self.capacity = max(float(burst), self.rate * min_sleep_secs)
+
+        self.tokens = self.capacity
+        self.started = clock()
+        self._last = self.started
+        self.sent = 0
+
+    def acquire(self, n: int = 1, on_wait=None) -> float:
+        """
+        Wait until n messages may be sent.
+
+        Args:
+            n (int): Number of messages about to be sent.
+            on_wait (callable, optional): Called with the seconds about to
+                be slept, before sleeping. It may use part of that time
+                (e.g. to flush batches that come due); the scheduler then
+                sleeps only what is left.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        self.sent += n
+        if self.max_speed:
+            return 0.0
+
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        self.tokens -= n
+        if self.tokens >= 0:
+            return 0.0
+
+        wait = -self.tokens / self.rate
+        if wait < self.min_sleep_secs:
+            return 0.0
+        if on_wait is not None:
+            on_wait(wait)
+            remaining = now + wait - self._clock()
+            if remaining > 0:
+                self._sleep(remaining)
+            return wait
+        self._sleep(wait)
+        return wait
+
+    def paced(self, iterable, on_wait=None):
+        """
+        Yield items from iterable, acquiring one token before each (see acquire).
+
+        The wait comes before the next item is pulled, so a generator builds
+        (and timestamps) each message when it is due, not one interval early.
+        """
+        iterator = iter(iterable)
+        while True:
+            self.acquire(on_wait=on_wait)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            yield item
+
+    def actual_rate(self) -> float:
+        """Return the average messages per second since the scheduler started."""
+        elapsed = self._clock() - self.started
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def describe(self) -> str:
+        """Return a short description for log messages."""
+        if self.max_speed:
+            return "max speed (no pacing)"
+        return f"{self.rate:g} msgs/s, burst {self.capacity:g}"
+
+
+#####################################
+# Environment Helpers
+#####################################
+
+
+def create_rate_scheduler(prefix: str, interval_secs: float, num_workers: int = 1) -> RateScheduler:
+    """
+    Build a RateScheduler from PREFIX_MESSAGES_PER_SECOND and PREFIX_BURST.
+
+    If no rate is set, the scheduler keeps the producer's existing pace of
+    one message every interval_secs.
+
+    Args:
+        prefix (str): Environment variable prefix, e.g. "SMOKER".
+        interval_secs (float): Fallback interval between messages.
+        num_workers (int): Processes sharing the rate. Each gets an equal
+                           share, so together they send at the target rate.
+
+    Returns:
+        RateScheduler: Configured scheduler.
+    """
+    rate_setting = os.getenv(f"{prefix}_MESSAGES_PER_SECOND")
+    burst = int(os.getenv(f"{prefix}_BURST", DEFAULT_BURST))
+
+    if rate_setting is None:
+        rate = 1.0 / interval_secs if interval_secs > 0 else None
+    elif rate_setting.strip().lower() == MAX_SPEED:
+        rate = None
+    else:
+        rate = float(rate_setting)
+    if rate is not None and num_workers > 1:
+        rate /= num_workers
+
+    scheduler = RateScheduler(rate, burst=burst)
+    share = f" (1/{num_workers} of the total)" if num_workers > 1 and rate is not None else ""
+    logger.info(f"Message rate: {scheduler.describe()}{share}")
+    return scheduler
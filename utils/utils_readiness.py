@@ -0,0 +1,325 @@
+"""
+utils_readiness.py - wait for ZooKeeper and Kafka in parallel.
+
+Each endpoint is probed in its own asyncio task. A failed probe is
+retried after an exponential backoff with random jitter, so a fleet of
+producers restarting together does not retry in lockstep. All probes
+share one total deadline.
+
+A successful result is cached for a short TTL, so repeated checks in one
+process (for example per topic) return at once. The cached result is
+dropped as soon as any shared Kafka client call to the broker fails.
+
+The Kafka metadata check uses the shared admin client from utils_clients,
+so only the first attempt pays for the bootstrap handshake. Each checked
+endpoint reports its time-to-ready in the buzzline_readiness_seconds
+histogram and whether it became ready in the buzzline_readiness_ready
+gauge (see utils_metrics).
+
+Environment variables:
+    READINESS_TIMEOUT_SECONDS  Total time to wait for all services (default 30).
+    READINESS_CACHE_SECONDS    How long a successful result is reused (default 10).
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+# Import functions from local modules
+from utils.utils_logger import logger
+from utils.utils_clients import registry
+from utils.utils_metrics import REGISTRY
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_READINESS_TIMEOUT_SECS = 30.0
+DEFAULT_READINESS_CACHE_SECS = 10.0
+DEFAULT_CONNECT_TIMEOUT_SECS = 2.0
+INITIAL_BACKOFF_SECS = 0.1
+MAX_BACKOFF_SECS = 5.0
+# Seconds; from an already-running broker up to a slow cluster start
+READINESS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+#####################################
+# Result Types
+#####################################
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of waiting for one endpoint."""
+
+    name: str
+    address: str
+    ready: bool = False
+    attempts: int = 0
+    elapsed_secs: float = 0.0
+    error: str = None
+
+
+@dataclass
+class ReadinessReport:
+    """Outcome of waiting for all endpoints."""
+
+    ready: bool
+    elapsed_secs: float
+    probes: list = field(default_factory=list)
+    cached: bool = False
+
+    def failed(self) -> list:
+        """Return the names of endpoints that never became ready."""
+        return [probe.name for probe in self.probes if not probe.ready]
+
+
+def get_readiness_timeout() -> float:
+    """Fetch total readiness timeout in seconds from environment or use default."""
+    return float(os.getenv("READINESS_TIMEOUT_SECONDS", DEFAULT_READINESS_TIMEOUT_SECS))
+
+
+def get_readiness_cache_ttl() -> float:
+    """Fetch readiness cache TTL in seconds from environment or use default."""
+    return float(os.getenv("READINESS_CACHE_SECONDS", DEFAULT_READINESS_CACHE_SECS))
+
+
+#####################################
+# Probes
+#####################################
+
+
+def split_address(address: str) -> tuple:
+    """Return (host, port) for the first entry of a "host:port[,host:port]" string."""
+    host, port = address.split(",")[0].strip().rsplit(":", 1)
+    return host, int(port)
+
+
+async def probe_tcp(address: str, timeout_secs: float) -> None:
+    """Open and close a TCP connection to address. Raises on failure."""
+    host, port = split_address(address)
+    _, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout=timeout_secs
+    )
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+def kafka_metadata_check(kafka_broker: str):
+    """
+    Return a check that fetches cluster metadata with the shared admin client.
+
+    The client is reused across attempts and with the rest of the process
+    (registry.admin). If a call fails, the client is closed and dropped
+    from the registry, so the next attempt connects afresh. run_check
+    bounds how long the caller waits for each attempt.
+    """
+
+    def check(timeout_secs: float) -> None:
+        admin = registry.admin(kafka_broker)
+        try:
+            admin.describe_cluster()
+        except Exception:
+            registry.discard(("admin", kafka_broker))
+            try:
+                admin.close()
+            except Exception as e:
+                logger.debug(f"Error closing failed admin client: {e}")
+            raise
+
+    return check
+
+
+async def run_check(check, timeout_secs: float) -> None:
+    """
+    Run a blocking check(timeout_secs) in a daemon thread, for at most timeout_secs.
+
+    A daemon thread rather than asyncio.to_thread: asyncio.run waits for
+    the default executor at shutdown, so a check stuck past its deadline
+    would hold up the caller. Raises asyncio.TimeoutError on timeout.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(error):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def target():
+        error = None
+        try:
+            check(timeout_secs)
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(settle, error)
+        except RuntimeError:
+            pass  # The loop has closed; nobody is waiting any more
+
+    threading.Thread(target=target, name="readiness-check", daemon=True).start()
+    await asyncio.wait_for(future, timeout=timeout_secs)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff for the given attempt, with 50-100% random jitter."""
+    delay = min(MAX_BACKOFF_SECS, INITIAL_BACKOFF_SECS * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def wait_for_endpoint(name: str, address: str, deadline: float, check=None) -> ProbeResult:
+    """
+    Probe one endpoint until it is ready or the deadline passes.
+
+    Args:
+        name (str): Label for logs and reports, e.g. "kafka".
+        address (str): "host:port" to connect to.
+        deadline (float): time.monotonic() value to give up at.
+        check (callable, optional): Blocking extra check run after the TCP
+                                    connect succeeds (in a worker thread).
+                                    It is passed the seconds left before the
+                                    deadline and must not take longer.
+
+    Returns:
+        ProbeResult: Whether the endpoint became ready, and how long it took.
+    """
+    result = ProbeResult(name=name, address=address)
+    start = time.monotonic()
+    while True:
+        result.attempts += 1
+        remaining = deadline - time.monotonic()
+        try:
+            await probe_tcp(address, min(DEFAULT_CONNECT_TIMEOUT_SECS, max(remaining, 0.01)))
+            if check is not None:
+                await run_check(check, max(deadline - time.monotonic(), 0.01))
+            result.ready = True
+            result.error = None
+            break
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Never sleep past the deadline; the last attempt happens right at it
+        delay = min(backoff_delay(result.attempts - 1), remaining)
+        logger.debug(f"{name} not ready at {address} ({result.error}). Retrying in {delay:.2f}s.")
+        await asyncio.sleep(delay)
+
+    result.elapsed_secs = time.monotonic() - start
+    return result
+
+
+async def wait_until_ready(endpoints: list, timeout_secs: float) -> ReadinessReport:
+    """
+    Probe all endpoints concurrently under one deadline.
+
+    Args:
+        endpoints (list): (name, address, check) tuples; check may be None.
+        timeout_secs (float): Total time allowed.
+
+    Returns:
+        ReadinessReport: Combined result.
+    """
+    start = time.monotonic()
+    deadline = start + timeout_secs
+    probes = await asyncio.gather(
+        *(wait_for_endpoint(name, address, deadline, check) for name, address, check in endpoints)
+    )
+    return ReadinessReport(
+        ready=all(probe.ready for probe in probes),
+        elapsed_secs=time.monotonic() - start,
+        probes=list(probes),
+    )
+
+
+#####################################
+# Metrics
+#####################################
+
+
+def record_readiness(report: ReadinessReport) -> None:
+    """Export each endpoint's time-to-ready and ready state to the metrics registry."""
+    for probe in report.probes:
+        REGISTRY.gauge(
+            "buzzline_readiness_ready", "1 if the endpoint passed its last readiness check, else 0.",
+            endpoint=probe.name,
+        ).set(1 if probe.ready else 0)
+        if probe.ready:
+            REGISTRY.histogram(
+                "buzzline_readiness_seconds", "Seconds until each endpoint became ready.",
+                buckets=READINESS_BUCKETS, endpoint=probe.name,
+            ).observe(probe.elapsed_secs)
+
+
+#####################################
+# Cached Entry Point
+#####################################
+
+_last_success = {"at": None, "key": None, "report": None}
+
+
+def check_services_ready(zookeeper_address: str, kafka_broker: str, timeout_secs: float = None) -> ReadinessReport:
+    """
+    Wait for ZooKeeper and Kafka, reusing a recent successful result.
+
+    Kafka counts as ready once its port accepts connections and cluster
+    metadata can be fetched before the deadline.
+
+    Args:
+        zookeeper_address (str): ZooKeeper "host:port".
+        kafka_broker (str): Kafka bootstrap "host:port".
+        timeout_secs (float, optional): Total time allowed. Defaults to
+                                        READINESS_TIMEOUT_SECONDS.
+
+    Returns:
+        ReadinessReport: Combined result, with time-to-ready per endpoint.
+    """
+    key = (zookeeper_address, kafka_broker)
+    cached_at = _last_success["at"]
+    if (
+        cached_at is not None
+        and _last_success["key"] == key
+        and time.monotonic() - cached_at < get_readiness_cache_ttl()
+        and not registry.failed_since(kafka_broker, cached_at)
+    ):
+        report = _last_success["report"]
+        return ReadinessReport(report.ready, 0.0, report.probes, cached=True)
+
+    timeout_secs = get_readiness_timeout() if timeout_secs is None else timeout_secs
+    endpoints = [
+        ("zookeeper", zookeeper_address, None),
+        ("kafka", kafka_broker, kafka_metadata_check(kafka_broker)),
+    ]
+    report = asyncio.run(wait_until_ready(endpoints, timeout_secs))
+
+    for probe in report.probes:
+        if probe.ready:
+            logger.info(
+                f"{probe.name} ready at {probe.address} after {probe.elapsed_secs * 1000:.0f} ms "
+                f"({probe.attempts} attempt(s))."
+            )
+        else:
+            logger.error(
+                f"{probe.name} not ready at {probe.address} after {probe.attempts} attempt(s): "
+                f"{probe.error}"
+            )
+    logger.info(f"Readiness check finished in {report.elapsed_secs * 1000:.0f} ms.")
+    record_readiness(report)
+
+    if report.ready:
+        _last_success.update(at=time.monotonic(), key=key, report=report)
+    return report
@@ -0,0 +1,508 @@
+"""
+utils_replay.py - replay recorded buzz and smoker files with their original timing.
+
+Reads data/project_live.json (one JSON object per line), buzz.json (one
+JSON array) or smoker_temps.csv and sends each record to Kafka, keeping
+the gaps between the recorded timestamps, divided by a speed factor:
+
+    python -m utils.utils_replay data/project_live.json --speed 10
+    python -m utils.utils_replay data/smoker_temps.csv --speed max --start "2025-01-01 17:00:00"
+
+Files are streamed, never loaded whole. A background thread serializes
+records to bytes in batches ahead of the send loop (JSON-lines records
+are sent as the recorded bytes), so the send loop only waits and hands
+bytes to the producer; at high speed factors the broker sets the pace.
+
+Records without a timestamp (buzz.json) are spaced default_gap_secs
+apart, and --start does not skip them. Timestamps without an offset are taken as UTC; only their
+differences matter.
+
+Environment variables (defaults for the command line options):
+    REPLAY_SPEED    Speed factor, e.g. 1, 10, or max (default 1).
+    REPLAY_START    Skip timestamped records before this timestamp.
+    REPLAY_TOPIC    Topic to send to. Defaults to SMOKER_TOPIC for CSV
+                    files and BUZZ_TOPIC for JSON files.
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import argparse
+import json
+import os
+import pathlib
+import queue
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Import functions from local modules
+from utils.utils_codec import get_smoker_serializer
+from utils.utils_csv_ingest import get_temperature_column, read_column_batches
+from utils.utils_logger import logger, configure_logging
+from utils.utils_rate import MAX_SPEED, DEFAULT_MIN_SLEEP_SECS
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_SPEED = "1"
+DEFAULT_GAP_SECS = 1.0
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_CHUNK_CHARS = 64 * 1024
+DEFAULT_PREFETCH_BATCHES = 4
+
+JSON_WHITESPACE = " \t\r\n,"
+
+
+def get_replay_speed() -> str:
+    """Fetch the replay speed factor from environment or use default."""
+    return os.getenv("REPLAY_SPEED", DEFAULT_SPEED)
+
+
+def get_replay_start():
+    """Fetch the replay start timestamp from environment, or None for the beginning."""
+    return os.getenv("REPLAY_START") or None
+
+
+def get_replay_topic(file_path: pathlib.Path) -> str:
+    """Fetch the replay topic from environment, or the producer topic for this file type."""
+    topic = os.getenv("REPLAY_TOPIC")
+    if topic:
+        return topic
+    if is_csv(file_path):
+        return os.getenv("SMOKER_TOPIC", "smoker_csv")
+    return os.getenv("BUZZ_TOPIC", "buzz_json")
+
+
+def parse_speed(value) -> float:
+    """
+    Parse a speed factor.
+
+    Returns:
+        float: Factor > 0, or None for max speed (no waiting).
+    """
+    if value is None or str(value).strip().lower() == MAX_SPEED:
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise ValueError(f"Replay speed must be > 0 or '{MAX_SPEED}', got {value}")
+    return speed
+
+
+_EPOCH = datetime(1970, 1, 1)
+_last_timestamp = {"text": None, "seconds": None}
+
+
+def parse_timestamp(value) -> float:
+    """
+    Convert an ISO 8601 string (or epoch seconds) to epoch seconds, or None.
+
+    Strings without an offset are taken as UTC. Recorded streams repeat
+    the same second many times, so the last result is reused.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value == _last_timestamp["text"]:
+        return _last_timestamp["seconds"]
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        seconds = moment.timestamp()
+    else:
+        seconds = (moment - _EPOCH).total_seconds()
+    _last_timestamp["text"], _last_timestamp["seconds"] = value, seconds
+    return seconds
+
+
+#####################################
+# Streaming Readers
+#####################################
+
+
+def is_csv(file_path: pathlib.Path) -> bool:
+    """Return True for CSV files, which are read as smoker readings."""
+    return pathlib.Path(file_path).suffix.lower() == ".csv"
+
+
+def iter_json_array(text_file, chunk_chars: int = DEFAULT_CHUNK_CHARS):
+    """
+    Yield the items of a top-level JSON array without loading the whole file.
+
+    Args:
+        text_file: File opened in text mode, positioned before the "[".
+        chunk_chars (int): Characters read at a time.
+    """
+    decode = json.JSONDecoder().raw_decode
+    buffer = text_file.read(chunk_chars).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    at_eof = False
+    while True:
+        # Skip separators, reading more when the buffer runs out
+        while pos < len(buffer) and buffer[pos] in JSON_WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            more = text_file.read(chunk_chars)
+            if not more:
+                raise ValueError("Unterminated JSON array")
+            buffer, pos = more, 0
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decode(buffer, pos)
+            # A number may continue past the end of the buffer
+            complete = end < len(buffer) or at_eof
+        except json.JSONDecodeError:
+            if at_eof:
+                raise
+            complete = False
+        if not complete:
+            more = text_file.read(chunk_chars)
+            at_eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        yield item
+        pos = end
+
+
+def _iter_json_entries(file_path: pathlib.Path):
+    """Yield (record, recorded bytes or None) from a JSON array or JSON-lines file."""
+    with open(file_path, "rb") as json_file:
+        first = json_file.read(64).lstrip()[:1]
+        if not first:
+            return
+        json_file.seek(0)
+        if first != b"[":
+            for line in json_file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line), line
+            return
+    with open(file_path, "r", encoding="utf-8") as json_file:
+        for record in iter_json_array(json_file):
+            yield record, None
+
+
+def _iter_smoker_entries(file_path: pathlib.Path):
+    """Yield ({"timestamp", "temperature"}, None) from a smoker CSV, in NumPy chunks."""
+    columns = {"timestamp": "timestamp", "temperature": get_temperature_column()}
+    for batch in read_column_batches(file_path, columns, numeric=["temperature"]):
+        for timestamp, temperature in zip(batch["timestamp"].tolist(), batch["temperature"].tolist()):
+            yield {"timestamp": timestamp, "temperature": temperature}, None
+
+
+def iter_file_entries(file_path: pathlib.Path):
+    """
+    Stream a recorded buzz (JSON) or smoker (CSV) file.
+
+    Yields:
+        tuple: (record dict, recorded bytes). The bytes are the record's
+               line in a JSON-lines file, else None.
+    """
+    if is_csv(file_path):
+        return _iter_smoker_entries(file_path)
+    return _iter_json_entries(file_path)
+
+
+def iter_file_records(file_path: pathlib.Path):
+    """Yield record dicts from a recorded buzz (JSON) or smoker (CSV) file."""
+    for record, _raw in iter_file_entries(file_path):
+        yield record
+
+
+#####################################
+# Replay Preparation
+#####################################
+
+
+def serialize_raw(value: bytes) -> bytes:
+    """Kafka value serializer for payloads that are already bytes."""
+    return value
+
+
+def serialize_record(record: dict) -> bytes:
+    """Serialize a record dict as UTF-8 JSON."""
+    return json.dumps(record).encode("utf-8")
+
+
+def prepare_batches(
+    entries,
+    serializer=None,
+    key_field: str = None,
+    start_at: float = None,
+    default_gap_secs: float = DEFAULT_GAP_SECS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
+    """
+    Turn file entries into batches of (offsets, keys, payloads) ready to send.
+
+    Offsets are seconds since the first replayed record, from the
+    recorded timestamps. A record without a timestamp comes
+    default_gap_secs after the one before it. start_at applies only to
+    records with a recorded timestamp; the others are always replayed.
+
+    Args:
+        entries (iterable): (record, recorded bytes or None) pairs, as from iter_file_entries().
+        serializer (callable, optional): Record dict -> bytes. If None,
+                                         recorded bytes are sent as they are
+                                         and other records as UTF-8 JSON.
+        key_field (str, optional): Field to use as the message key.
+        start_at (float, optional): Skip timestamped records before this epoch second.
+        default_gap_secs (float): Gap for records without a timestamp.
+        batch_size (int): Records serialized per batch.
+
+    Yields:
+        tuple: (offsets list, keys list, payloads list), of equal length.
+    """
+    first = None
+    previous = None
+    warned = False
+    offsets, keys, payloads = [], [], []
+    for record, raw in entries:
+        event_time = parse_timestamp(record.get("timestamp"))
+        if event_time is not None:
+            previous = event_time
+            if start_at is not None and event_time < start_at:
+                continue
+        else:
+            # Made-up times cannot be compared with start_at
+            if start_at is not None and not warned:
+                logger.warning("Records without a timestamp are replayed regardless of --start.")
+                warned = True
+            event_time = previous = 0.0 if previous is None else previous + default_gap_secs
+        if first is None:
+            first = event_time
+        offsets.append(event_time - first)
+        keys.append(record.get(key_field) if key_field else None)
+        if serializer is not None:
+            payloads.append(serializer(record))
+        else:
+            payloads.append(raw if raw is not None else serialize_record(record))
+        if len(payloads) >= batch_size:
+            yield offsets, keys, payloads
+            offsets, keys, payloads = [], [], []
+    if payloads:
+        yield offsets, keys, payloads
+
+
+def prefetch(batches, depth: int = DEFAULT_PREFETCH_BATCHES):
+    """
+    Build batches on a background thread, up to depth batches ahead.
+
+    The send loop then finds each batch ready, and serialization happens
+    while it waits for the next record's time. Errors are re-raised here.
+    """
+    ready = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def fill():
+        try:
+            for batch in batches:
+                while not stop.is_set():
+                    try:
+                        ready.put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            ready.put(done)
+        except Exception as e:
+            ready.put(e)
+
+    worker = threading.Thread(target=fill, name="replay-prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            batch = ready.get()
+            if batch is done:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        stop.set()
+
+
+#####################################
+# Replay Loop
+#####################################
+
+
+def replay(send, batches, speed: float = None, clock=time.monotonic, sleep=time.sleep) -> dict:
+    """
+    Send prepared batches, waiting so each record keeps its recorded offset / speed.
+
+    A record that is already late is sent at once; later records keep
+    their own schedule, so one slow send does not shift the rest.
+
+    Args:
+        send (callable): send(payload, key) for one record.
+        batches (iterable): Output of prepare_batches().
+        speed (float, optional): Speed factor. None sends as fast as possible.
+        clock (callable): Monotonic clock, replaceable for testing.
+        sleep (callable): Sleep function, replaceable for testing.
+
+    Returns:
+        dict: Messages sent, wall seconds, messages per second, and the
+              largest lateness behind schedule in seconds.
+    """
+    started = clock()
+    sent = 0
+    max_late = 0.0
+    for offsets, keys, payloads in batches:
+        if speed is None:
+            for key, payload in zip(keys, payloads):
+                send(payload, key)
+        else:
+            for offset, key, payload in zip(offsets, keys, payloads):
+                wait = started + offset / speed - clock()
+                if wait >= DEFAULT_MIN_SLEEP_SECS:
+                    sleep(wait)
+                elif wait < 0:
+                    max_late = max(max_late, -wait)
+                send(payload, key)
+        sent += len(payloads)
+    elapsed = clock() - started
+    return {
+        "messages": sent,
+        "secs": round(elapsed, 3),
+        "messages_per_sec": round(sent / elapsed) if elapsed > 0 else None,
+        "max_late_secs": round(max_late, 3),
+    }
+
+
+def replay_file(
+    file_path: pathlib.Path,
+    send,
+    speed: float = None,
+    start_at: float = None,
+    serializer=None,
+    key_field: str = None,
+) -> dict:
+    """
+    Stream, serialize and replay one recorded file.
+
+    Args:
+        file_path (pathlib.Path): Recorded JSON or CSV file.
+        send (callable): send(payload, key) for one record.
+        speed (float, optional): Speed factor. None sends as fast as possible.
+        start_at (float, optional): Skip records before this epoch second.
+        serializer (callable, optional): Record dict -> bytes. Defaults to
+                                         the recorded bytes, or UTF-8 JSON.
+        key_field (str, optional): Field to use as the message key.
+
+    Returns:
+        dict: Replay statistics from replay().
+    """
+    batches = prepare_batches(iter_file_entries(file_path), serializer, key_field, start_at)
+    stats = replay(send, prefetch(batches), speed)
+    logger.info(f"Replayed {file_path}: {stats}")
+    return stats
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_records: int = 200_000) -> dict:
+    """
+    Measure preparation and send-loop throughput on a synthetic JSON-lines file.
+
+    Sends go to a no-op, so the result is the ceiling Python puts on a replay.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = pathlib.Path(tmp) / "project_live.json"
+        with open(file_path, "w") as out:
+            for i in range(num_records):
+                record = {
+                    "message": "I just tried a movie! It was boring.",
+                    "author": "Alice",
+                    "timestamp": f"2025-02-07 {19 + i // 3600 % 5}:{i // 60 % 60:02d}:{i % 60:02d}",
+                    "sentiment": 0.86,
+                }
+                out.write(json.dumps(record) + "\n")
+
+        start = time.perf_counter()
+        batches = list(prepare_batches(iter_file_entries(file_path), key_field="author"))
+        prepare_secs = time.perf_counter() - start
+
+    stats = replay(lambda payload, key: None, batches)
+    result = {
+        "records": num_records,
+        "prepare_records_per_sec": round(num_records / prepare_secs),
+        "send_loop_records_per_sec": stats["messages_per_sec"],
+    }
+    logger.info(f"Replay benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main(argv=None):
+    """Replay a recorded file to Kafka (or time a dry run) from the command line."""
+    parser = argparse.ArgumentParser(description="Replay a recorded buzz or smoker file to Kafka.")
+    parser.add_argument("file", nargs="?", type=pathlib.Path, help="Recorded .json or .csv file")
+    parser.add_argument("--speed", default=get_replay_speed(), help="Speed factor, e.g. 1, 10, or max")
+    parser.add_argument("--start", default=get_replay_start(), help="Skip timestamped records before this timestamp")
+    parser.add_argument("--topic", help="Topic to send to")
+    parser.add_argument("--key-field", help="Record field to use as the message key")
+    parser.add_argument("--dry-run", action="store_true", help="Read and schedule, but do not send")
+    parser.add_argument("--benchmark", action="store_true", help="Time a synthetic replay and exit")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.benchmark or args.file is None:
+        benchmark()
+        return
+    speed = parse_speed(args.speed)
+    start_at = parse_timestamp(args.start)
+    csv_file = is_csv(args.file)
+    key_field = args.key_field or (None if csv_file else "author")
+    serializer, headers = get_smoker_serializer() if csv_file else (None, None)
+
+    if args.dry_run:
+        replay_file(args.file, lambda payload, key: None, speed, start_at, serializer, key_field)
+        return
+
+    from utils.utils_producer import verify_services, create_buffered_producer, create_kafka_topic
+
+    topic = args.topic or get_replay_topic(args.file)
+    verify_services()
+    producer = create_buffered_producer(value_serializer=serialize_raw)
+    if producer is None:
+        logger.error("Failed to create Kafka producer. Exiting...")
+        sys.exit(3)
+    create_kafka_topic(topic)
+    logger.info(f"Replaying {args.file} to topic '{topic}' at speed {args.speed}")
+
+    def send(payload, key):
+        producer.send(topic, value=payload, key=key, headers=headers)
+
+    try:
+        replay_file(args.file, send, speed, start_at, serializer, key_field)
+    except KeyboardInterrupt:
+        logger.warning("Replay interrupted by user.")
+    finally:
+        producer.close()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
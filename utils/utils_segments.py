@@ -0,0 +1,352 @@
+"""
+utils_segments.py - append-only NDJSON segment files.
+
+Producers append one JSON object per line to the active segment file.
+When a segment grows past a size limit or an age limit, it is closed and
+a new one is started. A small manifest (manifest.json) records the
+segments in order so readers can find them without listing the folder.
+
+Every write and every read costs the same no matter how much history
+is already on disk. With sink_options, lines go through a FileSink (see
+utils_file_sink), so write() only queues them and a background thread
+group-commits them to the active segment.
+
+Example layout:
+    data/buzz_segments/
+        manifest.json
+        buzz-00000000.ndjson
+        buzz-00000001.ndjson
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import json
+import os
+import pathlib
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger
+from utils.utils_file_sink import FileSink
+
+#####################################
+# Default Configurations
+#####################################
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024  # 64 MB
+DEFAULT_MAX_SEGMENT_AGE_SECS = 60 * 60  # 1 hour
+DEFAULT_POLL_INTERVAL_SECS = 0.5
+
+#####################################
+# Manifest Helpers
+#####################################
+
+
+def segment_name(prefix: str, index: int) -> str:
+    """Return the file name for the segment with the given index."""
+    return f"{prefix}-{index:08d}.ndjson"
+
+
+def read_manifest(directory: pathlib.Path) -> dict:
+    """
+    Read the manifest for a segment folder.
+
+    Args:
+        directory (pathlib.Path): Folder holding the segments.
+
+    Returns:
+        dict: The manifest, or an empty manifest if none exists yet.
+    """
+    manifest_path = pathlib.Path(directory).joinpath(MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"segments": []}
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid manifest at {manifest_path}: {e}")
+        return {"segments": []}
+
+
+def write_manifest(directory: pathlib.Path, manifest: dict) -> None:
+    """
+    Atomically replace the manifest for a segment folder.
+
+    The manifest is written to a temporary file first and then renamed,
+    so readers never see a half-written manifest.
+    """
+    manifest_path = pathlib.Path(directory).joinpath(MANIFEST_NAME)
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(tmp_path, manifest_path)
+
+
+def count_lines(path: pathlib.Path, chunk_bytes: int = 1024 * 1024) -> int:
+    """Count complete lines in a file, reading it in chunks."""
+    lines = 0
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_bytes), b""):
+            lines += chunk.count(b"\n")
+    return lines
+
+
+def count_records(manifest: dict) -> int:
+    """Return the records in every segment of a manifest."""
+    return sum(entry.get("records", 0) for entry in manifest["segments"])
+
+
+#####################################
+# Segment Writer
+#####################################
+
+
+class SegmentWriter:
+    """
+    Append JSON records to rotating NDJSON segment files.
+
+    The manifest is only rewritten when a segment is opened or closed,
+    never per record.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        prefix: str = "segment",
+        max_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        max_age_secs: float = DEFAULT_MAX_SEGMENT_AGE_SECS,
+        flush_each_write: bool = True,
+        sink_options: dict = None,
+    ):
+        """
+        Args:
+            directory (pathlib.Path): Folder to hold the segments and manifest.
+            prefix (str): File name prefix for each segment.
+            max_bytes (int): Rotate once the active segment reaches this size.
+            max_age_secs (float): Rotate once the active segment is this old.
+            flush_each_write (bool): Flush after every record so live readers
+                                     see it right away. Ignored with sink_options.
+            sink_options (dict, optional): FileSink options (see
+                                           get_file_sink_options). When given,
+                                           each segment is written by a FileSink.
+        """
+        self.directory = pathlib.Path(directory)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age_secs = max_age_secs
+        self.flush_each_write = flush_each_write
+        self.sink_options = sink_options
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest = read_manifest(self.directory)
+        self.manifest["prefix"] = prefix
+
+        self._file = None
+        self._entry = None
+        self._opened_at = 0.0
+        self._open_segment()
+
+    def _open_segment(self) -> None:
+        """Resume the last open segment or start a new one."""
+        segments = self.manifest["segments"]
+        if segments and not segments[-1].get("closed", False):
+            # Counters are saved on close, so recount after an unclean exit
+            entry = segments[-1]
+            path = self.directory.joinpath(entry["name"])
+            entry["bytes"] = path.stat().st_size if path.exists() else 0
+            entry["records"] = count_lines(path) if entry["bytes"] else 0
+        else:
+            index = segments[-1]["index"] + 1 if segments else 0
+            entry = {
+                "index": index,
+                "name": segment_name(self.prefix, index),
+                "created": time.time(),
+                "records": 0,
+                "bytes": 0,
+                "closed": False,
+            }
+            segments.append(entry)
+
+        self._entry = entry
+        self._opened_at = entry["created"]
+        path = self.directory.joinpath(entry["name"])
+        if self.sink_options is not None:
+            self._file = FileSink(path, **self.sink_options)
+        else:
+            self._file = open(path, "ab")
+        write_manifest(self.directory, self.manifest)
+        logger.info(f"Writing to segment {self.directory.joinpath(entry['name'])}")
+
+    def _should_rotate(self) -> bool:
+        """Return True if the active segment has reached a size or age limit."""
+        if self._entry["bytes"] >= self.max_bytes:
+            return True
+        return time.time() - self._opened_at >= self.max_age_secs
+
+    def rotate(self) -> None:
+        """Close the active segment and start the next one."""
+        self._file.close()
+        self._entry["closed"] = True
+        logger.info(
+            f"Closed segment {self._entry['name']} "
+            f"({self._entry['records']} records, {self._entry['bytes']} bytes)."
+        )
+        self._open_segment()
+
+    def write(self, record: dict) -> None:
+        """
+        Append one record as a single line.
+
+        Args:
+            record (dict): JSON-serializable record.
+        """
+        if self._should_rotate():
+            self.rotate()
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        self._file.write(line)
+        if self.flush_each_write and self.sink_options is None:
+            self._file.flush()
+        self._entry["records"] += 1
+        self._entry["bytes"] += len(line)
+
+    def flush(self) -> None:
+        """Write everything accepted so far to the active segment."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Write out the active segment and save its counters to the manifest."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        write_manifest(self.directory, self.manifest)
+        logger.info(f"Segment writer for {self.directory} closed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+#####################################
+# Segment Reader
+#####################################
+
+
+def _decode_line(line: bytes, source: str):
+    """Decode one NDJSON line, logging and skipping invalid ones."""
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        logger.error(f"Skipping invalid line in {source}: {line!r}")
+        return None
+
+
+class SegmentReader:
+    """
+    Read records from NDJSON segments in order and follow new writes.
+
+    The reader keeps its place as (segment index, byte offset), so reading
+    the next record never rescans earlier data.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        poll_interval_secs: float = DEFAULT_POLL_INTERVAL_SECS,
+    ):
+        """
+        Args:
+            directory (pathlib.Path): Folder holding the segments and manifest.
+            poll_interval_secs (float): Sleep between checks for new data.
+        """
+        self.directory = pathlib.Path(directory)
+        self.poll_interval_secs = poll_interval_secs
+        self._manifest_mtime = None
+        self._segments = []
+
+    def _refresh_manifest(self) -> None:
+        """Reload the manifest only if it changed on disk."""
+        manifest_path = self.directory.joinpath(MANIFEST_NAME)
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            self._segments = read_manifest(self.directory)["segments"]
+
+    def _next_segment(self, current_index: int):
+        """Return the manifest entry after current_index, or None."""
+        for entry in self._segments:
+            if entry["index"] > current_index:
+                return entry
+        return None
+
+    def read(self, follow: bool = True, from_start: bool = True):
+        """
+        Yield records from the segments in write order.
+
+        Args:
+            follow (bool): Keep waiting for new records after reaching the end.
+            from_start (bool): Start at the first segment. If False, start at
+                               the end of the newest segment.
+
+        Yields:
+            dict: One decoded record per line.
+        """
+        self._refresh_manifest()
+        while not self._segments:
+            if not follow:
+                return
+            time.sleep(self.poll_interval_secs)
+            self._refresh_manifest()
+
+        entry = self._segments[0] if from_start else self._segments[-1]
+        file = open(self.directory.joinpath(entry["name"]), "rb")
+        if not from_start:
+            file.seek(0, os.SEEK_END)
+        pending = b""
+
+        try:
+            while True:
+                line = file.readline()
+                if line.endswith(b"\n"):
+                    record = _decode_line(pending + line, entry["name"])
+                    pending = b""
+                    if record is not None:
+                        yield record
+                    continue
+
+                # Keep a partial line until the writer finishes it
+                pending += line
+
+                self._refresh_manifest()
+                next_entry = self._next_segment(entry["index"])
+                if next_entry is not None:
+                    # The writer closes a segment before starting the next,
+                    # so one more read picks up anything written before rotation.
+                    rest = file.read()
+                    for tail_line in (pending + rest).splitlines():
+                        record = _decode_line(tail_line, entry["name"])
+                        if record is not None:
+                            yield record
+                    pending = b""
+                    file.close()
+                    entry = next_entry
+                    file = open(self.directory.joinpath(entry["name"]), "rb")
+                    continue
+
+                if not follow:
+                    return
+                time.sleep(self.poll_interval_secs)
+        finally:
+            file.close()
@@ -0,0 +1,339 @@
+"""
+utils_sentiment.py - lexicon-based sentiment scoring.
+
+Scores range from -1.0 (negative) to 1.0 (positive), with 0.0 neutral,
+matching the reference line in the sentiment consumer chart.
+
+A score is the sum of word valences from a small local lexicon. A
+negation word ("not", "never", "isn't", ...) within the three tokens
+before a word flips and dampens that word's valence. The sum is then
+squashed into [-1, 1].
+
+Generated messages repeat the same few texts, so scores are kept in a
+bounded LRU cache keyed on the message text. score_many() scores a list
+of texts at once and does the lexicon lookup for all cache misses with
+NumPy.
+
+Scorers are pluggable: register_sentiment_scorer() adds a named factory
+and SENTIMENT_ENGINE in .env picks one.
+
+Run this module directly to benchmark:
+
+    python -m utils.utils_sentiment
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from itertools import chain, repeat
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_SENTIMENT_ENGINE = "lexicon"
+DEFAULT_CACHE_SIZE = 65536
+
+# Words before a scored word that can negate it
+NEGATION_WINDOW = 3
+NEGATION_FACTOR = -0.74
+
+# Larger values push scores toward 0; 15 follows the VADER normalization
+NORMALIZATION_ALPHA = 15.0
+
+NEGATIONS = frozenset(
+    {
+        "not", "no", "never", "none", "nobody", "nothing", "neither", "nor",
+        "cannot", "can't", "don't", "doesn't", "didn't", "isn't", "wasn't",
+        "aren't", "weren't", "won't", "wouldn't", "shouldn't", "couldn't",
+        "hasn't", "haven't", "hadn't", "ain't",
+    }
+)
+
+# Word valences on a -4 (very negative) to +4 (very positive) scale
+DEFAULT_LEXICON = {
+    "amazing": 2.8, "awesome": 3.1, "best": 3.2, "boring": -1.3,
+    "awful": -3.1, "bad": -2.5, "beautiful": 2.9, "broken": -1.8,
+    "buggy": -1.8, "cool": 1.3, "delicious": 2.7, "dull": -1.7,
+    "easier": 1.4, "easy": 1.4, "enjoy": 2.2, "enjoyed": 2.3,
+    "excellent": 3.2, "exciting": 2.2, "fail": -2.5, "failed": -2.3,
+    "fascinating": 2.6, "fine": 0.8, "fun": 2.3, "funny": 1.9,
+    "good": 1.9, "great": 3.1, "happy": 2.7, "hate": -2.7,
+    "hated": -3.2, "horrible": -2.5, "interesting": 1.7, "like": 1.5,
+    "liked": 1.8, "love": 3.2, "loved": 2.9, "meh": -0.3,
+    "nice": 1.8, "ok": 0.9, "okay": 0.9, "passion": 2.0,
+    "sad": -2.1, "slow": -0.9, "strange": -0.8, "terrible": -2.1,
+    "ugly": -2.3, "weird": -0.7, "wonderful": 2.7, "worst": -3.1,
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+#####################################
+# Tokenizer
+#####################################
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase word tokens, keeping contractions like "isn't"."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_score(total: float) -> float:
+    """Squash a raw valence sum into [-1, 1] and round to two decimals."""
+    return round(total / math.sqrt(total * total + NORMALIZATION_ALPHA), 2)
+
+
+#####################################
+# Lexicon Sentiment Scorer
+#####################################
+
+
+class LexiconSentimentScorer:
+    """
+    Lexicon scorer with negation handling and a bounded LRU cache.
+
+    Cached lookups cost one dict access, well under a microsecond.
+    """
+
+    def __init__(self, lexicon: dict = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            lexicon (dict, optional): Map of word to valence. Defaults to DEFAULT_LEXICON.
+            cache_size (int): Maximum number of distinct texts to keep scores for.
+        """
+        self.lexicon = dict(lexicon or DEFAULT_LEXICON)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # Token ids for the vectorized lookup. Id 0 is any unknown word.
+        self._token_ids = {word: i + 1 for i, word in enumerate(self.lexicon)}
+        self._valences = np.array([0.0] + list(self.lexicon.values()), dtype=np.float64)
+
+    def _score_tokens(self, tokens: list) -> float:
+        """Score one token list without the cache."""
+        total = 0.0
+        lexicon = self.lexicon
+        last_negation = -NEGATION_WINDOW - 1
+        for i, token in enumerate(tokens):
+            if token in NEGATIONS:
+                last_negation = i
+                continue
+            valence = lexicon.get(token)
+            if valence is None:
+                continue
+            if i - last_negation <= NEGATION_WINDOW:
+                valence *= NEGATION_FACTOR
+            total += valence
+        return normalize_score(total)
+
+    def _remember(self, text: str, score: float) -> None:
+        """Store a score, evicting the least recently used entry if full."""
+        cache = self._cache
+        cache[text] = score
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def score(self, text: str) -> float:
+        """
+        Score one text.
+
+        Args:
+            text (str): Message text.
+
+        Returns:
+            float: Sentiment in [-1.0, 1.0].
+        """
+        cache = self._cache
+        score = cache.get(text)
+        if score is not None:
+            self.hits += 1
+            cache.move_to_end(text)
+            return score
+        self.misses += 1
+        score = self._score_tokens(tokenize(text))
+        self._remember(text, score)
+        return score
+
+    def score_many(self, texts: list) -> list:
+        """
+        Score many texts at once.
+
+        Cache hits are answered directly. All misses are tokenized, their
+        tokens are looked up as one NumPy array, negation is applied with a
+        running count of negation words, and the sums are taken per text.
+
+        Args:
+            texts (list): Message texts.
+
+        Returns:
+            list: Sentiment scores, in the same order as texts.
+        """
+        cache = self._cache
+        results = [None] * len(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            score = cache.get(text)
+            if score is None:
+                missing.setdefault(text, []).append(i)
+            else:
+                cache.move_to_end(text)
+                results[i] = score
+        self.hits += len(texts) - sum(len(v) for v in missing.values())
+        self.misses += len(missing)
+        if not missing:
+            return results
+
+        miss_texts = list(missing)
+        token_lists = [tokenize(text) for text in miss_texts]
+        tokens = list(chain.from_iterable(token_lists))
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+
+        ids = np.fromiter(map(self._token_ids.get, tokens, repeat(0)), dtype=np.int64, count=len(tokens))
+        negation = np.fromiter(map(NEGATIONS.__contains__, tokens), dtype=np.int64, count=len(tokens))
+        owners = np.repeat(np.arange(len(miss_texts)), lengths)
+        positions = np.arange(len(ids))
+
+        # First token position of each token's text, so windows stop at text edges
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        # Negations in the window [max(start, i - window), i - 1]
+        running = np.concatenate(([0], np.cumsum(negation)))
+        window_start = np.maximum(starts, positions - NEGATION_WINDOW)
+        negated = (running[positions] - running[window_start]) > 0
+
+        valences = self._valences[ids] * np.where(negated, NEGATION_FACTOR, 1.0)
+        valences[negation.astype(bool)] = 0.0
+        totals = np.bincount(owners, weights=valences, minlength=len(miss_texts))
+        scores = np.round(totals / np.sqrt(totals * totals + NORMALIZATION_ALPHA), 2)
+
+        for text, score in zip(miss_texts, scores.tolist()):
+            self._remember(text, score)
+            for i in missing[text]:
+                results[i] = score
+        return results
+
+    def cache_info(self) -> dict:
+        """Return cache hit, miss and size counts."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+
+#####################################
+# Scorer Registry
+#####################################
+
+SENTIMENT_SCORERS = {
+    "lexicon": LexiconSentimentScorer,
+}
+
+
+def register_sentiment_scorer(name: str, factory) -> None:
+    """
+    Register a sentiment scorer factory under a name.
+
+    The factory is called with no arguments and must return an object with
+    score(text) -> float and score_many(texts) -> list methods.
+    """
+    SENTIMENT_SCORERS[name] = factory
+
+
+def get_sentiment_engine() -> str:
+    """Fetch sentiment engine name from environment or use default."""
+    return os.getenv("SENTIMENT_ENGINE", DEFAULT_SENTIMENT_ENGINE)
+
+
+def create_sentiment_scorer(name: str = None):
+    """
+    Create a sentiment scorer by name.
+
+    Args:
+        name (str, optional): Registered scorer name. Defaults to SENTIMENT_ENGINE.
+
+    Returns:
+        A scorer with score() and score_many() methods.
+    """
+    name = name or get_sentiment_engine()
+    factory = SENTIMENT_SCORERS.get(name)
+    if factory is None:
+        logger.warning(
+            f"Unknown sentiment engine '{name}'. Using '{DEFAULT_SENTIMENT_ENGINE}'."
+        )
+        factory = SENTIMENT_SCORERS[DEFAULT_SENTIMENT_ENGINE]
+    return factory()
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_messages: int = 200_000) -> dict:
+    """Time cached, uncached and batch scoring over templated messages."""
+    actions = ["found", "saw", "tried", "shared", "loved"]
+    topics = ["a movie", "a meme", "an app", "Python", "recipe", "game"]
+    adjectives = ["amazing", "funny", "boring", "exciting", "weird"]
+    templates = [
+        f"I just {a} {t}! It was {adj}."
+        for a in actions
+        for t in topics
+        for adj in adjectives
+    ]
+    texts = [templates[i % len(templates)] for i in range(num_messages)]
+
+    scorer = LexiconSentimentScorer()
+    start = time.perf_counter()
+    for text in templates:
+        scorer._score_tokens(tokenize(text))
+    uncached_us = (time.perf_counter() - start) / len(templates) * 1e6
+
+    scorer.score_many(templates)
+    start = time.perf_counter()
+    for text in texts:
+        scorer.score(text)
+    cached_us = (time.perf_counter() - start) / num_messages * 1e6
+
+    fresh = LexiconSentimentScorer()
+    unique = [f"{t} not {i}" for i, t in enumerate(texts[:20_000])]
+    start = time.perf_counter()
+    fresh.score_many(unique)
+    batch_miss_us = (time.perf_counter() - start) / len(unique) * 1e6
+
+    result = {
+        "uncached_us_per_msg": round(uncached_us, 3),
+        "cached_us_per_msg": round(cached_us, 3),
+        "batch_miss_us_per_msg": round(batch_miss_us, 3),
+    }
+    logger.info(f"Sentiment benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the sentiment scorer benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+utils_smoker_fleet.py - simulate thousands of smokers at once with NumPy.
+
+utils_gen_smoker_sim.py walks one cook minute by minute in a Python loop.
+SmokerFleet draws a cook profile per sensor (starting temperature, ramp
+rate before and after the stall, stall start and length, noise, final
+temperature) around the same defaults, then computes the temperatures of
+every sensor for a block of time steps as one (steps x sensors) array.
+
+Each temperature is a closed-form function of elapsed time, so any
+block can be computed on its own. Noise is drawn from one seeded
+generator in time order, so the same seed gives the same readings
+whatever the chunk size.
+
+Output can go straight to the CSV producer (messages()) or to disk
+(write_csv(), readable by utils_csv_ingest).
+
+Environment variables (read by create_smoker_fleet):
+    SMOKER_FLEET_SENSORS        Number of simulated smokers (default 0 = off).
+    SMOKER_FLEET_SEED           Seed for repeatable runs (default random).
+    SMOKER_FLEET_INTERVAL_SECS  Seconds between readings of a sensor (default 1).
+
+Run this module directly to check that 10k sensors at 1 Hz keep up with
+real time on one core:
+
+    python -m utils.utils_smoker_fleet [sensors] [steps]
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Import external packages
+import numpy as np
+
+# Import functions from local modules
+from utils.utils_codec import micros_to_isoformat, to_epoch_micros
+from utils.utils_logger import logger
+
+#####################################
+# Default Configurations
+#####################################
+
+DEFAULT_INTERVAL_SECS = 1.0
+DEFAULT_CHUNK_STEPS = 60
+
+# Per-sensor profile ranges (low, high), centred on utils_gen_smoker_sim.py
+START_TEMP_F = (65.0, 75.0)
+RAMP_F_PER_MIN = (0.3, 0.5)
+STALL_START_MIN = (150.0, 210.0)
+STALL_MINUTES = (30.0, 90.0)
+POST_STALL_F_PER_MIN = (0.4, 0.6)
+NOISE_SD_F = (0.05, 0.3)
+FINAL_TEMP_F = (200.0, 210.0)
+
+CSV_HEADER = "timestamp,sensor_id,temperature\n"
+
+
+def get_fleet_sensors() -> int:
+    """Fetch the number of simulated smokers from environment or use default."""
+    return int(os.getenv("SMOKER_FLEET_SENSORS", 0))
+
+
+def get_fleet_seed():
+    """Fetch the simulator seed from environment, or None for a random seed."""
+    seed = os.getenv("SMOKER_FLEET_SEED")
+    return int(seed) if seed else None
+
+
+def get_fleet_interval() -> float:
+    """Fetch the seconds between readings from environment or use default."""
+    return float(os.getenv("SMOKER_FLEET_INTERVAL_SECS", DEFAULT_INTERVAL_SECS))
+
+
+#####################################
+# Fleet Simulator
+#####################################
+
+
+class SmokerFleet:
+    """
+    Temperature curves for num_sensors smokers, one reading per sensor per step.
+
+    Profile arrays (one value per sensor) are public, so a test or load
+    run can inspect or override them before generating readings.
+    """
+
+    def __init__(
+        self,
+        num_sensors: int,
+        seed: int = None,
+        interval_secs: float = DEFAULT_INTERVAL_SECS,
+        start_time: datetime = None,
+    ):
+        """
+        Args:
+            num_sensors (int): Number of simulated smokers.
+            seed (int, optional): Seed for profiles and noise. None is random.
+            interval_secs (float): Seconds between readings of a sensor.
+            start_time (datetime, optional): Time of step 0. Defaults to now (UTC).
+        """
+        self.num_sensors = num_sensors
+        self.interval_secs = interval_secs
+        self.start_us = to_epoch_micros(start_time or datetime.now(timezone.utc))
+        self.sensor_ids = [f"smoker-{i:05d}" for i in range(num_sensors)]
+
+        self._rng = np.random.default_rng(seed)
+        uniform = self._rng.uniform
+        # Rates are stored per second of simulated time
+        self.start_temp = uniform(*START_TEMP_F, num_sensors)
+        self.ramp_rate = uniform(*RAMP_F_PER_MIN, num_sensors) / 60
+        self.stall_start = uniform(*STALL_START_MIN, num_sensors) * 60
+        self.stall_secs = uniform(*STALL_MINUTES, num_sensors) * 60
+        self.post_stall_rate = uniform(*POST_STALL_F_PER_MIN, num_sensors) / 60
+        self.noise_sd = uniform(*NOISE_SD_F, num_sensors).astype(np.float32)
+        self.final_temp = uniform(*FINAL_TEMP_F, num_sensors)
+        self.next_step = 0
+
+    def timestamps_us(self, first_step: int, num_steps: int) -> np.ndarray:
+        """Return epoch microseconds of num_steps steps from first_step."""
+        steps = np.arange(first_step, first_step + num_steps, dtype=np.int64)
+        return self.start_us + (steps * int(self.interval_secs * 1_000_000))
+
+    def temperatures(self, first_step: int, num_steps: int) -> np.ndarray:
+        """
+        Compute noise-free temperatures for a block of steps.
+
+        Returns:
+            numpy.ndarray: float64 array of shape (num_steps, num_sensors).
+        """
+        elapsed = (np.arange(first_step, first_step + num_steps) * self.interval_secs)[:, None]
+        temps = self.start_temp + self.ramp_rate * np.minimum(elapsed, self.stall_start)
+        post_stall = np.maximum(elapsed - (self.stall_start + self.stall_secs), 0.0)
+        temps += self.post_stall_rate * post_stall
+        return np.minimum(temps, self.final_temp)
+
+    def next_chunk(self, num_steps: int = DEFAULT_CHUNK_STEPS) -> tuple:
+        """
+        Simulate the next num_steps steps for every sensor.
+
+        Returns:
+            tuple: (timestamps_us int64 array of num_steps,
+                    temperatures float32 array of shape (num_steps, num_sensors)).
+        """
+        first_step = self.next_step
+        self.next_step += num_steps
+        noise = self._rng.standard_normal((num_steps, self.num_sensors), dtype=np.float32)
+        noise *= self.noise_sd
+        temps = self.temperatures(first_step, num_steps).astype(np.float32)
+        temps += noise
+        return self.timestamps_us(first_step, num_steps), temps
+
+    def chunks(self, num_steps: int = None, chunk_steps: int = DEFAULT_CHUNK_STEPS):
+        """
+        Yield (timestamps_us, temperatures) blocks of up to chunk_steps steps.
+
+        Args:
+            num_steps (int, optional): Total steps to simulate. None runs forever.
+            chunk_steps (int): Steps per block; memory is chunk_steps x num_sensors x 4 bytes.
+        """
+        remaining = num_steps
+        while remaining is None or remaining > 0:
+            steps = chunk_steps if remaining is None else min(chunk_steps, remaining)
+            if remaining is not None:
+                remaining -= steps
+            yield self.next_chunk(steps)
+
+    @property
+    def readings_per_sec(self) -> float:
+        """Readings per second of wall time when the fleet runs in real time."""
+        return self.num_sensors / self.interval_secs
+
+    def messages(self, num_steps: int = None, chunk_steps: int = DEFAULT_CHUNK_STEPS):
+        """
+        Yield one {"timestamp", "sensor_id", "temperature"} dict per reading.
+
+        Readings are yielded as fast as they are computed. To run in real
+        time, pace them at readings_per_sec (e.g. with RateScheduler.paced).
+
+        Args:
+            num_steps (int, optional): Total steps to simulate. None runs forever.
+            chunk_steps (int): Steps simulated per NumPy block.
+        """
+        sensor_ids = self.sensor_ids
+        for timestamps_us, temps in self.chunks(num_steps, chunk_steps):
+            rounded = np.round(temps.astype(np.float64), 2)
+            for timestamp, row in zip(micros_to_isoformat(timestamps_us), rounded.tolist()):
+                for sensor_id, temperature in zip(sensor_ids, row):
+                    yield {"timestamp": timestamp, "sensor_id": sensor_id, "temperature": temperature}
+
+    def write_csv(self, file_path: pathlib.Path, num_steps: int, chunk_steps: int = DEFAULT_CHUNK_STEPS) -> int:
+        """
+        Write num_steps steps of every sensor to a CSV file, one chunk at a time.
+
+        Returns:
+            int: Rows written.
+        """
+        rows = 0
+        line_ends = [f",{sensor_id}," for sensor_id in self.sensor_ids]
+        with open(file_path, "w", newline="") as out:
+            out.write(CSV_HEADER)
+            for timestamps_us, temps in self.chunks(num_steps, chunk_steps):
+                for timestamp, row in zip(micros_to_isoformat(timestamps_us), temps.tolist()):
+                    out.write(
+                        "".join(f"{timestamp}{middle}{t:.2f}\n" for middle, t in zip(line_ends, row))
+                    )
+                rows += len(timestamps_us) * self.num_sensors
+        logger.info(f"Wrote {rows:,} simulated readings to {file_path}")
+        return rows
+
+
+def create_smoker_fleet(num_sensors: int = None) -> SmokerFleet:
+    """Build a SmokerFleet from SMOKER_FLEET_* environment variables."""
+    num_sensors = num_sensors or get_fleet_sensors()
+    seed = get_fleet_seed()
+    interval = get_fleet_interval()
+    logger.info(f"Smoker fleet: {num_sensors} sensors every {interval:g}s, seed {seed}")
+    return SmokerFleet(num_sensors, seed=seed, interval_secs=interval)
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_sensors: int = 10_000, num_steps: int = 600) -> dict:
+    """
+    Measure simulated seconds per wall second at 1 Hz for three outputs.
+
+    A real-time factor above 1 means the fleet keeps up with real time.
+    """
+    simulated_secs = num_steps * DEFAULT_INTERVAL_SECS
+
+    fleet = SmokerFleet(num_sensors, seed=0)
+    start = time.perf_counter()
+    for _ in fleet.chunks(num_steps):
+        pass
+    arrays_secs = time.perf_counter() - start
+
+    fleet = SmokerFleet(num_sensors, seed=0)
+    start = time.perf_counter()
+    count = sum(1 for _ in fleet.messages(num_steps))
+    messages_secs = time.perf_counter() - start
+    assert count == num_sensors * num_steps
+
+    fleet = SmokerFleet(num_sensors, seed=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = pathlib.Path(tmp) / "fleet.csv"
+        start = time.perf_counter()
+        fleet.write_csv(file_path, num_steps)
+        csv_secs = time.perf_counter() - start
+
+    result = {
+        "sensors": num_sensors,
+        "steps": num_steps,
+        "arrays_realtime_factor": round(simulated_secs / arrays_secs, 1),
+        "messages_realtime_factor": round(simulated_secs / messages_secs, 1),
+        "csv_realtime_factor": round(simulated_secs / csv_secs, 1),
+        "readings_per_sec_arrays": round(num_sensors * num_steps / arrays_secs),
+    }
+    logger.info(f"Smoker fleet benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the fleet benchmark with optional sensor and step counts as arguments."""
+    args = [int(arg) for arg in sys.argv[1:3]]
+    benchmark(*args)
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+utils_tracing.py - per-record sequence numbers and end-to-end latency.
+
+With TRACE_HEADERS=true, producers stamp every Kafka record with one
+header (16 bytes plus the producer id):
+
+    buzz-trace = sequence (8 bytes) + send time in epoch microseconds (8 bytes)
+                 + producer id (UTF-8)
+
+The sequence counts up from 0 per producer, topic and partition, so
+consumers can spot lost, duplicated and reordered records. Kafka only
+orders records within a partition, so a count across partitions would
+show gaps and late records that are not there. The send time is taken
+when send() is called, so latency includes batching (linger), the
+broker and the consumer's own processing. It compares wall clocks, so
+producer and consumer hosts need synchronised clocks (NTP).
+
+BufferedProducer stamps records automatically (see utils_producer).
+Consumers call TraceMonitor.observe(headers, partition=...) once a record
+has been fully handled, e.g. after the chart is redrawn.
+
+TraceMonitor tracks sequences per producer and partition, and keeps per
+producer:
+    buzzline_e2e_latency_seconds   histogram, send() to observe()
+    buzzline_trace_records_total   records seen
+    buzzline_trace_missing         sequence numbers not (yet) seen
+    buzzline_trace_reordered_total records that filled an earlier gap
+    buzzline_trace_duplicates_total records seen before
+
+Environment variables:
+    TRACE_HEADERS      Stamp records with the trace header (default false).
+    TRACE_PRODUCER_ID  Producer id in the header (default host:pid).
+
+Run this module directly for the stamp/observe cost and a simulated
+run with lost, duplicated and reordered records:
+
+    python -m utils.utils_tracing
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import itertools
+import os
+import random
+import socket
+import struct
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger
+from utils.utils_metrics import REGISTRY, MetricsRegistry
+
+#####################################
+# Default Configurations
+#####################################
+
+TRACE_HEADER = "buzz-trace"
+_TRACE_PREFIX = struct.Struct(">Qq")  # sequence, send time (epoch microseconds)
+
+# Seconds; from a local round trip to a stalled chart
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+# Gaps wider than this are counted as missing but not remembered
+MAX_TRACKED_MISSING = 100_000
+
+# One Tracer per process, so producers sharing the producer id share sequences
+_tracer = {"tracer": None}
+
+
+def get_trace_headers_enabled() -> bool:
+    """Fetch whether producers stamp records with the trace header."""
+    return os.getenv("TRACE_HEADERS", "false").strip().lower() in ("1", "true", "yes")
+
+
+def get_trace_producer_id() -> str:
+    """Fetch the producer id from environment, or use host:pid."""
+    return os.getenv("TRACE_PRODUCER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+#####################################
+# Producer Side
+#####################################
+
+
+class Tracer:
+    """Hand out trace headers with a sequence number per topic and partition."""
+
+    def __init__(self, producer_id: str = None):
+        self.producer_id = producer_id or get_trace_producer_id()
+        self._id_bytes = self.producer_id.encode("utf-8")
+        self._sequences = {}  # (topic, partition) -> itertools.count
+
+    def stamp(self, topic: str, partition: int = 0) -> tuple:
+        """
+        Return the (name, value) trace header for the next record on a partition.
+
+        The caller must send the record to that partition.
+        """
+        sequence = self._sequences.get((topic, partition))
+        if sequence is None:
+            sequence = self._sequences.setdefault((topic, partition), itertools.count())
+        seq = next(sequence)  # Atomic under the GIL, so threads may share a Tracer
+        return (TRACE_HEADER, _TRACE_PREFIX.pack(seq, time.time_ns() // 1000) + self._id_bytes)
+
+
+def create_tracer():
+    """Return this process's Tracer, or None if TRACE_HEADERS is off."""
+    if not get_trace_headers_enabled():
+        return None
+    if _tracer["tracer"] is None:
+        _tracer["tracer"] = Tracer()
+        logger.info(f"Tracing records as producer '{_tracer['tracer'].producer_id}'")
+    return _tracer["tracer"]
+
+
+def parse_trace_header(headers):
+    """
+    Find and decode the trace header.
+
+    Args:
+        headers (list): Kafka record headers as (str, bytes) pairs, or None.
+
+    Returns:
+        tuple: (producer_id, sequence, sent_us), or None if not traced.
+    """
+    for name, value in headers or ():
+        if name == TRACE_HEADER and value is not None and len(value) >= _TRACE_PREFIX.size:
+            seq, sent_us = _TRACE_PREFIX.unpack_from(value)
+            return value[_TRACE_PREFIX.size:].decode("utf-8", "replace"), seq, sent_us
+    return None
+
+
+#####################################
+# Consumer Side
+#####################################
+
+
+class SequenceTracker:
+    """
+    Classify sequence numbers from one producer as ok, gap, late or duplicate.
+
+    Counting starts at the first number seen, so a consumer that joins
+    mid-stream reports no loss for earlier records.
+    """
+
+    def __init__(self, max_tracked_missing: int = MAX_TRACKED_MISSING):
+        self.max_tracked_missing = max_tracked_missing
+        self.next_seq = None
+        self.missing = 0
+        self._missing_seqs = set()
+        self.reordered = 0
+        self.duplicates = 0
+
+    def observe(self, seq: int) -> str:
+        """
+        Record one sequence number.
+
+        Returns:
+            str: "ok", "gap" (numbers were skipped), "late" (fills an
+                 earlier gap) or "duplicate".
+        """
+        if self.next_seq is None or seq == self.next_seq:
+            self.next_seq = seq + 1
+            return "ok"
+        if seq > self.next_seq:
+            skipped = seq - self.next_seq
+            self.missing += skipped
+            if len(self._missing_seqs) + skipped <= self.max_tracked_missing:
+                self._missing_seqs.update(range(self.next_seq, seq))
+            self.next_seq = seq + 1
+            return "gap"
+        if seq in self._missing_seqs:
+            self._missing_seqs.remove(seq)
+            self.missing -= 1
+            self.reordered += 1
+            return "late"
+        self.duplicates += 1
+        return "duplicate"
+
+
+class _ProducerTrace:
+    """Sequence trackers (one per partition) and metrics for one producer id."""
+
+    def __init__(self, producer_id: str, topic: str, registry: MetricsRegistry):
+        labels = {"producer": producer_id, "topic": topic}
+        self.trackers = {}  # partition -> SequenceTracker
+        self.total_missing = 0
+        self.latency = registry.histogram(
+            "buzzline_e2e_latency_seconds", "Seconds from producer send() to consumer handling.",
+            buckets=LATENCY_BUCKETS, **labels,
+        )
+        self.records = registry.counter("buzzline_trace_records_total", "Traced records seen.", **labels)
+        self.missing = registry.gauge("buzzline_trace_missing", "Sequence numbers not seen (yet).", **labels)
+        self.reordered = registry.counter(
+            "buzzline_trace_reordered_total", "Records that arrived after a later sequence number.", **labels
+        )
+        self.duplicates = registry.counter("buzzline_trace_duplicates_total", "Records seen more than once.", **labels)
+
+    def tracker(self, partition: int) -> SequenceTracker:
+        """Return the sequence tracker for one partition."""
+        tracker = self.trackers.get(partition)
+        if tracker is None:
+            tracker = self.trackers[partition] = SequenceTracker()
+        return tracker
+
+    def total(self, field: str) -> int:
+        """Sum a SequenceTracker count over every partition."""
+        return sum(getattr(tracker, field) for tracker in self.trackers.values())
+
+
+class TraceMonitor:
+    """Latency histograms and gap/duplicate counts per producer for one consumer."""
+
+    def __init__(self, topic: str, registry: MetricsRegistry = REGISTRY):
+        self.topic = topic
+        self.registry = registry
+        self.untraced = 0
+        self._producers = {}
+
+    def observe(self, headers, now_us: int = None, partition: int = 0) -> None:
+        """
+        Record one handled Kafka record.
+
+        Args:
+            headers (list): The record's headers.
+            now_us (int, optional): Handling time in epoch microseconds. Defaults to now.
+            partition (int): The record's partition (record.partition).
+        """
+        trace = parse_trace_header(headers)
+        if trace is None:
+            self.untraced += 1
+            return
+        producer_id, seq, sent_us = trace
+        producer = self._producers.get(producer_id)
+        if producer is None:
+            producer = self._producers[producer_id] = _ProducerTrace(producer_id, self.topic, self.registry)
+            logger.info(f"Tracing records from producer '{producer_id}' on '{self.topic}'")
+
+        if now_us is None:
+            now_us = time.time_ns() // 1000
+        producer.records.inc()
+        producer.latency.observe(max(now_us - sent_us, 0) / 1_000_000)
+
+        tracker = producer.tracker(partition)
+        missing_before = tracker.missing
+        result = tracker.observe(seq)
+        if result == "ok":
+            return
+        producer.total_missing += tracker.missing - missing_before
+        producer.missing.set(producer.total_missing)
+        if result == "late":
+            producer.reordered.inc()
+        elif result == "duplicate":
+            producer.duplicates.inc()
+
+    def summary(self) -> dict:
+        """Return counts and estimated latency percentiles per producer."""
+        return {
+            producer_id: {
+                "records": producer.records.value,
+                "missing": producer.total_missing,
+                "reordered": producer.total("reordered"),
+                "duplicates": producer.total("duplicates"),
+                "latency_p50_secs": histogram_quantile(producer.latency, 0.5),
+                "latency_p99_secs": histogram_quantile(producer.latency, 0.99),
+            }
+            for producer_id, producer in self._producers.items()
+        }
+
+    def log_summary(self) -> None:
+        """Log the per-producer summary."""
+        for producer_id, counts in self.summary().items():
+            logger.info(f"Trace summary for producer '{producer_id}' on '{self.topic}': {counts}")
+        if self.untraced:
+            logger.info(f"{self.untraced} records on '{self.topic}' had no trace header.")
+
+
+def histogram_quantile(histogram, quantile: float):
+    """
+    Estimate a quantile as the upper bound of the bucket that contains it.
+
+    Returns:
+        float: Bucket bound in the histogram's unit, inf if beyond the
+               last bucket, or None if there are no observations.
+    """
+    if histogram.count == 0:
+        return None
+    target = quantile * histogram.count
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return float("inf")
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_records: int = 200_000, seed: int = 0) -> dict:
+    """
+    Measure stamp and observe cost, and check the counters on a simulated
+    stream with 1% lost, 0.5% duplicated and 1% locally reordered records,
+    spread over 3 partitions and interleaved as a consumer would read them.
+
+    missing and duplicates should match exactly. reordered can come out a
+    little below swaps, because overlapping swaps move fewer records and
+    swaps across a batch boundary do not reorder a partition.
+    """
+    rng = random.Random(seed)
+    tracer = Tracer("benchmark")
+
+    start = time.perf_counter()
+    records = [(i % 3, [tracer.stamp("bench", i % 3)]) for i in range(num_records)]
+    stamp_ns = (time.perf_counter() - start) / num_records * 1e9
+    # A consumer reads each partition in order, in batches of 500
+    partitions = [records[partition::3] for partition in range(3)]
+    records = [record for offset in range(0, num_records, 500) for part in partitions for record in part[offset:offset + 500]]
+
+    delivered, lost, duplicated = [], 0, 0
+    for record in records:
+        if rng.random() < 0.01:
+            lost += 1
+            continue
+        delivered.append(record)
+        if rng.random() < 0.005:
+            delivered.append(record)
+            duplicated += 1
+    reordered = 0
+    for i in range(len(delivered) - 1):
+        if rng.random() < 0.01:
+            delivered[i], delivered[i + 1] = delivered[i + 1], delivered[i]
+            reordered += 1
+
+    monitor = TraceMonitor("bench", registry=MetricsRegistry())
+    start = time.perf_counter()
+    for partition, headers in delivered:
+        monitor.observe(headers, partition=partition)
+    observe_ns = (time.perf_counter() - start) / len(delivered) * 1e9
+
+    counts = monitor.summary()["benchmark"]
+    result = {
+        "stamp_ns": round(stamp_ns),
+        "observe_ns": round(observe_ns),
+        "lost": lost,
+        "missing_reported": counts["missing"],
+        "duplicated": duplicated,
+        "duplicates_reported": counts["duplicates"],
+        "swaps": reordered,
+        "reordered_reported": counts["reordered"],
+    }
+    logger.info(f"Tracing benchmark: {result}")
+    return result
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main():
+    """Run the tracing benchmark."""
+    benchmark()
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,589 @@
+"""
+utils_transport.py - choose how producers and consumers exchange records.
+
+Producers and consumers are written once against a Transport from
+create_transport(): transport.producer() to send, transport.consumer()
+to read, transport.create_topic() to set up a topic. The producer and
+consumer follow the Kafka client API (create_buffered_producer() and
+create_kafka_consumer() return the same objects). TRANSPORT picks what
+is behind them:
+
+    kafka   A Kafka broker at KAFKA_BROKER_ADDRESS (default).
+    file    Append-only NDJSON segments under TRANSPORT_DIR/<topic>/
+            (see utils_segments). Works across processes on one host
+            with no broker. One partition and one writer process per
+            topic; consumers follow the segments from the start, and
+            offsets are not stored. Lines are group-committed by a
+            FileSink (utils_file_sink) with the producer's
+            PREFIX_FILE_* settings, TRANSPORT_FILE_* by default.
+    memory  The in-process broker from utils_memory_broker. Producer and
+            consumer must run in the same process, e.g. with the
+            pipeline command below or in utils_benchmark.
+
+Every transport carries the same serialized bytes, keys and headers, so
+serializers, envelopes, the wire-format header and trace headers work
+unchanged. verify_services(), create_kafka_topic() and the partition
+lookups in utils_producer only talk to Kafka when TRANSPORT is kafka.
+
+File records are JSON lines of the form
+    {"ts": ms, "key": str|null, "value": str, "headers": [[name, base64]]}
+with "key_b64" / "value_b64" in place of "key" / "value" for bytes that
+are not UTF-8 (such as the binary smoker codec).
+
+Scripts that ran without Kafka before (the basic and project pairs) pass
+create_transport(default="file"), so they still work with no broker
+unless TRANSPORT is set.
+
+Environment variables:
+    TRANSPORT          kafka, file or memory (default kafka, or the script's default).
+    TRANSPORT_DIR      Folder for the file transport (default data/transport).
+    TRANSPORT_POLL_MS  How often file consumers check for new lines (default 50).
+    TRANSPORT_FILE_*   FileSink settings for file producers that pass no prefix
+                       (FSYNC, FSYNC_INTERVAL_MS, FLUSH_MS, FLUSH_BYTES; see utils_file_sink).
+
+Run a producer and a consumer in one process over the memory transport:
+
+    python -m utils.utils_transport pipeline "Kersha_Live_Visualization_Producers (p 4)/kersha_csv_live_producer.py" "Kersha_Live_Visualization_Consumers (p 4)/kersha_csv_live_consumer.py"
+
+Run this module with benchmark for the per-record cost of each local transport:
+
+    python -m utils.utils_transport benchmark
+"""
+
+#####################################
+# Import Modules
+#####################################
+
+# Import packages from Python Standard Library
+import argparse
+import base64
+import os
+import pathlib
+import queue
+import runpy
+import tempfile
+import threading
+import time
+
+# Import functions from local modules
+from utils.utils_logger import logger, configure_logging
+from utils.utils_memory_broker import (
+    CompletedFuture,
+    MemoryBroker,
+    MemoryConsumer,
+    MemoryProducer,
+    MemoryRecord,
+    RecordMetadata,
+    TopicPartition,
+)
+from utils.utils_file_sink import get_file_sink_options
+from utils.utils_producer import load_environment
+from utils.utils_segments import SegmentReader, SegmentWriter, count_records
+
+#####################################
+# Default Configurations
+#####################################
+
+TRANSPORTS = ("kafka", "file", "memory")
+DEFAULT_TRANSPORT = "kafka"
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+DEFAULT_TRANSPORT_DIR = PROJECT_ROOT.joinpath("data", "transport")
+DEFAULT_POLL_MS = 50
+# Environment prefix for file producer FileSink settings (TRANSPORT_FILE_FSYNC, ...)
+DEFAULT_FILE_PREFIX = "TRANSPORT"
+# Records a file consumer reads ahead of its caller
+FILE_READ_AHEAD = 10_000
+
+# The process-wide memory broker, created on first use
+_memory = {"broker": None}
+_memory_lock = threading.Lock()
+
+
+def get_transport() -> str:
+    """Fetch the transport from environment or use default."""
+    load_environment()
+    transport = os.getenv("TRANSPORT", DEFAULT_TRANSPORT).strip().lower()
+    if transport not in TRANSPORTS:
+        logger.warning(f"Unknown TRANSPORT '{transport}'. Using '{DEFAULT_TRANSPORT}'.")
+        transport = DEFAULT_TRANSPORT
+    return transport
+
+
+def get_transport_dir() -> pathlib.Path:
+    """Fetch the file transport folder from environment or use default."""
+    load_environment()
+    return pathlib.Path(os.getenv("TRANSPORT_DIR", DEFAULT_TRANSPORT_DIR))
+
+
+def get_poll_secs() -> float:
+    """Fetch the file consumer poll interval in seconds from environment or use default."""
+    return float(os.getenv("TRANSPORT_POLL_MS", DEFAULT_POLL_MS)) / 1000
+
+
+def get_memory_broker() -> MemoryBroker:
+    """Return this process's memory broker, creating it on first use."""
+    with _memory_lock:
+        if _memory["broker"] is None:
+            from utils.utils_producer import get_num_partitions
+
+            _memory["broker"] = MemoryBroker(num_partitions=get_num_partitions())
+        return _memory["broker"]
+
+
+#####################################
+# File Transport
+#####################################
+
+
+def _encode_field(record: dict, name: str, data) -> None:
+    """Store bytes as text when they are UTF-8, otherwise as base64."""
+    if data is None or isinstance(data, str):
+        record[name] = data
+        return
+    try:
+        record[name] = data.decode("utf-8")
+    except UnicodeDecodeError:
+        record[f"{name}_b64"] = base64.b64encode(data).decode("ascii")
+
+
+def _decode_field(record: dict, name: str):
+    """Return the bytes stored by _encode_field."""
+    if f"{name}_b64" in record:
+        return base64.b64decode(record[f"{name}_b64"])
+    data = record.get(name)
+    return data.encode("utf-8") if data is not None else None
+
+
+class FileProducer:
+    """KafkaProducer look-alike that appends records to per-topic NDJSON segments."""
+
+    def __init__(
+        self,
+        directory: pathlib.Path = None,
+        value_serializer=None,
+        key_serializer=None,
+        file_prefix: str = DEFAULT_FILE_PREFIX,
+        **_settings,
+    ):
+        """
+        Args:
+            directory (pathlib.Path): Transport folder. Defaults to TRANSPORT_DIR.
+            value_serializer (callable): Turns values into bytes.
+            key_serializer (callable): Turns keys into bytes.
+            file_prefix (str): Environment prefix of the FileSink settings, e.g. "BUZZ".
+            _settings: KafkaProducer tuning options; ignored.
+        """
+        self.directory = pathlib.Path(directory or get_transport_dir())
+        self.value_serializer = value_serializer
+        self.key_serializer = key_serializer
+        self.sink_options = get_file_sink_options(file_prefix)
+        self._writers = {}
+        self._sent = {}  # Records written per topic by this producer
+        self._lock = threading.Lock()
+
+    def _writer(self, topic: str) -> SegmentWriter:
+        writer = self._writers.get(topic)
+        if writer is None:
+            writer = self._writers[topic] = SegmentWriter(
+                self.directory / topic, prefix=topic, sink_options=self.sink_options
+            )
+            # Offsets continue after the records already in the topic
+            self._sent[topic] = count_records(writer.manifest)
+        return writer
+
+    def send(self, topic: str, value=None, key=None, headers=None, partition=None, timestamp_ms=None):
+        """Serialize and append one record. Returns a completed future."""
+        value_bytes = self.value_serializer(value) if self.value_serializer and value is not None else value
+        key_bytes = self.key_serializer(key) if self.key_serializer and key is not None else key
+        timestamp = timestamp_ms or time.time_ns() // 1_000_000
+        record = {"ts": timestamp}
+        _encode_field(record, "key", key_bytes)
+        _encode_field(record, "value", value_bytes)
+        record["headers"] = [[name, base64.b64encode(data).decode("ascii")] for name, data in headers or ()]
+        with self._lock:
+            self._writer(topic).write(record)
+            offset = self._sent[topic]
+            self._sent[topic] = offset + 1
+        return CompletedFuture(RecordMetadata(topic, 0, offset, timestamp))
+
+    def flush(self, timeout=None) -> None:
+        """Wait until every record sent so far is written to its segment."""
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+
+    def close(self, timeout=None) -> None:
+        """Close every segment writer and save the manifests."""
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+class FileConsumer:
+    """
+    KafkaConsumer look-alike that follows a topic's NDJSON segments.
+
+    A background thread follows the segments and decodes records ahead
+    of the caller, up to FILE_READ_AHEAD records.
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        directory: pathlib.Path = None,
+        value_deserializer=None,
+        key_deserializer=None,
+        auto_offset_reset: str = "earliest",
+        consumer_timeout_ms: float = float("inf"),
+        max_poll_records: int = 500,
+        **_settings,
+    ):
+        """
+        Args:
+            topic (str): Topic to read.
+            directory (pathlib.Path): Transport folder. Defaults to TRANSPORT_DIR.
+            value_deserializer (callable): Turns value bytes into values.
+            key_deserializer (callable): Turns key bytes into keys.
+            auto_offset_reset (str): "earliest" reads from the first segment,
+                                     "latest" from the end of the newest.
+            consumer_timeout_ms (float): Iteration stops after this long without records.
+            max_poll_records (int): Largest batch returned by one poll.
+            _settings: Other KafkaConsumer options (group_id, ...); ignored.
+        """
+        self.topic = topic
+        self.directory = pathlib.Path(directory or get_transport_dir()) / topic
+        self.value_deserializer = value_deserializer
+        self.key_deserializer = key_deserializer
+        self.consumer_timeout_secs = consumer_timeout_ms / 1000
+        self.max_poll_records = max_poll_records
+        self._tp = TopicPartition(topic, 0)
+        self._queue = queue.Queue(maxsize=FILE_READ_AHEAD)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._follow, args=(auto_offset_reset == "earliest",), name=f"file-consumer-{topic}", daemon=True
+        )
+        self._thread.start()
+
+    def _follow(self, from_start: bool) -> None:
+        """Reader thread: decode records from the segments into the queue."""
+        reader = SegmentReader(self.directory, poll_interval_secs=get_poll_secs())
+        for offset, record in enumerate(reader.read(follow=True, from_start=from_start)):
+            value, key = _decode_field(record, "value"), _decode_field(record, "key")
+            if self.value_deserializer and value is not None:
+                value = self.value_deserializer(value)
+            if self.key_deserializer and key is not None:
+                key = self.key_deserializer(key)
+            headers = [(name, base64.b64decode(data)) for name, data in record.get("headers", ())]
+            item = MemoryRecord(self.topic, 0, offset, record.get("ts"), 0, key, value, headers)
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if self._closed.is_set():
+                return
+
+    def poll(self, timeout_ms: float = 0, max_records: int = None) -> dict:
+        """Return new records as {TopicPartition: [records]}, waiting up to timeout_ms."""
+        if self._closed.is_set():
+            raise RuntimeError("Consumer is closed")
+        max_records = max_records or self.max_poll_records
+        try:
+            records = [self._queue.get(timeout=timeout_ms / 1000) if timeout_ms else self._queue.get_nowait()]
+        except queue.Empty:
+            return {}
+        while len(records) < max_records:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return {self._tp: records}
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> MemoryRecord:
+        """Return the next record, waiting up to consumer_timeout_ms for one."""
+        deadline = time.monotonic() + self.consumer_timeout_secs
+        while not self._closed.is_set():
+            try:
+                return self._queue.get(timeout=max(min(deadline - time.monotonic(), 1.0), 0))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    break
+        raise StopIteration
+
+    def commit(self, offsets: dict = None) -> None:
+        """Offsets are not stored by the file transport."""
+
+    def assignment(self) -> set:
+        return {self._tp}
+
+    def close(self, autocommit: bool = True) -> None:
+        self._closed.set()
+
+
+#####################################
+# Clients for Each Transport
+#####################################
+
+
+def create_producer_client(
+    transport: str, value_serializer=None, key_serializer=None, file_prefix: str = None, **settings
+):
+    """
+    Return a KafkaProducer look-alike for the file or memory transport.
+
+    Args:
+        transport (str): file or memory.
+        value_serializer (callable): Turns values into bytes.
+        key_serializer (callable): Turns keys into bytes.
+        file_prefix (str, optional): Environment prefix of the file transport's
+                                     FileSink settings. Defaults to TRANSPORT.
+        settings: KafkaProducer tuning options; ignored.
+    """
+    if transport == "memory":
+        logger.info("Producing to the in-process memory broker.")
+        return MemoryProducer(get_memory_broker(), value_serializer=value_serializer, key_serializer=key_serializer)
+    if transport == "file":
+        file_prefix = file_prefix or DEFAULT_FILE_PREFIX
+        producer = FileProducer(value_serializer=value_serializer, key_serializer=key_serializer, file_prefix=file_prefix)
+        logger.info(
+            f"Producing to file segments under {producer.directory} "
+            f"(fsync {producer.sink_options['fsync']}, flush every {producer.sink_options['flush_interval_ms']:g} ms)."
+        )
+        return producer
+    raise ValueError(f"No local client for transport '{transport}'")
+
+
+def create_consumer_client(transport: str, topic: str, group_id: str = None, value_deserializer=None, **settings):
+    """
+    Return a KafkaConsumer look-alike for the file or memory transport.
+
+    Args:
+        transport (str): file or memory.
+        topic (str): Topic to read.
+        group_id (str): Consumer group (memory transport only).
+        value_deserializer (callable): Turns value bytes into values.
+        settings: Other KafkaConsumer options, e.g. consumer_timeout_ms.
+    """
+    settings.setdefault("auto_offset_reset", "earliest")
+    if transport == "memory":
+        logger.info(f"Consuming '{topic}' from the in-process memory broker.")
+        return MemoryConsumer(
+            get_memory_broker(), topic, group_id=group_id, value_deserializer=value_deserializer, **settings
+        )
+    if transport == "file":
+        logger.info(f"Consuming '{topic}' from file segments under {get_transport_dir()}.")
+        return FileConsumer(topic, value_deserializer=value_deserializer, **settings)
+    raise ValueError(f"No local client for transport '{transport}'")
+
+
+def create_topic(transport: str, topic: str, num_partitions: int = None) -> None:
+    """Create a topic on the file or memory transport if it does not exist."""
+    if transport == "memory":
+        get_memory_broker().create_topic(topic, num_partitions)
+    elif transport == "file":
+        (get_transport_dir() / topic).mkdir(parents=True, exist_ok=True)
+    logger.info(f"Topic '{topic}' ready on the {transport} transport.")
+
+
+def topic_partition_count(transport: str, topic: str) -> int:
+    """Return the partitions of a topic on the file or memory transport."""
+    if transport == "memory":
+        return len(get_memory_broker().partitions_for(topic))
+    return 1
+
+
+#####################################
+# Transport Interface
+#####################################
+
+
+class Transport:
+    """
+    Producer, consumer and topic setup for one transport.
+
+    The clients come from create_buffered_producer() and
+    create_kafka_consumer(), which read TRANSPORT, so a process uses one
+    transport (create_transport() sets TRANSPORT to match).
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name (str): kafka, file or memory.
+        """
+        self.name = name
+
+    @property
+    def supports_worker_processes(self) -> bool:
+        """True if several producer processes may write one topic (Kafka only)."""
+        return self.name == "kafka"
+
+    def verify(self) -> None:
+        """Wait for Kafka (and ZooKeeper) to be ready; nothing to do for local transports."""
+        # Imported here: utils_producer imports this module lazily the other way
+        from utils.utils_producer import verify_services
+
+        verify_services()
+
+    def create_topic(self, topic: str, num_partitions: int = None, fresh: bool = False) -> None:
+        """
+        Make sure a topic exists.
+
+        Args:
+            topic (str): Topic name.
+            num_partitions (int, optional): Partitions. Defaults to KAFKA_NUM_PARTITIONS.
+            fresh (bool): Clear an existing Kafka topic first (create_kafka_topic).
+        """
+        from utils.utils_producer import create_kafka_topic, ensure_kafka_topic
+
+        if fresh:
+            create_kafka_topic(topic, num_partitions=num_partitions)
+        else:
+            ensure_kafka_topic(topic, num_partitions=num_partitions)
+
+    def producer(self, value_serializer=None, key_field: str = None, profile: str = None, file_prefix: str = None):
+        """
+        Return a BufferedProducer, or None if it could not connect (see create_buffered_producer).
+
+        file_prefix picks the PREFIX_FILE_* settings the file transport writes
+        with, e.g. "BUZZ"; other transports ignore it.
+        """
+        from utils.utils_producer import create_buffered_producer
+
+        return create_buffered_producer(
+            value_serializer=value_serializer, profile=profile, key_field=key_field, file_prefix=file_prefix
+        )
+
+    def consumer(self, topic: str, group_id: str = None, value_deserializer=None):
+        """Return a consumer subscribed to topic (see create_kafka_consumer)."""
+        from utils.utils_consumer import create_kafka_consumer
+
+        return create_kafka_consumer(topic, group_id, value_deserializer_provided=value_deserializer)
+
+
+def create_transport(default: str = DEFAULT_TRANSPORT) -> Transport:
+    """
+    Return the Transport chosen by TRANSPORT, or default if it is not set.
+
+    Args:
+        default (str): Transport for this script when TRANSPORT is not set.
+    """
+    load_environment()
+    if default not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{default}'. Choose from {sorted(TRANSPORTS)}.")
+    if not os.getenv("TRANSPORT"):
+        # The producer and consumer factories read TRANSPORT
+        os.environ["TRANSPORT"] = default
+    transport = Transport(get_transport())
+    logger.info(f"Transport: {transport.name}")
+    return transport
+
+
+#####################################
+# Co-located Pipeline
+#####################################
+
+
+def run_pipeline(producer_script: pathlib.Path, consumer_script: pathlib.Path, transport: str = "memory") -> None:
+    """
+    Run a producer and a consumer script in this process.
+
+    The producer runs on a background thread and the consumer on the main
+    thread (so its chart works and Ctrl+C reaches it). Both go through
+    the chosen transport, memory by default. They share this process's
+    log file, named after the pipeline command rather than either script.
+    """
+    os.environ["TRANSPORT"] = transport
+    for script in (producer_script, consumer_script):
+        if not pathlib.Path(script).exists():
+            raise FileNotFoundError(script)
+
+    def run_producer():
+        try:
+            runpy.run_path(str(producer_script), run_name="__main__")
+        except SystemExit as e:
+            logger.warning(f"Producer {producer_script} exited with {e.code}.")
+
+    logger.info(f"Running {producer_script} -> {consumer_script} over the {transport} transport.")
+    threading.Thread(target=run_producer, name="pipeline-producer", daemon=True).start()
+    runpy.run_path(str(consumer_script), run_name="__main__")
+
+
+#####################################
+# Benchmark
+#####################################
+
+
+def benchmark(num_messages: int = 50_000) -> dict:
+    """Time sending num_messages JSON-sized records and reading them back on each local transport."""
+    payload = b'{"message": "I just tried a movie! It was boring.", "author": "Alice"}'
+    headers = [("buzz-trace", bytes(24))]
+    results = {}
+    saved_dir = os.environ.get("TRANSPORT_DIR")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TRANSPORT_DIR"] = tmp
+        for transport in ("memory", "file"):
+            producer = create_producer_client(transport)
+            start = time.perf_counter()
+            for i in range(num_messages):
+                producer.send("bench", value=payload, key=b"Alice", headers=headers)
+            producer.flush()
+            send_secs = time.perf_counter() - start
+
+            consumer = create_consumer_client(transport, "bench", group_id="bench", consumer_timeout_ms=2000)
+            start = time.perf_counter()
+            received = 0
+            for record in consumer:
+                received += 1
+                if received == num_messages:
+                    break
+            consume_secs = time.perf_counter() - start
+            consumer.close()
+            producer.close()
+            assert received == num_messages, f"{transport}: {received} of {num_messages}"
+            results[transport] = {
+                "send_per_sec": round(num_messages / send_secs),
+                "consume_per_sec": round(num_messages / consume_secs),
+            }
+            logger.info(f"Transport benchmark {transport}: {results[transport]}")
+    if saved_dir is None:
+        os.environ.pop("TRANSPORT_DIR", None)
+    else:
+        os.environ["TRANSPORT_DIR"] = saved_dir
+    return results
+
+
+#####################################
+# Main Function for Testing
+#####################################
+
+
+def main(argv=None):
+    """Run a co-located pipeline or the transport benchmark."""
+    parser = argparse.ArgumentParser(description="Local transports for producers and consumers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pipeline = commands.add_parser("pipeline", help="Run a producer and a consumer in one process")
+    pipeline.add_argument("producer", type=pathlib.Path, help="Producer script")
+    pipeline.add_argument("consumer", type=pathlib.Path, help="Consumer script")
+    pipeline.add_argument("--transport", default="memory", choices=("memory", "file"))
+    commands.add_parser("benchmark", help="Time the memory and file transports")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.command == "benchmark":
+        benchmark()
+        return
+    run_pipeline(args.producer, args.consumer, args.transport)
+
+
+#####################################
+# Conditional Execution
+#####################################
+
+if __name__ == "__main__":
+    main()